@@ -1,5 +1,9 @@
 # __init__.py
 
+# Start the startup profiler (if enabled) before anything else is imported
+from . import startup_profiler
+startup_profiler.start_profiler()
+
 from flask import Flask
 import logging
 import os
@@ -46,4 +50,5 @@ app.logger.propagate = False
 
 # Import the views module to register routes
 # - This should be done after configuring the app to ensure routes have access to the app context.
-from . import views
+with startup_profiler.phase('register views'):
+    from . import views
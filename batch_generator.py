@@ -0,0 +1,234 @@
+# batch_generator.py
+
+"""
+Batch Generation Engine for CP Demo Server
+
+This module fans a multi-type generation request out to a bounded process pool
+so that the CPU-bound generators (PIL, reportlab, the office formats) and the
+compiler subprocesses run side by side instead of one after the other. A batch
+finishes in roughly the time of its slowest file type.
+
+Usage:
+    futures = submit_batch(['pdf', 'docx', 'exe'], options)
+    results = [collect_result(future, file_type) for future, file_type in futures.items()]
+
+Batches are submitted by generation_jobs, which tracks the progress of each file.
+
+Call start_executor() at startup, before any background thread is started: the
+workers are forked from the server process, and a worker forked while another
+thread holds a lock (e.g. SQLite's) would inherit it locked.
+
+Configuration:
+- CP_GENERATION_WORKERS: Maximum number of worker processes (defaults to the CPU count, capped at 8).
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app import logging
+from app import file_generator
+from app import large_files
+
+# Order of the options as expected by file_generator.generate_file
+GENERATION_OPTIONS = (
+    'url_type',
+    'include_image',
+    'include_script',
+    'include_video',
+    'include_audio',
+    'include_sensitive_link',
+    'include_3d',
+    'include_pdf',
+    'include_external_app',
+    'include_data_submission',
+)
+
+MAX_WORKERS = int(os.environ.get('CP_GENERATION_WORKERS', min(os.cpu_count() or 1, 8)))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# ===========================
+# Process Pool Management
+# ===========================
+
+def get_executor():
+    """
+    Return the shared process pool, creating it on first use.
+
+    Returns:
+        ProcessPoolExecutor: The pool used for all batch generations.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            logging.info(f"Starting generation process pool with {MAX_WORKERS} workers.")
+            _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        return _executor
+
+
+def start_executor():
+    """
+    Create the shared process pool and start its workers right away.
+    """
+    get_executor().submit(os.getpid).result()
+
+
+def reset_executor():
+    """
+    Discard the shared process pool so the next batch starts a fresh one.
+
+    Used after a worker process died and left the pool broken.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _generate_in_worker(file_type, options, record=True):
+    """
+    Generate a single file inside a pool worker and time it.
+
+    Args:
+        file_type (str): The type of file to generate.
+        options (dict): The generation options keyed by GENERATION_OPTIONS, plus an
+            optional 'seed' making the output reproducible.
+        record (bool): Whether to record the file in generated_files.db (False for inventory stock).
+
+    Returns:
+        dict: The generation result, with the keys 'file_type', 'filename' (None on
+        failure), 'error', 'elapsed' (seconds) and 'pid' of the worker.
+    """
+    started = time.perf_counter()
+    try:
+        filename = file_generator.generate_file(
+            file_type, *(options.get(name, 'off') for name in GENERATION_OPTIONS), record=record, seed=options.get('seed')
+        )
+        error = None if filename else "Generator returned no file."
+    except Exception as e:
+        logging.error(f"Error generating file of type '{file_type}': {e}", exc_info=True)
+        filename, error = None, str(e)
+
+    return {
+        'file_type': file_type,
+        'filename': filename,
+        'error': error,
+        'elapsed': time.perf_counter() - started,
+        'pid': os.getpid(),
+    }
+
+def _generate_large_in_worker(file_type, target_size, url_type):
+    """
+    Generate a size-targeted file inside a pool worker and time it.
+
+    Args:
+        file_type (str): One of large_files.LARGE_FILE_WRITERS.
+        target_size (int): The requested size in bytes.
+        url_type (str): Type of URL to include ("malicious", "clean" or "none").
+
+    Returns:
+        dict: The generation result (see _generate_in_worker), plus the 'size' of the file
+        in bytes and the 'bytes_per_second' it was written at (None on failure).
+    """
+    started = time.perf_counter()
+    try:
+        result = large_files.generate_large_file(file_type, target_size, url_type)
+        filename, size, bytes_per_second, error = result['filename'], result['size'], result['bytes_per_second'], None
+    except Exception as e:
+        logging.error(f"Error generating large file of type '{file_type}': {e}", exc_info=True)
+        filename, size, bytes_per_second, error = None, None, None, str(e)
+
+    return {
+        'file_type': file_type,
+        'filename': filename,
+        'error': error,
+        'elapsed': time.perf_counter() - started,
+        'pid': os.getpid(),
+        'size': size,
+        'bytes_per_second': bytes_per_second,
+    }
+
+# ===========================
+# Batch Generation
+# ===========================
+
+def _submit(submit_tasks):
+    """
+    Submit tasks to the process pool, restarting it once if it is broken.
+
+    Args:
+        submit_tasks (callable): Submits the tasks to the executor it is given and
+            returns the mapping of Future to file type.
+
+    Returns:
+        dict: A mapping of Future to file type.
+    """
+    try:
+        return submit_tasks(get_executor())
+    except BrokenProcessPool:
+        logging.warning("Generation process pool is broken, restarting it.")
+        reset_executor()
+        return submit_tasks(get_executor())
+
+
+def submit_batch(file_types, options):
+    """
+    Submit one generation task per file type to the process pool.
+
+    Args:
+        file_types (list): The file types to generate.
+        options (dict): The generation options keyed by GENERATION_OPTIONS.
+
+    Returns:
+        dict: A mapping of Future to file type.
+    """
+    return _submit(lambda executor: {
+        executor.submit(_generate_in_worker, file_type, options): file_type for file_type in file_types
+    })
+
+
+def submit_large(file_type, target_size, url_type='malicious'):
+    """
+    Submit the generation of a size-targeted file to the process pool.
+
+    The file occupies one worker until it is complete, which can take a while for
+    sizes in the gigabytes.
+
+    Args:
+        file_type (str): One of large_files.LARGE_FILE_WRITERS.
+        target_size (int): The requested size in bytes.
+        url_type (str): Type of URL to include ("malicious", "clean" or "none").
+
+    Returns:
+        dict: A mapping of the Future to the file type.
+    """
+    return _submit(lambda executor: {
+        executor.submit(_generate_large_in_worker, file_type, target_size, url_type): file_type
+    })
+
+
+def collect_result(future, file_type):
+    """
+    Turn a finished Future into a generation result, even if the worker failed.
+
+    Args:
+        future (Future): The finished future.
+        file_type (str): The file type the future was generating.
+
+    Returns:
+        dict: The generation result (see _generate_in_worker).
+    """
+    try:
+        return future.result()
+    except BrokenProcessPool as e:
+        logging.error(f"Generation worker died while generating '{file_type}': {e}")
+        reset_executor()
+        return {'file_type': file_type, 'filename': None, 'error': str(e), 'elapsed': None, 'pid': None}
+    except Exception as e:
+        logging.error(f"Error generating file of type '{file_type}': {e}", exc_info=True)
+        return {'file_type': file_type, 'filename': None, 'error': str(e), 'elapsed': None, 'pid': None}
+
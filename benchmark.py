@@ -0,0 +1,352 @@
+# benchmark.py
+
+"""
+Generator Benchmark Suite for CP Demo Server
+
+Runs every file generator across the feature-flag matrix and records, per case,
+the wall time, CPU time, peak RSS and output size. Results are written as JSON and
+can be compared against a saved baseline to catch performance regressions in
+file_generator.py.
+
+Usage (from the directory containing the app package):
+    python -m app.benchmark --output results.json
+    python -m app.benchmark --save-baseline baseline.json
+    python -m app.benchmark --baseline baseline.json --threshold wall=0.2 --threshold rss=0.1
+
+The command exits with status 1 if a case regressed beyond its threshold.
+
+Notes:
+- Peak RSS is measured per case on Linux (VmHWM is reset through /proc/self/clear_refs);
+  elsewhere it is the peak of the whole process.
+- Generated files are removed again after each call unless --keep-files is given.
+- Cases that fail (e.g. the EXE generator without mingw-w64) are reported with
+  their error and skipped in comparisons.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import itertools
+import statistics
+from datetime import datetime
+from app import logging
+from app import file_generator
+from app.rng import seeded
+from app.db import get_file_alias, find_generated_files, delete_generated_file
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+IMAGE_TYPES = ['jpg', 'png', 'bmp', 'gif', 'tiff']
+BINARY_TYPES = ['exe', 'dylib', 'elf']
+URL_TYPES = ['malicious', 'clean', 'none']
+
+# Feature flags of generate_pdf, in its argument order
+PDF_FLAGS = [
+    'include_image', 'include_script', 'include_video', 'include_audio', 'include_sensitive_link',
+    'include_3d', 'include_pdf', 'include_external_app', 'include_data_submission',
+]
+
+# Default relative increase tolerated for each metric before a case counts as a regression
+DEFAULT_THRESHOLDS = {'wall': 0.25, 'cpu': 0.25, 'rss': 0.20, 'size': 0.10}
+
+# Time differences below this many milliseconds are treated as noise
+DEFAULT_MIN_DELTA_MS = 1.0
+
+METRIC_KEYS = {'wall': 'wall_ms', 'cpu': 'cpu_ms', 'rss': 'peak_rss_kb', 'size': 'size_bytes'}
+
+# ===========================
+# Case Matrix
+# ===========================
+
+def _flags_id(flags):
+    """Short id of the enabled flags of a case (e.g. 'image+script' or 'none')."""
+    enabled = [name.replace('include_', '') for name, value in flags.items() if value == 'on']
+    return '+'.join(enabled) or 'none'
+
+
+def build_cases(full_pdf_matrix=False):
+    """
+    Build the list of benchmark cases.
+
+    The PDF generator has nine flags; by default each flag is benchmarked on its
+    own and all together, for every URL type. The full 2^9 matrix per URL type is
+    available with full_pdf_matrix.
+
+    Args:
+        full_pdf_matrix (bool): Benchmark every combination of the PDF flags.
+
+    Returns:
+        list: (case id, generator, args) tuples.
+    """
+    cases = []
+
+    if full_pdf_matrix:
+        pdf_flag_sets = [dict(zip(PDF_FLAGS, values)) for values in itertools.product(['off', 'on'], repeat=len(PDF_FLAGS))]
+    else:
+        pdf_flag_sets = [dict.fromkeys(PDF_FLAGS, 'off'), dict.fromkeys(PDF_FLAGS, 'on')]
+        pdf_flag_sets += [dict(dict.fromkeys(PDF_FLAGS, 'off'), **{flag: 'on'}) for flag in PDF_FLAGS]
+
+    for url_type in URL_TYPES:
+        for flags in pdf_flag_sets:
+            cases.append((f"pdf/{url_type}/{_flags_id(flags)}", file_generator.generate_pdf, (url_type, *(flags[name] for name in PDF_FLAGS))))
+
+    document_generators = [
+        ('docx', file_generator.generate_docx),
+        ('pptx', file_generator.generate_pptx),
+        ('rtf', file_generator.generate_rtf),
+        ('xlsx', file_generator.generate_xlsx),
+    ]
+    for (kind, generator), url_type, include_image, include_sensitive_link in itertools.product(document_generators, URL_TYPES, ['off', 'on'], ['off', 'on']):
+        flags = {'include_image': include_image, 'include_sensitive_link': include_sensitive_link}
+        cases.append((f"{kind}/{url_type}/{_flags_id(flags)}", generator, (url_type, include_image, include_sensitive_link)))
+
+    for file_type, url_type, include_sensitive_link in itertools.product(IMAGE_TYPES, URL_TYPES, ['off', 'on']):
+        flags = {'include_sensitive_link': include_sensitive_link}
+        cases.append((f"{file_type}/{url_type}/{_flags_id(flags)}", file_generator.generate_image, (file_type, url_type, include_sensitive_link)))
+
+    for kind in BINARY_TYPES:
+        cases.append((f"{kind}", getattr(file_generator, f"generate_{kind}"), ()))
+
+    return cases
+
+# ===========================
+# Measurement
+# ===========================
+
+def reset_peak_rss():
+    """Reset the peak RSS of the process, where the platform allows it (Linux)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_kb():
+    """
+    Return the peak RSS of the process in KB.
+
+    Returns:
+        int or None: VmHWM on Linux, ru_maxrss elsewhere, None if unavailable.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss // 1024 if sys.platform == 'darwin' else maxrss
+
+
+def _cpu_seconds():
+    """CPU time of the process and of its finished children (e.g. the compilers)."""
+    children = os.times()
+    return time.process_time() + children.children_user + children.children_system
+
+
+def _discard(filename):
+    """Remove a file written by a benchmarked generator, unless it is a recorded generated file."""
+    if not find_generated_files(names=[filename]):
+        delete_generated_file(filename)
+
+
+def run_case(generator, args, repeat, keep_files=False):
+    """
+    Benchmark a single case.
+
+    The generator is called once to warm up, then repeat times, each call inside
+    rng.seeded(iteration), so outputs (and their sizes) are the same between runs.
+
+    Args:
+        generator (callable): The generate_* function.
+        args (tuple): Its arguments.
+        repeat (int): The number of measured calls.
+        keep_files (bool): Keep the generated files instead of removing them.
+
+    Returns:
+        dict: The median wall and CPU time (ms), the peak RSS (KB) and the low median
+        output size (bytes), or the error if the generator failed.
+    """
+    walls, cpus, sizes, peaks = [], [], [], []
+    for iteration in range(repeat + 1):
+        reset_peak_rss()
+        cpu_started = _cpu_seconds()
+        started = time.perf_counter()
+        try:
+            with seeded(iteration):
+                filename = generator(*args)
+        except Exception as e:
+            return {'error': str(e)}
+        wall = time.perf_counter() - started
+        cpu = _cpu_seconds() - cpu_started
+        peak = peak_rss_kb()
+
+        if not filename:
+            return {'error': "Generator returned no file."}
+        alias = get_file_alias(filename)
+        if not keep_files:
+            _discard(filename)
+
+        if iteration == 0:
+            continue  # Warm-up call (templates, fonts, compiler cache)
+        walls.append(wall * 1000)
+        cpus.append(cpu * 1000)
+        sizes.append(alias[1] if alias else None)
+        peaks.append(peak)
+
+    return {
+        'wall_ms': round(statistics.median(walls), 3),
+        'cpu_ms': round(statistics.median(cpus), 3),
+        'peak_rss_kb': max(peaks) if None not in peaks else None,
+        'size_bytes': statistics.median_low(sizes) if None not in sizes else None,
+    }
+
+
+def run_benchmarks(cases, repeat, keep_files=False):
+    """
+    Benchmark a list of cases.
+
+    Args:
+        cases (list): (case id, generator, args) tuples from build_cases.
+        repeat (int): The number of measured calls per case.
+        keep_files (bool): Keep the generated files instead of removing them.
+
+    Returns:
+        dict: The run metadata and the results keyed by case id.
+    """
+    results = {}
+    for index, (case_id, generator, args) in enumerate(cases, 1):
+        results[case_id] = run_case(generator, args, repeat, keep_files)
+        print(f"[{index}/{len(cases)}] {case_id}: {_format_result(results[case_id])}", file=sys.stderr)
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def _format_result(result):
+    """One-line summary of a case result."""
+    if 'error' in result:
+        return f"error: {result['error']}"
+    return f"{result['wall_ms']:.2f} ms wall, {result['cpu_ms']:.2f} ms cpu, {result['peak_rss_kb']} KB peak RSS, {result['size_bytes']} bytes"
+
+# ===========================
+# Baseline Comparison
+# ===========================
+
+def compare(results, baseline, thresholds, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """
+    Compare a run against a baseline.
+
+    Args:
+        results (dict): The run, as returned by run_benchmarks.
+        baseline (dict): The baseline run.
+        thresholds (dict): The tolerated relative increase per metric ('wall', 'cpu', 'rss', 'size').
+        min_delta_ms (float): Time increases below this many milliseconds are ignored.
+
+    Returns:
+        list: One dictionary per regression with the case id, metric, baseline
+        value, new value and relative change.
+    """
+    regressions = []
+    for case_id, result in results['results'].items():
+        base = baseline['results'].get(case_id)
+        if base is None or 'error' in base or 'error' in result:
+            continue
+        for metric, threshold in thresholds.items():
+            key = METRIC_KEYS[metric]
+            old, new = base.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            if metric in ('wall', 'cpu') and new - old < min_delta_ms:
+                continue
+            change = (new - old) / old
+            if change > threshold:
+                regressions.append({'case': case_id, 'metric': metric, 'baseline': old, 'value': new, 'change': round(change, 4)})
+    return regressions
+
+
+def parse_thresholds(values):
+    """
+    Parse --threshold metric=ratio options over DEFAULT_THRESHOLDS.
+
+    Raises:
+        ValueError: For an unknown metric or a malformed value.
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for value in values or []:
+        metric, _, ratio = value.partition('=')
+        if metric not in METRIC_KEYS:
+            raise ValueError(f"Unknown metric '{metric}' (expected one of {', '.join(METRIC_KEYS)}).")
+        thresholds[metric] = float(ratio)
+    return thresholds
+
+# ===========================
+# Command Line
+# ===========================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the CP Demo Server file generators.")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--baseline', help="Compare the results against this JSON file.")
+    parser.add_argument('--save-baseline', metavar='PATH', help="Write the results to PATH as the new baseline.")
+    parser.add_argument('--threshold', action='append', metavar='METRIC=RATIO',
+                        help="Tolerated relative increase for wall, cpu, rss or size (e.g. wall=0.2). Repeatable.")
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="Ignore time increases smaller than this (default: %(default)s ms).")
+    parser.add_argument('--repeat', type=int, default=5, help="Measured calls per case (default: %(default)s).")
+    parser.add_argument('--filter', help="Only run the cases whose id starts with this prefix (e.g. pdf/ or docx/malicious).")
+    parser.add_argument('--full-pdf-matrix', action='store_true', help="Benchmark every combination of the PDF flags.")
+    parser.add_argument('--keep-files', action='store_true', help="Keep the generated files.")
+    args = parser.parse_args(argv)
+
+    try:
+        thresholds = parse_thresholds(args.threshold)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # The generators log every file at INFO level
+    logging.getLogger().setLevel(logging.WARNING)
+
+    cases = build_cases(args.full_pdf_matrix)
+    if args.filter:
+        cases = [case for case in cases if case[0].startswith(args.filter)]
+    results = run_benchmarks(cases, max(args.repeat, 1), args.keep_files)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as file:
+                json.dump(results, file, indent=2)
+            print(f"Results written to {path}.", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, thresholds, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression['case']} {regression['metric']}: {regression['baseline']} -> {regression['value']} "
+                  f"(+{regression['change']:.1%}, threshold {thresholds[regression['metric']]:.0%})")
+        print(f"{len(regressions)} regression(s) against {args.baseline}.")
+        return 1 if regressions else 0
+
+    if not args.output and not args.save_baseline:
+        json.dump(results, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+# binary_templates.py
+
+"""
+Compile-Once Binary Templates for CP Demo Server
+
+The EXE, ELF and dylib generators only differ from one call to the next by a
+single integer (unique_value). Instead of writing a C file and spawning the
+compiler for every file, each binary is compiled once with a known marker
+constant; new variants are produced by patching that constant in the cached
+bytes.
+
+Usage:
+    data = render_binary('exe', 4242)
+
+Dependencies:
+- gcc: For the ELF and dylib templates.
+- x86_64-w64-mingw32-gcc: For the Windows EXE template (sudo apt-get install mingw-w64).
+"""
+
+import struct
+import threading
+from app import logging
+from app.compile_cache import compile_cached
+
+# Placeholder value of unique_value in the compiled templates
+MARKER = 0x5CD3A7E1
+
+# Source, compiler and flags for every binary type
+TEMPLATES = {
+    'exe': {
+        'compiler': 'x86_64-w64-mingw32-gcc',
+        'flags': [],
+        'source': """
+#include <stdio.h>
+#include <stdlib.h>
+
+// Patched for every generated file to make the EXE unique
+volatile int unique_value = {marker};
+
+int main() {{
+    printf("This is a unique EXE message! The random value is: %d\\n", unique_value);
+
+    // Wait for user to press Enter before closing
+    printf("Press Enter to exit...\\n");
+    getchar();  // Wait for the user to press Enter
+
+    return 0;
+}}
+""",
+    },
+    'dylib': {
+        'compiler': 'gcc',
+        'flags': [],
+        'source': """
+#include <stdio.h>
+#include <stdlib.h>
+
+// Patched for every generated file to make the dylib unique
+volatile int unique_value = {marker};
+
+int main() {{
+    printf("This is a unique dylib message! The random value is: %d\\n", unique_value);
+
+    // Wait for user to press Enter before closing
+    printf("Press Enter to exit...\\n");
+    getchar();  // Wait for the user to press Enter
+
+    return 0;
+}}
+""",
+    },
+    'elf': {
+        'compiler': 'gcc',
+        'flags': ['-shared', '-fPIC'],
+        'source': """
+#include <stdio.h>
+
+// Patched for every generated file to make the ELF unique
+volatile int unique_value = {marker};
+
+void display_message() {{
+    printf("This is a unique ELF message! The random value is: %d\\n", unique_value);
+}}
+""",
+    },
+}
+
+_MARKER_BYTES = struct.pack('<i', MARKER)
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+# ===========================
+# Template Compilation
+# ===========================
+
+def compile_template(kind):
+    """
+    Compile the template for a binary type and locate its marker.
+
+    The compiler output comes from compile_cache, so a template is only really
+    compiled once per source/compiler/flags combination.
+
+    Args:
+        kind (str): The binary type ('exe', 'dylib' or 'elf').
+
+    Returns:
+        tuple: The compiled bytes and the offset of the marker constant.
+
+    Raises:
+        subprocess.CalledProcessError: If the compiler fails.
+        FileNotFoundError: If the compiler is not installed.
+        ValueError: If the marker is not found exactly once in the output.
+    """
+    template = TEMPLATES[kind]
+    source = template['source'].format(marker=f"0x{MARKER:08X}")
+    data = compile_cached(source, template['compiler'], template['flags'])
+
+    if data.count(_MARKER_BYTES) != 1:
+        raise ValueError(f"Marker found {data.count(_MARKER_BYTES)} times in the {kind} template.")
+    return data, data.index(_MARKER_BYTES)
+
+
+def get_template(kind):
+    """
+    Return the compiled template for a binary type, compiling it on first use.
+
+    Args:
+        kind (str): The binary type ('exe', 'dylib' or 'elf').
+
+    Returns:
+        tuple: The compiled bytes and the offset of the marker constant.
+    """
+    with _templates_lock:
+        if kind not in _templates:
+            _templates[kind] = compile_template(kind)
+        return _templates[kind]
+
+
+def warm_binary_templates():
+    """
+    Compile every binary template ahead of the first request.
+
+    Failures (e.g. a missing cross-compiler) are logged and retried on first use.
+    """
+    for kind in TEMPLATES:
+        try:
+            get_template(kind)
+        except Exception as e:
+            logging.warning(f"Could not compile the {kind} template: {e}")
+
+# ===========================
+# Variant Rendering
+# ===========================
+
+def render_binary(kind, unique_value):
+    """
+    Produce a binary variant by patching unique_value into the cached template.
+
+    Args:
+        kind (str): The binary type ('exe', 'dylib' or 'elf').
+        unique_value (int): The value printed by the generated binary.
+
+    Returns:
+        bytes: The patched binary.
+    """
+    data, offset = get_template(kind)
+    patched = bytearray(data)
+    patched[offset:offset + len(_MARKER_BYTES)] = struct.pack('<i', unique_value)
+    return bytes(patched)
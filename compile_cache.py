@@ -0,0 +1,177 @@
+# compile_cache.py
+
+"""
+Compiler Output Cache for CP Demo Server
+
+Compiled binaries are stored on disk under a key derived from the SHA-256 of the
+source text, the compiler and its flags, so the same variant is never compiled
+twice. The cache is bounded by total size and evicts the least recently used
+entries first.
+
+Configuration:
+- CP_COMPILE_CACHE_DIR: Cache directory (defaults to data/compile_cache).
+- CP_COMPILE_CACHE_MAX_MB: Maximum total size of the cache in MB (defaults to 256).
+- CP_COMPILE_CACHE_SEED: Optional directory of cache entries copied in on first use,
+  e.g. to pre-seed a new container.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from app import logging
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CACHE_DIR = os.environ.get('CP_COMPILE_CACHE_DIR', os.path.join(BASE_DIR, 'data', 'compile_cache'))
+CACHE_MAX_BYTES = int(os.environ.get('CP_COMPILE_CACHE_MAX_MB', 256)) * 1024 * 1024
+SEED_DIR = os.environ.get('CP_COMPILE_CACHE_SEED')
+
+# Suffix of the cache entries (<sha256>.bin)
+ENTRY_SUFFIX = '.bin'
+
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+_seeded = False
+_seed_lock = threading.Lock()
+
+# ===========================
+# Cache Maintenance
+# ===========================
+
+def cache_key(source, compiler, flags):
+    """
+    Compute the cache key of a compilation.
+
+    Args:
+        source (str): The C source text.
+        compiler (str): The compiler executable.
+        flags (list): The compiler flags.
+
+    Returns:
+        str: The hex SHA-256 of the source, compiler and flags.
+    """
+    return hashlib.sha256(json.dumps([source, compiler, list(flags)]).encode('utf-8')).hexdigest()
+
+
+def seed_cache(seed_dir):
+    """
+    Copy pre-built cache entries from seed_dir into the cache.
+
+    Entries that already exist in the cache are left untouched.
+
+    Args:
+        seed_dir (str): Directory containing <sha256>.bin entries.
+
+    Returns:
+        int: The number of entries copied.
+    """
+    copied = 0
+    try:
+        with os.scandir(seed_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(ENTRY_SUFFIX):
+                    continue
+                target = os.path.join(CACHE_DIR, entry.name)
+                if not os.path.exists(target):
+                    shutil.copyfile(entry.path, target)
+                    copied += 1
+    except FileNotFoundError:
+        logging.warning(f"Compile cache seed directory not found: {seed_dir}")
+    logging.info(f"Seeded {copied} compile cache entries from {seed_dir}.")
+    return copied
+
+
+def _ensure_seeded():
+    """Seed the cache from SEED_DIR once per process."""
+    global _seeded
+    with _seed_lock:
+        if not _seeded:
+            _seeded = True
+            if SEED_DIR:
+                seed_cache(SEED_DIR)
+
+
+def evict(max_bytes=CACHE_MAX_BYTES):
+    """
+    Remove the least recently used entries until the cache fits in max_bytes.
+
+    Args:
+        max_bytes (int): The maximum total size of the cache.
+    """
+    entries = []
+    with os.scandir(CACHE_DIR) as scan:
+        for entry in scan:
+            if entry.is_file() and entry.name.endswith(ENTRY_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            logging.debug(f"Evicted compile cache entry: {path}")
+        except FileNotFoundError:
+            pass  # Evicted by another process
+
+# ===========================
+# Cached Compilation
+# ===========================
+
+def compile_cached(source, compiler, flags=()):
+    """
+    Compile C source text, reusing a cached output when one exists.
+
+    Args:
+        source (str): The C source text.
+        compiler (str): The compiler executable (e.g., 'gcc').
+        flags (list): Extra compiler flags.
+
+    Returns:
+        bytes: The compiled output.
+
+    Raises:
+        subprocess.CalledProcessError: If the compiler fails.
+        FileNotFoundError: If the compiler is not installed.
+    """
+    _ensure_seeded()
+    key = cache_key(source, compiler, flags)
+    cache_path = os.path.join(CACHE_DIR, key + ENTRY_SUFFIX)
+
+    try:
+        with open(cache_path, "rb") as cached:
+            data = cached.read()
+        os.utime(cache_path)  # Mark as recently used
+        logging.debug(f"Compile cache hit: {key}")
+        return data
+    except FileNotFoundError:
+        logging.debug(f"Compile cache miss: {key}")
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        c_file_path = os.path.join(build_dir, "source.c")
+        output_path = os.path.join(build_dir, "output")
+        with open(c_file_path, "w") as c_file:
+            c_file.write(source)
+
+        logging.info(f"Compiling with {compiler} {' '.join(flags)}.")
+        subprocess.run(
+            [compiler, *flags, c_file_path, '-o', output_path],
+            check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        with open(output_path, "rb") as output_file:
+            data = output_file.read()
+
+    # Publish atomically so concurrent processes never read a partial entry
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    with os.fdopen(fd, "wb") as tmp_file:
+        tmp_file.write(data)
+    os.replace(tmp_path, cache_path)
+
+    evict()
+    return data
@@ -5,23 +5,45 @@ Database Module for CP Demo Server
 
 This module manages interactions with two SQLite databases:
 1. protections.db - Stores protection records.
-2. generated_files.db - Stores records of files generated by the application.
+2. generated_files.db - Stores records of files generated by the application, the
+   aliases mapping their names to content-addressed objects (see file_store) and
+   the pre-generated files waiting to be claimed (see inventory).
+
+Connections are pooled: every database has a pool of long-lived connections opened
+in WAL mode with a busy timeout, which the functions below borrow for the duration
+of one operation. WAL lets readers proceed while a writer commits, the busy timeout
+makes concurrent writers (threads or processes) wait for each other instead of
+failing, and each connection keeps its prepared statements cached. Processes forked
+from the server (the generation workers) start with empty pools.
+
+Configuration:
+- CP_DB_POOL_SIZE: Idle connections kept per database (default 8).
+- CP_DB_BUSY_TIMEOUT_MS: How long to wait for a lock held by another connection (default 5000).
 
 Dependencies:
 - sqlite3: To interact with SQLite databases.
 - csv: To read data from CSV files.
 - os: To handle file system operations.
 - re: For regular expression operations.
+- hashlib: To fingerprint the protections CSV and its rows.
 - datetime: To manage date and time.
 - logging: To log events for debugging and monitoring.
 """
 
 import sqlite3
 import csv
+import io
 import os
 import re
+import hashlib
+import time
+import queue
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
 from datetime import datetime
 from app import logging
+from app.file_store import object_path, remove_object, clear_objects, OBJECTS_DIR
 # Paths to the databases
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
@@ -42,202 +64,316 @@ os.makedirs(DATA_DIR, exist_ok=True)
 # Create a logging object
 #logging = logging.getlogging(__name__)
 
+# ===========================
+# Connection Pool
+# ===========================
+
+POOL_SIZE = int(os.environ.get('CP_DB_POOL_SIZE', '8'))
+
+BUSY_TIMEOUT_MS = int(os.environ.get('CP_DB_BUSY_TIMEOUT_MS', '5000'))
+
+# Prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 128
+
+_pools = {}
+
+# Pools inherited from the parent process, kept referenced so their connections are never used or closed
+_inherited = []
+
+
+def _open_connection(path):
+    """Open a connection to a database, in WAL mode and with a busy timeout."""
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,  # Pooled connections move between threads, one at a time
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+    except sqlite3.Error as e:
+        logging.warning(f"Could not switch {path} to WAL mode: {e}")
+    logging.debug(f"Opened a database connection to {path}.")
+    return conn
+
+
+@contextmanager
+def connection(path):
+    """
+    Borrow a pooled connection to a database.
+
+    A transaction left open by an exception is rolled back before the connection
+    goes back to the pool; writers still commit themselves.
+
+    Args:
+        path (str): The database file (PROTECTIONS_DB or FILES_DB).
+
+    Yields:
+        sqlite3.Connection: A connection used by the calling thread only until the block ends.
+    """
+    pool = _pools.get(path)
+    if pool is None:
+        pool = _pools.setdefault(path, queue.LifoQueue(maxsize=POOL_SIZE))
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection(path)
+
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+def _reset_after_fork():
+    """Give forked processes empty pools, SQLite connections must not be shared across a fork."""
+    global _pools
+    _inherited.append(_pools)
+    _pools = {}
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
 # ===========================
 # Database Initialization
 # ===========================
 
-def init_db():
+def init_db(reset=False):
     """
     Initialize the protections database by creating the 'protections' table.
 
-    **Warning**: This function drops the existing 'protections' table, which will **delete all existing records**.
-    Use with caution to avoid unintended data loss.
+    The table is kept across restarts, load_csv_to_db only re-imports the CSV when
+    it changed. A table created before rows were fingerprinted is recreated.
+
+    **Warning**: With reset=True all existing records are deleted (they are imported
+    again from the CSV by the next load_csv_to_db).
+
+    Args:
+        reset (bool): Drop the existing 'protections' table first.
     """
     try:
         
         logging.info("Initializing protections database.")
         # Connect to the protections database (creates the file if it doesn't exist)
-        conn = sqlite3.connect(PROTECTIONS_DB)
-        cursor = conn.cursor()
-        
-        # Drop the protections table if it exists to ensure a fresh start
-        logging.debug("Dropping existing 'protections' table if it exists.")
-        cursor.execute('DROP TABLE IF EXISTS protections')
-        
-        # Create the protections table with specified columns
-        logging.debug("Creating 'protections' table.")
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS protections (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ProtectionName TEXT,
-            IndustryReference TEXT,
-            Method TEXT,
-            Resource TEXT,
-            Service TEXT,
-            ConfidenceLevel TEXT,
-            Severity TEXT,
-            PerformanceImpact TEXT,
-            Agent TEXT
-        )
-        ''')
-        
-        # Commit the changes and close the connection
-        conn.commit()
-        logging.info("'protections' table created successfully.")
+        with connection(PROTECTIONS_DB) as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('PRAGMA table_info(protections)')
+            columns = [row[1] for row in cursor.fetchall()]
+            if reset or (columns and 'RowHash' not in columns):
+                # Drop the protections table and forget the imported CSV, so it is loaded again
+                logging.debug("Dropping existing 'protections' table if it exists.")
+                cursor.execute('DROP TABLE IF EXISTS protections')
+                cursor.execute('DROP TABLE IF EXISTS csv_imports')
+
+            # Create the protections table with specified columns
+            logging.debug("Creating 'protections' table.")
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS protections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ProtectionName TEXT NOT NULL,
+                IndustryReference TEXT,
+                Method TEXT,
+                Resource TEXT NOT NULL,
+                Service TEXT,
+                ConfidenceLevel TEXT,
+                Severity TEXT,
+                PerformanceImpact TEXT,
+                Agent TEXT,
+                RowHash TEXT NOT NULL
+            )
+            ''')
+            # Index the protection name (looked up on every trigger) and the filters of the IPS page
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_protections_name ON protections (ProtectionName)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_protections_severity ON protections (Severity, ConfidenceLevel)')
+            # Rows are matched with the CSV by the hash of their content
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_protections_row_hash ON protections (RowHash)')
+
+            # Create the csv_imports table holding the fingerprint of the last imported CSV
+            logging.debug("Creating 'csv_imports' table.")
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS csv_imports (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                sha256 TEXT,
+                imported REAL
+            )
+            ''')
+
+            # Commit the changes
+            conn.commit()
+            logging.info("'protections' table created successfully.")
+        PROTECTIONS_CATALOG.invalidate()
     except sqlite3.Error as e:
         logging.error(f"SQLite error during init_db: {e}")
     except Exception as e:
         logging.error(f"Unexpected error during init_db: {e}")
-    finally:
-        conn.close()
-        logging.debug("Database connection closed after init_db.")
 
-def init_db_for_generated_files():
+def init_db_for_generated_files(reset=False):
     """
     Initialize the generated_files database by creating the 'generated_files' table.
 
-    **Warning**: This function drops the existing 'generated_files' table, which will **delete all existing records**.
-    Use with caution to avoid unintended data loss.
+    The catalog is kept across restarts, reconcile_generated_files brings it back in
+    line with the files on disk.
+
+    **Warning**: With reset=True the existing 'generated_files' table is dropped, which
+    will **delete all existing records** (the stored files and their aliases are kept).
+
+    Args:
+        reset (bool): Drop the existing 'generated_files' table first.
     """
     try:
         logging.info("Initializing generated_files database.")
         # Connect to the generated_files database (creates the file if it doesn't exist)
-        conn = sqlite3.connect(FILES_DB)
-        cursor = conn.cursor()
-        
-        # Drop the generated_files table if it exists to ensure a fresh start
-        logging.debug("Dropping existing 'generated_files' table if it exists.")
-        cursor.execute('DROP TABLE IF EXISTS generated_files')
-        
-        # Create the generated_files table with specified columns
-        logging.debug("Creating 'generated_files' table.")
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS generated_files (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            type TEXT,
-            url_type TEXT,
-            include_image BOOLEAN,
-            include_sensitive_link BOOLEAN,
-            include_script BOOLEAN,
-            include_video BOOLEAN,
-            include_audio BOOLEAN,
-            include_3d BOOLEAN,
-            include_pdf BOOLEAN,
-            include_external_app BOOLEAN,
-            include_data_submission BOOLEAN
-        )
-        ''')
-        # Commit the changes and close the connection
-        conn.commit()
-        logging.info("'generated_files' table created successfully.")
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+
+            if reset:
+                # Drop the generated_files table if it exists to ensure a fresh start
+                logging.debug("Dropping existing 'generated_files' table if it exists.")
+                cursor.execute('DROP TABLE IF EXISTS generated_files')
+
+            # Create the generated_files table with specified columns
+            logging.debug("Creating 'generated_files' table.")
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS generated_files (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                type TEXT NOT NULL,
+                url_type TEXT,
+                include_image BOOLEAN,
+                include_sensitive_link BOOLEAN,
+                include_script BOOLEAN,
+                include_video BOOLEAN,
+                include_audio BOOLEAN,
+                include_3d BOOLEAN,
+                include_pdf BOOLEAN,
+                include_external_app BOOLEAN,
+                include_data_submission BOOLEAN
+            )
+            ''')
+            # File names are unique, the type and URL type are the filters of the TE page and bundles.
+            # Catalogs kept from before names were unique keep the first record of every name.
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_generated_files_name'")
+            if not cursor.fetchone():
+                cursor.execute('DELETE FROM generated_files WHERE id NOT IN (SELECT MIN(id) FROM generated_files GROUP BY name)')
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_generated_files_name ON generated_files (name)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_generated_files_type ON generated_files (type, url_type)')
+
+            # Create the file_aliases table mapping file names to stored objects
+            logging.debug("Creating 'file_aliases' table.")
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_aliases (
+                name TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                size INTEGER
+            )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_aliases_sha256 ON file_aliases (sha256)')
+
+            # Create the inventory table holding the pre-generated files that are not claimed yet
+            logging.debug("Creating 'inventory' table.")
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS inventory (
+                name TEXT PRIMARY KEY,
+                stock_key TEXT NOT NULL,
+                created REAL
+            )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_inventory_stock_key ON inventory (stock_key, created)')
+
+            # Create the seeded_outputs table caching the object produced by each seeded generation
+            logging.debug("Creating 'seeded_outputs' table.")
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS seeded_outputs (
+                output_key TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                size INTEGER,
+                created REAL
+            )
+            ''')
+
+            # Commit the changes
+            conn.commit()
+            logging.info("'generated_files' table created successfully.")
     except sqlite3.Error as e:
         logging.error(f"SQLite error during init_db_for_generated_files: {e}")
     except Exception as e:
         logging.error(f"Unexpected error during init_db_for_generated_files: {e}")
-    finally:
-        conn.close()
-        logging.debug("Database connection closed after init_db_for_generated_files.")
 
 # ===========================
 # Data Loading Functions
 # ===========================
 
-def load_csv_to_db():
+PROTECTIONS_CSV = os.path.join(DATA_DIR, 'ips_protections_demo.csv')
+
+# Columns stored for every protection, in insertion order
+PROTECTION_COLUMNS = (
+    'ProtectionName', 'Method', 'Resource', 'Agent', 'IndustryReference',
+    'Service', 'ConfidenceLevel', 'Severity', 'PerformanceImpact'
+)
+
+_IP_PATTERN = re.compile(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b')  # Regex for IP address
+
+
+def _protection_rows(content):
     """
-    Load data from a CSV file into the protections database.
+    Parse the protections CSV into the rows stored in the protections table.
 
-    This is intended to be a one-time import operation.
+    Args:
+        content (str): The CSV text.
 
-    The CSV should have the following columns:
-    - ProtectionName
-    - IndustryReference
-    - Method
-    - Resource
-    - Service
-    - ConfidenceLevel
-    - Severity
-    - PerformanceImpact
-    - Agent
+    Identical rows are all kept: the first one is keyed by the hash of its values,
+    the next ones by the hash followed by their occurrence (e.g. '<sha256>:1').
 
-    Notes:
-    - Rows with missing 'ProtectionName' or 'Resource' are skipped.
-    - Only rows where 'Service' is "http" are included.
-    - IP addresses in the 'Resource' field are detected and replaced with the placeholder "{{IP}}".
+    Returns:
+        dict: The row values (in PROTECTION_COLUMNS order) keyed by their RowHash.
     """
-    try:
-        logging.info("Starting to load CSV data into protections database.")
-        ip_pattern = re.compile(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b')  # Regex for IP address
-        
-        csv_path = os.path.join(DATA_DIR, 'ips_protections_demo.csv')
-        
-        if not os.path.exists(csv_path):
-            logging.error(f"CSV file not found: {csv_path}")
-            return
-        
-        with open(csv_path, mode='r') as file:
-            csv_file = csv.DictReader(file)
-            conn = sqlite3.connect(PROTECTIONS_DB)
-            cursor = conn.cursor()
-        
-            for line_number, line in enumerate(csv_file, start=2):  # Start at 2 considering header
-                # Skip rows with missing required fields
-                if not line.get('ProtectionName') or not line.get('Resource'):
-                    logging.warning(f"Skipping row {line_number}: Missing ProtectionName or Resource.")
-                    continue
-        
-                # Only include certain services, e.g., exclude non-HTTP
-                if line.get('Service', '').lower() != "http":
-                    logging.debug(f"Skipping row {line_number}: Service is not 'http'.")
-                    continue
-        
-                # Detect and replace IP address in the Resource field with {{IP}}
-                resource_with_placeholder = ip_pattern.sub("{{IP}}", line['Resource'])
-        
-                # Insert the processed data into the protections table
-                try:
-                    cursor.execute('''
-                        INSERT INTO protections (ProtectionName, Method, Resource, Agent, IndustryReference, Service, ConfidenceLevel, Severity, PerformanceImpact)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        line['ProtectionName'], 
-                        line['Method'], 
-                        resource_with_placeholder, 
-                        line.get('Agent', ''),
-                        line.get('IndustryReference', ''), 
-                        line.get('Service', ''),
-                        line.get('ConfidenceLevel', ''), 
-                        line.get('Severity', ''), 
-                        line.get('PerformanceImpact', '')
-                    ))
-                    logging.debug(f"Inserted row {line_number} into 'protections' table.")
-                except sqlite3.Error as e:
-                    logging.error(f"SQLite error on row {line_number}: {e}")
-                except Exception as e:
-                    logging.error(f"Unexpected error on row {line_number}: {e}")
-        
-            # Commit the transactions and close the connection
-            conn.commit()
-            logging.info("CSV data loaded successfully into protections database.")
-    except Exception as e:
-        logging.error(f"Unexpected error during load_csv_to_db: {e}")
-    finally:
-        try:
-            conn.close()
-            logging.debug("Database connection closed after load_csv_to_db.")
-        except:
-            pass  # Connection might have been closed already
+    rows, occurrences, incomplete, not_http = {}, Counter(), 0, 0
+    for line in csv.DictReader(io.StringIO(content, newline='')):
+        # Skip rows with missing required fields
+        if not line.get('ProtectionName') or not line.get('Resource'):
+            incomplete += 1
+            continue
 
-# ===========================
-# Data Retrieval Functions
-# ===========================
+        # Only include certain services, e.g., exclude non-HTTP
+        if (line.get('Service') or '').lower() != "http":
+            not_http += 1
+            continue
+
+        # Detect and replace IP address in the Resource field with {{IP}}
+        line['Resource'] = _IP_PATTERN.sub("{{IP}}", line['Resource'])
+        values = tuple(line.get(column) or '' for column in PROTECTION_COLUMNS)
+        row_hash = hashlib.sha256('\x1f'.join(values).encode('utf-8')).hexdigest()
+        occurrence = occurrences[row_hash]
+        occurrences[row_hash] += 1
+        rows[f"{row_hash}:{occurrence}" if occurrence else row_hash] = values
 
+    if incomplete or not_http:
+        logging.info(f"Skipped {incomplete} row(s) missing ProtectionName or Resource and {not_http} non-HTTP row(s).")
+    return rows
 
-def load_csv_to_db():
+
+def load_csv_to_db(csv_path=PROTECTIONS_CSV):
     """
-    Load data from a CSV file into the protections database.
+    Import the protections CSV into the protections database.
 
-    This is intended to be a one-time import operation.
+    The CSV is fingerprinted (size, modification time and SHA-256) and the import
+    is skipped when the fingerprint matches the last import. Otherwise only the
+    differences are written, in one transaction:
+    - a changed row is updated in place, keeping its id, when a row that is no
+      longer in the CSV has the same ProtectionName (paired in CSV order when the
+      name is used by several rows),
+    - the other new rows are inserted and the other rows no longer in the CSV are deleted.
+    Identical rows in the CSV are imported as separate rows.
 
     The CSV should have the following columns:
     - ProtectionName
@@ -254,101 +390,124 @@ def load_csv_to_db():
     - Rows with missing 'ProtectionName' or 'Resource' are skipped.
     - Only rows where 'Service' is "http" are included.
     - IP addresses in the 'Resource' field are detected and replaced with the placeholder "{{IP}}".
+
+    Args:
+        csv_path (str): The CSV file (default data/ips_protections_demo.csv).
     """
     try:
-        logging.info("Starting to load CSV data into protections database.")
-        ip_pattern = re.compile(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b')  # Regex for IP address
-        
-        csv_path = 'app/data/ips_protections_demo.csv'
-        
-        if not os.path.exists(csv_path):
-            logging.error(f"CSV file not found: {csv_path}")
-            return
-        
-        with open(csv_path, mode='r') as file:
-            csv_file = csv.DictReader(file)
-            conn = sqlite3.connect('app/data/protections.db')
+        stat = os.stat(csv_path)
+    except FileNotFoundError:
+        logging.error(f"CSV file not found: {csv_path}")
+        return
+
+    try:
+        with connection(PROTECTIONS_DB) as conn:
             cursor = conn.cursor()
-        
-            for line_number, line in enumerate(csv_file, start=2):  # Start at 2 considering header
-                # Skip rows with missing required fields
-                if not line.get('ProtectionName') or not line.get('Resource'):
-                    logging.warning(f"Skipping row {line_number}: Missing ProtectionName or Resource.")
-                    continue
-        
-                # Only include certain services, e.g., exclude non-HTTP
-                if line.get('Service', '').lower() != "http":
-                    logging.debug(f"Skipping row {line_number}: Service is not 'http'.")
-                    continue
-        
-                # Detect and replace IP address in the Resource field with {{IP}}
-                resource_with_placeholder = ip_pattern.sub("{{IP}}", line['Resource'])
-        
-                # Insert the processed data into the protections table
-                try:
-                    cursor.execute('''
-                        INSERT INTO protections (ProtectionName, Method, Resource, Agent, IndustryReference, Service, ConfidenceLevel, Severity, PerformanceImpact)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        line['ProtectionName'], 
-                        line['Method'], 
-                        resource_with_placeholder, 
-                        line.get('Agent', ''),
-                        line.get('IndustryReference', ''), 
-                        line.get('Service', ''),
-                        line.get('ConfidenceLevel', ''), 
-                        line.get('Severity', ''), 
-                        line.get('PerformanceImpact', '')
-                    ))
-                    logging.debug(f"Inserted row {line_number} into 'protections' table.")
-                except sqlite3.Error as e:
-                    logging.error(f"SQLite error on row {line_number}: {e}")
-                except Exception as e:
-                    logging.error(f"Unexpected error on row {line_number}: {e}")
-        
-            # Commit the transactions and close the connection
+            cursor.execute('SELECT size, mtime_ns, sha256, imported FROM csv_imports WHERE path = ?', (csv_path,))
+            imported = cursor.fetchone()
+            if imported and imported[:2] == (stat.st_size, stat.st_mtime_ns):
+                logging.info("Protections CSV unchanged since the last import, skipping it.")
+                return
+
+            with open(csv_path, 'rb') as file:
+                data = file.read()
+            sha256 = hashlib.sha256(data).hexdigest()
+
+            changed = not imported or imported[2] != sha256
+            if not changed:
+                logging.info("Protections CSV touched but unchanged since the last import, skipping it.")
+            else:
+                logging.info("Starting to load CSV data into protections database.")
+                rows = _protection_rows(data.decode('utf-8-sig'))
+                cursor.execute('SELECT RowHash, ProtectionName FROM protections ORDER BY id')
+                existing = dict(cursor.fetchall())
+
+                # Rows no longer in the CSV, by name, to be reused by the changed rows
+                stale = defaultdict(list)
+                for row_hash, name in existing.items():
+                    if row_hash not in rows:
+                        stale[name].append(row_hash)
+
+                updated, added = [], []
+                for row_hash, values in rows.items():
+                    if row_hash in existing:
+                        continue
+                    reused = stale.get(values[PROTECTION_COLUMNS.index('ProtectionName')])
+                    if reused:
+                        updated.append((*values, row_hash, reused.pop(0)))
+                    else:
+                        added.append((*values, row_hash))
+                removed = [row_hash for row_hashes in stale.values() for row_hash in row_hashes]
+
+                cursor.executemany('DELETE FROM protections WHERE RowHash = ?', ((row_hash,) for row_hash in removed))
+                cursor.executemany(f'''
+                    UPDATE protections SET {', '.join(f'{column} = ?' for column in PROTECTION_COLUMNS)}, RowHash = ?
+                    WHERE RowHash = ?
+                ''', updated)
+                cursor.executemany(f'''
+                    INSERT INTO protections ({', '.join(PROTECTION_COLUMNS)}, RowHash)
+                    VALUES ({', '.join('?' * (len(PROTECTION_COLUMNS) + 1))})
+                ''', added)
+                logging.info(f"Protections CSV imported: {len(added)} row(s) added, {len(updated)} changed, "
+                             f"{len(removed)} removed, {len(rows) - len(added) - len(updated)} unchanged.")
+
+            # Record the fingerprint in the same transaction as the rows, the import time
+            # only moves when the rows did (it versions the protections catalog)
+            cursor.execute(
+                'INSERT OR REPLACE INTO csv_imports (path, size, mtime_ns, sha256, imported) VALUES (?, ?, ?, ?, ?)',
+                (csv_path, stat.st_size, stat.st_mtime_ns, sha256, time.time() if changed else imported[3])
+            )
             conn.commit()
-            logging.info("CSV data loaded successfully into protections database.")
+        if changed:
+            PROTECTIONS_CATALOG.invalidate()
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error during load_csv_to_db: {e}")
     except Exception as e:
         logging.error(f"Unexpected error during load_csv_to_db: {e}")
-    finally:
-        try:
-            conn.close()
-            logging.debug("Database connection closed after load_csv_to_db.")
-        except:
-            pass  # Connection might have been closed already
-
 
 # ===========================
 # Data Retrieval Functions
 # ===========================
 
-def load_protections():
+# Columns returned for every protection by load_protections and the protections catalog
+PROTECTIONS_QUERY = '''SELECT ProtectionName, IndustryReference, Method, Resource, Service, ConfidenceLevel, Severity,
+        PerformanceImpact, Agent FROM protections'''
+
+
+def load_protections(severity=None, confidence_level=None):
     """
-    Retrieve all protection records from the protections database.
+    Retrieve the protection records from the protections database.
+
+    Args:
+        severity (str, optional): Only return protections with this Severity.
+        confidence_level (str, optional): Only return protections with this ConfidenceLevel.
 
     Returns:
         list: A list of tuples, each representing a protection record.
     """
+    clauses, params = [], []
+    if severity:
+        clauses.append("Severity = ?")
+        params.append(severity)
+    if confidence_level:
+        clauses.append("ConfidenceLevel = ?")
+        params.append(confidence_level)
+
+    # Select all relevant columns from the protections table
+    query = PROTECTIONS_QUERY
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
     try:
         logging.info("Loading all protections from the database.")
-        conn = sqlite3.connect('app/data/protections.db')
-        cursor = conn.cursor()
-    
-        # Select all relevant columns from the protections table
-        cursor.execute('''
-            SELECT ProtectionName, IndustryReference, Method, Resource, Service, ConfidenceLevel, Severity, PerformanceImpact, Agent 
-            FROM protections
-        ''')
-    
-        # Fetch all rows from the executed query
-        data = cursor.fetchall()
-        logging.debug(f"Fetched {len(data)} records from 'protections' table.")
-    
-        conn.close()
-        logging.debug("Database connection closed after load_protections.")
-    
-        return data
+        with connection(PROTECTIONS_DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+
+            # Fetch all rows from the executed query
+            data = cursor.fetchall()
+            logging.debug(f"Fetched {len(data)} records from 'protections' table.")
+
+            return data
     except sqlite3.Error as e:
         logging.error(f"SQLite error during load_protections: {e}")
         return []
@@ -369,38 +528,37 @@ def get_protection_by_name(protection_name):
     """
     try:
         logging.info(f"Fetching protection by name: {protection_name}")
-        conn = sqlite3.connect('app/data/protections.db')
-        cursor = conn.cursor()
-    
-        # Select all relevant columns for the given protection name
-        cursor.execute('''
-            SELECT ProtectionName, IndustryReference, Method, Resource, Service, ConfidenceLevel, Severity, PerformanceImpact, Agent
-            FROM protections
-            WHERE ProtectionName = ?
-        ''', (protection_name,))
-    
-        result = cursor.fetchone()
-        conn.close()
-        logging.debug(f"Protection fetched: {result}")
-    
-        if result:
-            # Return the result as a dictionary
-            protection = {
-                'ProtectionName': result[0],
-                'IndustryReference': result[1],
-                'Method': result[2],
-                'Resource': result[3],
-                'Service': result[4],
-                'ConfidenceLevel': result[5],
-                'Severity': result[6],
-                'PerformanceImpact': result[7],
-                'Agent': result[8]
-            }
-            logging.info(f"Protection '{protection_name}' retrieved successfully.")
-            return protection
-        else:
-            logging.warning(f"Protection '{protection_name}' not found in the database.")
-            return None
+        with connection(PROTECTIONS_DB) as conn:
+            cursor = conn.cursor()
+
+            # Select all relevant columns for the given protection name
+            cursor.execute('''
+                SELECT ProtectionName, IndustryReference, Method, Resource, Service, ConfidenceLevel, Severity, PerformanceImpact, Agent
+                FROM protections
+                WHERE ProtectionName = ?
+            ''', (protection_name,))
+
+            result = cursor.fetchone()
+            logging.debug(f"Protection fetched: {result}")
+
+            if result:
+                # Return the result as a dictionary
+                protection = {
+                    'ProtectionName': result[0],
+                    'IndustryReference': result[1],
+                    'Method': result[2],
+                    'Resource': result[3],
+                    'Service': result[4],
+                    'ConfidenceLevel': result[5],
+                    'Severity': result[6],
+                    'PerformanceImpact': result[7],
+                    'Agent': result[8]
+                }
+                logging.info(f"Protection '{protection_name}' retrieved successfully.")
+                return protection
+            else:
+                logging.warning(f"Protection '{protection_name}' not found in the database.")
+                return None
     except sqlite3.Error as e:
         logging.error(f"SQLite error during get_protection_by_name: {e}")
         return None
@@ -409,6 +567,119 @@ def get_protection_by_name(protection_name):
         return None
 
 
+# ===========================
+# Protections Catalog Cache
+# ===========================
+
+class ProtectionsCatalog:
+    """
+    An in-memory copy of the protections table, indexed by protection name.
+
+    The copy is versioned by the last CSV import recorded in csv_imports. The importer
+    (load_csv_to_db, init_db) invalidates it in its own process, other processes
+    notice the new version within CHECK_INTERVAL.
+    """
+
+    # Seconds between two checks of the import version
+    CHECK_INTERVAL = 1.0
+
+    # Keys of the dictionaries returned by get(), in PROTECTIONS_QUERY order
+    FIELDS = (
+        'ProtectionName', 'IndustryReference', 'Method', 'Resource', 'Service',
+        'ConfidenceLevel', 'Severity', 'PerformanceImpact', 'Agent'
+    )
+
+    def __init__(self):
+        self._rows = []
+        self._by_name = {}
+        self._version = None
+        self._imported = None
+        self._loaded = False
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """Reload the protections if a new import happened. Caller holds the lock."""
+        now = time.monotonic()
+        if self._loaded and now - self._checked < self.CHECK_INTERVAL:
+            return
+        self._checked = now
+
+        try:
+            with connection(PROTECTIONS_DB) as conn:
+                row = conn.execute('SELECT sha256, imported FROM csv_imports ORDER BY imported DESC LIMIT 1').fetchone()
+                version, imported = row if row else (None, None)
+                if self._loaded and (version, imported) == (self._version, self._imported):
+                    return
+                rows = conn.execute(PROTECTIONS_QUERY).fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"SQLite error while loading the protections catalog: {e}")
+            return
+
+        by_name = {}
+        for row in rows:
+            # Like get_protection_by_name, the first protection of a name wins
+            by_name.setdefault(row[0], row)
+        self._rows, self._by_name = rows, by_name
+        self._version, self._imported = version, imported
+        self._loaded = True
+        logging.info(f"Loaded {len(rows)} protections into the catalog cache.")
+
+    def invalidate(self):
+        """Reload the protections on the next access."""
+        with self._lock:
+            self._loaded = False
+
+    def protections(self, severity=None, confidence_level=None):
+        """
+        Return the protections, like load_protections.
+
+        Args:
+            severity (str, optional): Only return protections with this Severity.
+            confidence_level (str, optional): Only return protections with this ConfidenceLevel.
+
+        Returns:
+            list: A list of tuples, each representing a protection record.
+        """
+        with self._lock:
+            self._refresh()
+            rows = self._rows
+        return [
+            row for row in rows
+            if (not severity or row[6] == severity) and (not confidence_level or row[5] == confidence_level)
+        ]
+
+    def get(self, protection_name):
+        """
+        Return a protection's details by its name, like get_protection_by_name.
+
+        Args:
+            protection_name (str): The name of the protection.
+
+        Returns:
+            dict or None: A dictionary of protection details if found, else None.
+        """
+        with self._lock:
+            self._refresh()
+            row = self._by_name.get(protection_name)
+        return dict(zip(self.FIELDS, row)) if row else None
+
+    def version(self):
+        """
+        Return the version of the cached protections.
+
+        Returns:
+            tuple: The SHA-256 of the imported CSV (None if nothing was imported) and
+            the Unix time of the import that last changed the protections (or None).
+        """
+        with self._lock:
+            self._refresh()
+            return self._version, self._imported
+
+
+PROTECTIONS_CATALOG = ProtectionsCatalog()
+
+
 # ===========================
 # Generated Files Management
 # ===========================
@@ -436,30 +707,35 @@ def save_generated_file_to_db(
     """
     try:
         logging.info(f"Saving generated file to database: {filename}")
-        conn = sqlite3.connect(FILES_DB)
-        cursor = conn.cursor()
-        
-        # Insert the generated file details into the generated_files table
-        cursor.execute('''INSERT INTO generated_files (
-            name, type, url_type, include_image, include_sensitive_link,
-            include_script, include_video, include_audio, include_3d,
-            include_pdf, include_external_app, include_data_submission
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
-            filename, file_type, url_type, include_image, include_sensitive_link,
-            include_script, include_video, include_audio, include_3d,
-            include_pdf, include_external_app, include_data_submission
-        ))
-        
-        # Commit the transaction and close the connection
-        conn.commit()
-        logging.info(f"Generated file '{filename}' saved successfully.")
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+
+            # Insert the generated file details into the generated_files table, a file
+            # regenerated under the same name keeps its record with the new details
+            cursor.execute('''INSERT INTO generated_files (
+                name, type, url_type, include_image, include_sensitive_link,
+                include_script, include_video, include_audio, include_3d,
+                include_pdf, include_external_app, include_data_submission
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET
+                type = excluded.type, url_type = excluded.url_type,
+                include_image = excluded.include_image, include_sensitive_link = excluded.include_sensitive_link,
+                include_script = excluded.include_script, include_video = excluded.include_video,
+                include_audio = excluded.include_audio, include_3d = excluded.include_3d,
+                include_pdf = excluded.include_pdf, include_external_app = excluded.include_external_app,
+                include_data_submission = excluded.include_data_submission''', (
+                filename, file_type, url_type, include_image, include_sensitive_link,
+                include_script, include_video, include_audio, include_3d,
+                include_pdf, include_external_app, include_data_submission
+            ))
+
+            # Commit the transaction
+            conn.commit()
+            logging.info(f"Generated file '{filename}' saved successfully.")
     except sqlite3.Error as e:
         logging.error(f"SQLite error during save_generated_file_to_db: {e}")
     except Exception as e:
         logging.error(f"Unexpected error during save_generated_file_to_db: {e}")
-    finally:
-        conn.close()
-        logging.debug("Database connection closed after save_generated_file_to_db.")
 
 
 def load_generated_files():
@@ -471,37 +747,34 @@ def load_generated_files():
     """
     try:
         logging.info("Loading all generated files from the database.")
-        conn = sqlite3.connect(FILES_DB)
-        cursor = conn.cursor()
-    
-        # Select all columns from the generated_files table
-        cursor.execute("SELECT * FROM generated_files")
-        rows = cursor.fetchall()
-    
-        # Format the data into a dictionary for easy access
-        files = []
-        for row in rows:
-            files.append({
-                'id': row[0],
-                'name': row[1],
-                'type': row[2],
-                'url_type': row[3],
-                'include_image': row[4],
-                'include_sensitive_link': row[5],
-                'include_script': row[6],
-                'include_audio': row[7],
-                'include_video': row[8],
-                'include_3d': row[9],
-                'include_pdf': row[10],
-                'include_external_app': row[11],
-                'include_data_submission': row[12]
-            })
-        logging.debug(f"Fetched {len(files)} records from 'generated_files' table.")
-    
-        conn.close()
-        logging.debug("Database connection closed after load_generated_files.")
-    
-        return files
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+
+            # Select all columns from the generated_files table
+            cursor.execute("SELECT * FROM generated_files")
+            rows = cursor.fetchall()
+
+            # Format the data into a dictionary for easy access
+            files = []
+            for row in rows:
+                files.append({
+                    'id': row[0],
+                    'name': row[1],
+                    'type': row[2],
+                    'url_type': row[3],
+                    'include_image': row[4],
+                    'include_sensitive_link': row[5],
+                    'include_script': row[6],
+                    'include_audio': row[7],
+                    'include_video': row[8],
+                    'include_3d': row[9],
+                    'include_pdf': row[10],
+                    'include_external_app': row[11],
+                    'include_data_submission': row[12]
+                })
+            logging.debug(f"Fetched {len(files)} records from 'generated_files' table.")
+
+            return files
     except sqlite3.Error as e:
         logging.error(f"SQLite error during load_generated_files: {e}")
         return []
@@ -510,6 +783,60 @@ def load_generated_files():
         return []
 
 
+def find_generated_files(names=None, file_types=None, url_type=None):
+    """
+    Retrieve the generated file records matching a selection or filter, with the
+    object each file is stored as.
+
+    Args:
+        names (list, optional): Only return the files with these names.
+        file_types (list, optional): Only return files of these types (e.g., ['pdf', 'docx']).
+        url_type (str, optional): Only return files with this URL type ('malicious', 'clean', 'none').
+
+    Returns:
+        list: A list of dictionaries with the columns of generated_files, plus the
+        'sha256' and 'size' of the stored object (None for legacy flat files).
+    """
+    clauses, params = [], []
+    # Large selections are filtered after the query to stay below SQLite's variable limit
+    if names and len(names) <= 500:
+        clauses.append(f"g.name IN ({', '.join('?' * len(names))})")
+        params.extend(names)
+    if file_types:
+        clauses.append(f"g.type IN ({', '.join('?' * len(file_types))})")
+        params.extend(file_types)
+    if url_type:
+        clauses.append("g.url_type = ?")
+        params.append(url_type)
+
+    query = '''SELECT g.name, g.type, g.url_type, g.include_image, g.include_sensitive_link,
+        g.include_script, g.include_video, g.include_audio, g.include_3d, g.include_pdf,
+        g.include_external_app, g.include_data_submission, a.sha256, a.size
+        FROM generated_files g LEFT JOIN file_aliases a ON a.name = g.name'''
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY g.id"
+
+    columns = (
+        'name', 'type', 'url_type', 'include_image', 'include_sensitive_link',
+        'include_script', 'include_video', 'include_audio', 'include_3d', 'include_pdf',
+        'include_external_app', 'include_data_submission', 'sha256', 'size'
+    )
+    try:
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            files = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            if names and len(names) > 500:
+                selected = set(names)
+                files = [file for file in files if file['name'] in selected]
+            logging.debug(f"Found {len(files)} generated files matching the selection.")
+            return files
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error during find_generated_files: {e}")
+        return []
+
+
 def get_generated_file_by_name(name):
     """
     Retrieve a generated file's details by its name.
@@ -523,17 +850,16 @@ def get_generated_file_by_name(name):
     try:
         logging.info(f"Fetching generated file by name: {name}")
         print(f"Fetching file details with name: {name}")  # Retaining the original print statement
-        conn = sqlite3.connect(FILES_DB)
-        cursor = conn.cursor()
-    
-        # Select all columns for the given file name
-        cursor.execute('SELECT * FROM generated_files WHERE name = ?', (name,))
-        row = cursor.fetchone()
-    
-        conn.close()
-        logging.debug(f"Generated file fetched: {row}")
-    
-        return row
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+
+            # Select all columns for the given file name
+            cursor.execute('SELECT * FROM generated_files WHERE name = ?', (name,))
+            row = cursor.fetchone()
+
+            logging.debug(f"Generated file fetched: {row}")
+
+            return row
     except sqlite3.Error as e:
         logging.error(f"SQLite error during get_generated_file_by_name: {e}")
         return None
@@ -542,6 +868,234 @@ def get_generated_file_by_name(name):
         return None
 
 
+# ===========================
+# File Alias Management
+# ===========================
+
+def add_file_alias(name, sha256, size):
+    """
+    Record a human-friendly file name for a stored object.
+
+    If the name is already taken by a different payload, the first 8 characters of
+    the SHA-256 (then the whole SHA-256) are appended to the name, so writes never
+    overwrite each other. Names are claimed with a single insert that fails on a
+    taken name, so concurrent writers (threads or processes) can't both get one.
+
+    Args:
+        name (str): The requested file name.
+        sha256 (str): The hex SHA-256 of the stored object.
+        size (int): The size of the object in bytes.
+
+    Returns:
+        str: The name the object was recorded under.
+    """
+    stem, extension = os.path.splitext(name)
+    candidates = (name, f"{stem}_{sha256[:8]}{extension}", f"{stem}_{sha256}{extension}")
+    try:
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+            for candidate in candidates:
+                cursor.execute(
+                    'INSERT INTO file_aliases (name, sha256, size) VALUES (?, ?, ?) ON CONFLICT (name) DO NOTHING',
+                    (candidate, sha256, size)
+                )
+                conn.commit()
+                if cursor.rowcount == 1:
+                    logging.debug(f"Alias '{candidate}' -> {sha256} saved.")
+                    return candidate
+
+                cursor.execute('SELECT sha256 FROM file_aliases WHERE name = ?', (candidate,))
+                row = cursor.fetchone()
+                if row and row[0] == sha256:
+                    logging.debug(f"Alias '{candidate}' -> {sha256} already saved.")
+                    return candidate
+                logging.info(f"File name '{candidate}' already taken by another payload.")
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error during add_file_alias: {e}")
+    return name
+
+
+def get_file_alias(name):
+    """
+    Retrieve the object behind a file name.
+
+    Args:
+        name (str): The file name.
+
+    Returns:
+        tuple or None: The (sha256, size) of the object if the alias exists, else None.
+    """
+    try:
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT sha256, size FROM file_aliases WHERE name = ?', (name,))
+            return cursor.fetchone()
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error during get_file_alias: {e}")
+        return None
+
+
+def resolve_generated_file_path(name):
+    """
+    Resolve a generated file name to the path of its content on disk.
+
+    Names are looked up in the alias index first; files written before the
+    content-addressed store existed are still found in GENERATED_FILES_DIR.
+
+    Args:
+        name (str): The file name.
+
+    Returns:
+        str or None: The path of the file, or None if it doesn't exist.
+    """
+    alias = get_file_alias(name)
+    if alias:
+        path = object_path(alias[0])
+        return path if os.path.exists(path) else None
+
+    # Legacy flat file, ensure the path stays within GENERATED_FILES_DIR
+    path = os.path.abspath(os.path.join(GENERATED_FILES_DIR, name))
+    if os.path.dirname(path) != GENERATED_FILES_DIR or not os.path.isfile(path):
+        return None
+    return path
+
+
+def _remove_file_alias(cursor, name):
+    """
+    Delete an alias and report whether the object it pointed to is still in use.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on the generated_files database.
+        name (str): The file name.
+
+    Returns:
+        tuple: (had_alias, sha256) where sha256 is the now unreferenced object, or None
+        if the object is still used by another alias (or there was no alias).
+    """
+    cursor.execute('SELECT sha256 FROM file_aliases WHERE name = ?', (name,))
+    row = cursor.fetchone()
+    if not row:
+        return False, None
+    cursor.execute('DELETE FROM file_aliases WHERE name = ?', (name,))
+    cursor.execute('SELECT 1 FROM file_aliases WHERE sha256 = ? LIMIT 1', row)
+    return True, None if cursor.fetchone() else row[0]
+
+
+# ===========================
+# Inventory Management
+# ===========================
+
+def add_inventory_file(name, stock_key):
+    """
+    Put a pre-generated file in stock.
+
+    Args:
+        name (str): The file name (an alias without a generated_files record).
+        stock_key (str): The key of the file type and generation options it was made with.
+    """
+    try:
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute('INSERT OR REPLACE INTO inventory (name, stock_key, created) VALUES (?, ?, ?)', (name, stock_key, time.time()))
+            conn.commit()
+            logging.debug(f"File '{name}' added to the inventory.")
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error during add_inventory_file: {e}")
+
+
+def claim_inventory_file(stock_key):
+    """
+    Take the oldest file in stock for a stock key out of the inventory.
+
+    The file is removed from the inventory by the same statement that checks it is
+    still there, so a file is never handed out twice, even across processes.
+
+    Args:
+        stock_key (str): The key of the file type and generation options.
+
+    Returns:
+        str or None: The claimed file name, or None if the stock is empty.
+    """
+    try:
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+            while True:
+                cursor.execute('SELECT name FROM inventory WHERE stock_key = ? ORDER BY created LIMIT 1', (stock_key,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                cursor.execute('DELETE FROM inventory WHERE name = ?', row)
+                conn.commit()
+                if cursor.rowcount == 1:
+                    return row[0]
+                # Claimed by someone else in the meantime, try the next one
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error during claim_inventory_file: {e}")
+        return None
+
+
+def count_inventory_files():
+    """
+    Count the files in stock for every stock key.
+
+    Returns:
+        dict: The number of files in stock keyed by stock key.
+    """
+    try:
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT stock_key, COUNT(*) FROM inventory GROUP BY stock_key')
+            return dict(cursor.fetchall())
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error during count_inventory_files: {e}")
+        return {}
+
+# ===========================
+# Seeded Output Cache
+# ===========================
+
+def add_seeded_output(output_key, sha256, size):
+    """
+    Remember the object produced by a seeded generation.
+
+    Args:
+        output_key (str): The key of the seeded generation (see file_generator.output_key).
+        sha256 (str): The hex SHA-256 of the stored object.
+        size (int): The size of the object in bytes.
+    """
+    try:
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'INSERT OR REPLACE INTO seeded_outputs (output_key, sha256, size, created) VALUES (?, ?, ?, ?)',
+                (output_key, sha256, size, time.time())
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error during add_seeded_output: {e}")
+
+
+def get_seeded_output(output_key):
+    """
+    Retrieve the object produced by an earlier seeded generation.
+
+    Args:
+        output_key (str): The key of the seeded generation.
+
+    Returns:
+        tuple or None: The (sha256, size) of the object, or None if it isn't cached.
+    """
+    try:
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT sha256, size FROM seeded_outputs WHERE output_key = ?', (output_key,))
+            row = cursor.fetchone()
+            return tuple(row) if row else None
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error during get_seeded_output: {e}")
+        return None
+
+
 # ===========================
 # File Deletion Functions
 # ===========================
@@ -553,24 +1107,31 @@ def delete_generated_file(filename):
     Args:
         filename (str): The name of the file to delete.
     """
+    had_alias, unreferenced = False, None
     try:
         logging.info(f"Attempting to delete generated file: {filename}")
-        conn = sqlite3.connect(FILES_DB)  # Connect to the generated_files database
-        cursor = conn.cursor()
-    
-        # Delete the file record from the database
-        cursor.execute("DELETE FROM generated_files WHERE name = ?", (filename,))
-        conn.commit()
-        logging.info(f"File '{filename}' deleted from database.")
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+
+            # Delete the file record and its alias from the database
+            cursor.execute("DELETE FROM generated_files WHERE name = ?", (filename,))
+            had_alias, unreferenced = _remove_file_alias(cursor, filename)
+            conn.commit()
+            logging.info(f"File '{filename}' deleted from database.")
     except sqlite3.Error as e:
         logging.error(f"SQLite error during delete_generated_file: {e}")
     except Exception as e:
         logging.error(f"Unexpected error during delete_generated_file: {e}")
-    finally:
-        conn.close()
-        logging.debug("Database connection closed after delete_generated_file.")
     
-    # Delete the file from the filesystem
+    # Delete the stored object once no other file name refers to it
+    if unreferenced:
+        remove_object(unreferenced)
+        return
+    if had_alias:
+        logging.info(f"Content of '{filename}' is still used by another file, keeping it.")
+        return
+
+    # Delete a legacy flat file from the filesystem
     file_path = os.path.join(GENERATED_FILES_DIR, filename)  # Path to the file
     try:
         if os.path.exists(file_path):
@@ -588,26 +1149,28 @@ def delete_all_generated_files():
     """
     try:
         logging.info("Attempting to delete all generated files.")
-        conn = sqlite3.connect(FILES_DB)  # Connect to the generated_files database
-        cursor = conn.cursor()
-    
-        # Delete all records from the generated_files table
-        cursor.execute("DELETE FROM generated_files")
-        conn.commit()
-        logging.info("All files deleted from database.")
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+
+            # Delete all records from the generated_files, file_aliases, inventory and seeded_outputs tables
+            cursor.execute("DELETE FROM generated_files")
+            cursor.execute("DELETE FROM file_aliases")
+            cursor.execute("DELETE FROM inventory")
+            cursor.execute("DELETE FROM seeded_outputs")
+            conn.commit()
+            logging.info("All files deleted from database.")
     except sqlite3.Error as e:
         logging.error(f"SQLite error during delete_all_generated_files: {e}")
     except Exception as e:
         logging.error(f"Unexpected error during delete_all_generated_files: {e}")
-    finally:
-        conn.close()
-        logging.debug("Database connection closed after delete_all_generated_files.")
     
-    # Delete all files from the filesystem
-  # Path to the file storage
+    # Delete all stored objects and legacy flat files from the filesystem
+    clear_objects()
     try:
         for filename in os.listdir(GENERATED_FILES_DIR):
             file_path = os.path.join(GENERATED_FILES_DIR, filename)
+            if file_path == OBJECTS_DIR:
+                continue
             if os.path.isfile(file_path):
                 os.remove(file_path)
                 logging.info(f"File '{filename}' deleted from filesystem.")
@@ -619,3 +1182,108 @@ def delete_all_generated_files():
         logging.error(f"Error deleting files from filesystem: {e}")
 
 
+
+
+# ===========================
+# Catalog Reconciliation
+# ===========================
+
+def _scan_generated_files():
+    """
+    List the files on disk in a single pass over GENERATED_FILES_DIR and its object store.
+
+    Returns:
+        tuple: The sizes of the legacy flat files keyed by name, and of the stored
+        objects keyed by SHA-256.
+    """
+    flat_files, objects = {}, {}
+    try:
+        with os.scandir(GENERATED_FILES_DIR) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False) and not entry.name.startswith('.'):
+                    flat_files[entry.name] = entry.stat().st_size
+    except FileNotFoundError:
+        logging.warning(f"File folder not found: {GENERATED_FILES_DIR}")
+
+    try:
+        with os.scandir(OBJECTS_DIR) as fanout:
+            for directory in fanout:
+                # Objects live in two-character fan-out directories, next to tmp/
+                if len(directory.name) != 2 or not directory.is_dir(follow_symlinks=False):
+                    continue
+                with os.scandir(directory.path) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False):
+                            objects[entry.name] = entry.stat().st_size
+    except FileNotFoundError:
+        pass
+    return flat_files, objects
+
+
+def reconcile_generated_files():
+    """
+    Bring the generated files catalog in line with the files on disk.
+
+    The disk is scanned once and compared with the catalog, then every fix is
+    written in one transaction:
+    - aliases whose object is missing or doesn't have the recorded size are removed,
+      with the records, stock and seeded outputs that depended on them,
+    - records without a file are pruned,
+    - files without a record (legacy flat files, or aliases recorded by an older
+      server that reset the catalog at startup) get one, with the type taken from
+      the extension and the unknown generation options left empty.
+
+    Returns:
+        dict or None: The number of records added and pruned, and of aliases removed,
+        or None if the database could not be read.
+    """
+    started = time.perf_counter()
+    flat_files, objects = _scan_generated_files()
+    try:
+        with connection(FILES_DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT name, sha256, size FROM file_aliases')
+            aliases = {name: (sha256, size) for name, sha256, size in cursor.fetchall()}
+            cursor.execute('SELECT name FROM generated_files')
+            recorded = {row[0] for row in cursor.fetchall()}
+            cursor.execute('SELECT name FROM inventory')
+            stocked = {row[0] for row in cursor.fetchall()}
+            cursor.execute('SELECT output_key, sha256 FROM seeded_outputs')
+            seeded = cursor.fetchall()
+
+            corrupt = {
+                sha256 for sha256, size in aliases.values()
+                if sha256 in objects and size is not None and objects[sha256] != size
+            }
+            dead_aliases = {name for name, (sha256, _) in aliases.items() if sha256 not in objects or sha256 in corrupt}
+            live = (aliases.keys() - dead_aliases) | flat_files.keys()
+            dead_records = recorded - live
+            missing = sorted(live - recorded - stocked)
+
+            cursor.executemany('DELETE FROM file_aliases WHERE name = ?', ((name,) for name in dead_aliases))
+            cursor.executemany('DELETE FROM inventory WHERE name = ?', ((name,) for name in stocked - live))
+            cursor.executemany('DELETE FROM generated_files WHERE name = ?', ((name,) for name in dead_records))
+            cursor.executemany(
+                'DELETE FROM seeded_outputs WHERE output_key = ?',
+                ((key,) for key, sha256 in seeded if sha256 not in objects or sha256 in corrupt)
+            )
+            cursor.executemany(
+                'INSERT INTO generated_files (name, type) VALUES (?, ?)',
+                ((name, os.path.splitext(name)[1][1:].lower()) for name in missing)
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error during reconcile_generated_files: {e}")
+        return None
+
+    # Corrupt objects would otherwise be reused by the next identical payload
+    for sha256 in corrupt:
+        remove_object(sha256)
+
+    summary = {'added': len(missing), 'pruned': len(dead_records), 'dead_aliases': len(dead_aliases)}
+    logging.info(
+        f"Generated files catalog reconciled with {len(flat_files) + len(objects)} file(s) on disk in "
+        f"{(time.perf_counter() - started) * 1000:.1f} ms: {summary['added']} record(s) added, "
+        f"{summary['pruned']} pruned, {summary['dead_aliases']} dead alias(es) removed."
+    )
+    return summary
@@ -0,0 +1,262 @@
+# db_benchmark.py
+
+"""
+Database Lookup Benchmark for CP Demo Server
+
+Fills throwaway copies of protections.db and generated_files.db with a large number
+of rows, then measures the latency of the db.py lookups the server makes on every
+request (protection by name, IPS page filters, generated file by name, TE page and
+bundle filters, deletion by name). Every lookup is measured twice: with the schema
+created by init_db / init_db_for_generated_files, and again after its indexes are
+dropped, to show what the indexes are worth at that size.
+
+Usage (from the directory containing the app package):
+    python -m app.db_benchmark
+    python -m app.db_benchmark --rows 250000 --lookups 1000 --output db_results.json
+
+Notes:
+- The server databases are not touched, the benchmark runs in a temporary directory.
+- Latencies include the whole db.py call (pooled connection, query, row conversion).
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+from app import logging
+from app import db
+
+SEVERITIES = ['Low', 'Medium', 'High', 'Critical']
+CONFIDENCE_LEVELS = ['Low', 'Medium', 'High']
+FILE_TYPES = ['pdf', 'docx', 'pptx', 'xlsx', 'exe', 'dylib', 'elf', 'rtf', 'jpg', 'png', 'bmp', 'gif', 'tiff']
+URL_TYPES = ['malicious', 'clean', 'none']
+
+# Indexed tables, their indexes are dropped for the second measurement
+INDEXED_TABLES = {'protections': 'PROTECTIONS_DB', 'generated_files': 'FILES_DB'}
+
+# ===========================
+# Test Databases
+# ===========================
+
+@contextmanager
+def temporary_databases():
+    """Point db.py at empty databases in a temporary directory for the duration of the block."""
+    saved = db.PROTECTIONS_DB, db.FILES_DB
+    with tempfile.TemporaryDirectory(prefix='cp_db_benchmark_') as directory:
+        db.PROTECTIONS_DB = os.path.join(directory, 'protections.db')
+        db.FILES_DB = os.path.join(directory, 'generated_files.db')
+        try:
+            db.init_db()
+            db.init_db_for_generated_files()
+            yield
+        finally:
+            db.PROTECTIONS_DB, db.FILES_DB = saved
+
+
+def fill_databases(rows, rng):
+    """
+    Insert rows protections and rows generated files.
+
+    Args:
+        rows (int): The number of rows per table.
+        rng (random.Random): The generator the column values are drawn from.
+    """
+    with db.connection(db.PROTECTIONS_DB) as conn:
+        conn.executemany('''
+            INSERT INTO protections (ProtectionName, IndustryReference, Method, Resource, Service, ConfidenceLevel, Severity, PerformanceImpact, Agent, RowHash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            (f"Protection {index:07d}", f"CVE-2024-{index:05d}", rng.choice(['GET', 'POST']), f"http://{{{{IP}}}}/path/{index}",
+             'http', rng.choice(CONFIDENCE_LEVELS), rng.choice(SEVERITIES), rng.choice(SEVERITIES), 'Mozilla/5.0', f"{index:064x}")
+            for index in range(rows)
+        ))
+        conn.commit()
+
+    with db.connection(db.FILES_DB) as conn:
+        conn.executemany('''
+            INSERT INTO generated_files (
+                name, type, url_type, include_image, include_sensitive_link,
+                include_script, include_video, include_audio, include_3d,
+                include_pdf, include_external_app, include_data_submission
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            (f"generated_file_{index:07d}.bin", rng.choice(FILE_TYPES), rng.choice(URL_TYPES), *(rng.random() < 0.5 for _ in range(9)))
+            for index in range(rows)
+        ))
+        conn.commit()
+
+
+def drop_indexes():
+    """Drop the indexes of the protections and generated_files tables."""
+    for table, database in INDEXED_TABLES.items():
+        with db.connection(getattr(db, database)) as conn:
+            indexes = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+            ).fetchall()
+            for (name,) in indexes:
+                conn.execute(f'DROP INDEX {name}')
+            conn.commit()
+
+# ===========================
+# Measurement
+# ===========================
+
+def build_cases(rows):
+    """
+    Return the benchmarked lookups.
+
+    Args:
+        rows (int): The number of rows in the tables.
+
+    Returns:
+        list: (case id, function, argument factory) tuples, the factory draws the
+        arguments of one call from a random.Random.
+    """
+    return [
+        ('get_protection_by_name', db.get_protection_by_name,
+         lambda rng: (f"Protection {rng.randrange(rows):07d}",)),
+        ('load_protections(severity, confidence)', db.load_protections,
+         lambda rng: (rng.choice(SEVERITIES), rng.choice(CONFIDENCE_LEVELS))),
+        ('get_generated_file_by_name', db.get_generated_file_by_name,
+         lambda rng: (f"generated_file_{rng.randrange(rows):07d}.bin",)),
+        ('find_generated_files(names)', db.find_generated_files,
+         lambda rng: ([f"generated_file_{rng.randrange(rows):07d}.bin"],)),
+        ('find_generated_files(type, url_type)', db.find_generated_files,
+         lambda rng: (None, [rng.choice(FILE_TYPES)], rng.choice(URL_TYPES))),
+        ('delete_generated_file', db.delete_generated_file,
+         lambda rng: (f"generated_file_{rng.randrange(rows):07d}.bin",)),
+    ]
+
+
+def measure(function, arguments, lookups, rng):
+    """
+    Time lookups calls of a db.py function.
+
+    Args:
+        function (callable): The db.py function.
+        arguments (callable): Draws the arguments of one call from rng.
+        lookups (int): The number of measured calls.
+        rng (random.Random): The generator passed to arguments.
+
+    Returns:
+        dict: The median, 99th percentile and mean latency in microseconds.
+    """
+    latencies = []
+    # get_generated_file_by_name prints every lookup
+    with redirect_stdout(io.StringIO()):
+        function(*arguments(rng))  # Warm-up call (connection, statement cache)
+        for _ in range(lookups):
+            args = arguments(rng)
+            started = time.perf_counter()
+            function(*args)
+            latencies.append((time.perf_counter() - started) * 1_000_000)
+
+    latencies.sort()
+    return {
+        'p50_us': round(statistics.median(latencies), 1),
+        'p99_us': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 1),
+        'mean_us': round(statistics.fmean(latencies), 1),
+    }
+
+
+def run_benchmark(rows, lookups, seed=0):
+    """
+    Fill the test databases and measure every lookup with and without indexes.
+
+    Args:
+        rows (int): The number of rows per table.
+        lookups (int): The number of measured calls per lookup and schema.
+        seed (int): Seed of the row values and lookup arguments.
+
+    Returns:
+        dict: The run metadata and the results keyed by case id.
+    """
+    rng = random.Random(seed)
+    cases = build_cases(rows)
+    results = {case_id: {} for case_id, _, _ in cases}
+
+    with temporary_databases():
+        started = time.perf_counter()
+        fill_databases(rows, rng)
+        print(f"Inserted {rows} rows per table in {time.perf_counter() - started:.1f}s.", file=sys.stderr)
+
+        for schema in ('indexed', 'unindexed'):
+            if schema == 'unindexed':
+                drop_indexes()
+            for case_id, function, arguments in cases:
+                results[case_id][schema] = measure(function, arguments, lookups, rng)
+                print(f"{schema:>9} {case_id}: {_format_latency(results[case_id][schema])}", file=sys.stderr)
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sqlite': db.sqlite3.sqlite_version,
+        'rows': rows,
+        'lookups': lookups,
+        'results': results,
+    }
+
+
+def _format_latency(latency):
+    """One-line summary of a latency measurement."""
+    return f"p50 {latency['p50_us']:.1f} us, p99 {latency['p99_us']:.1f} us, mean {latency['mean_us']:.1f} us"
+
+
+def format_report(results):
+    """
+    Render the results as a table comparing the indexed and unindexed median latencies.
+
+    Args:
+        results (dict): The results of run_benchmark.
+
+    Returns:
+        str: The report.
+    """
+    lines = [
+        f"{results['rows']} rows per table, {results['lookups']} lookups per case (SQLite {results['sqlite']})",
+        f"{'lookup':<40} {'indexed p50':>12} {'unindexed p50':>14} {'speedup':>9}",
+    ]
+    for case_id, result in results['results'].items():
+        indexed, unindexed = result['indexed']['p50_us'], result['unindexed']['p50_us']
+        lines.append(f"{case_id:<40} {indexed:>9.1f} us {unindexed:>11.1f} us {unindexed / indexed:>8.1f}x")
+    return "\n".join(lines) + "\n"
+
+# ===========================
+# Command Line
+# ===========================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the CP Demo Server database lookups.")
+    parser.add_argument('--rows', type=int, default=100_000, help="Rows per table (default: %(default)s).")
+    parser.add_argument('--lookups', type=int, default=500, help="Measured calls per lookup (default: %(default)s).")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the row values and lookups (default: %(default)s).")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    if args.rows < 1 or args.lookups < 1:
+        parser.error("--rows and --lookups must be positive.")
+
+    # The lookups log every call at INFO level (and deletions warn about missing files)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    results = run_benchmark(args.rows, args.lookups, args.seed)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output}.", file=sys.stderr)
+
+    print(format_report(results), end='')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
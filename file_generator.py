@@ -1,26 +1,17 @@
+import io
 import os
-import random
-from io import BytesIO
-from docx import Document
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
-from docx.shared import RGBColor as docx_RGBColor 
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as xlsImage
-from pptx import Presentation
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from PyPDF2 import PdfWriter, PdfReader
-from PyPDF2.generic import NameObject, ArrayObject, DictionaryObject, TextStringObject
-from PIL import Image, ImageDraw, ImageFont
-import tempfile
+import json
+import queue
+import importlib
+import threading
 from app import app
 from app import logging
-from pptx.util import Inches
-from pptx.dml.color import RGBColor
 from app.db import *
 import subprocess
-import shutil
+from app.binary_templates import render_binary
+from app.url_pool import MALICIOUS_URLS
+from app.file_store import store_stream, object_path
+from app.rng import get_rng, is_seeded, seeded
 
 # File storage folder
 FILE_STORAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'generated_files')
@@ -28,29 +19,162 @@ FILE_STORAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
 if not os.path.exists(FILE_STORAGE):
     os.makedirs(FILE_STORAGE)
 
-# Load malicious URLs from a file
+# Load malicious URLs from the in-memory pool (reloaded when the file changes)
 def load_malicious_urls():
-    try:
-        with open("app/data/malicious_urls.txt", "r") as file:
-            return [line.strip() for line in file if line.strip()]
-    except FileNotFoundError:
-        return []
+    return MALICIOUS_URLS.urls()
 
 # Generate a random URL (malicious or clean based on user's selection)
 def generate_random_url(url_type="malicious"):
     if url_type == "malicious":
-        malicious_urls = load_malicious_urls()
-        if malicious_urls:
-            return random.choice(malicious_urls)
+        # Seeded generations pick from the pool itself, the shared deck depends on earlier draws
+        malicious_url = MALICIOUS_URLS.choose(get_rng()) if is_seeded() else MALICIOUS_URLS.draw()
+        if malicious_url:
+            return malicious_url
         else:
             return "http://gmai.com"  # Fallback malicious URL
     elif url_type == "clean":
         # Generate a clean random URL from a predefined set
         domains = ["example.com", "cleanwebsite.org", "safeurl.net"]
-        return f"https://{random.randint(1, 100)}.{random.choice(domains)}"
+        rng = get_rng()
+        return f"https://{rng.randint(1, 100)}.{rng.choice(domains)}"
     else:
         return None  # No URL
 
+# ===========================
+# Generator Registry
+# ===========================
+
+# Every file type maps to the writer producing it. Writers live in their own modules
+# and are imported on first use (or by warm_generators), so importing this module
+# doesn't load python-docx, python-pptx, openpyxl, ReportLab or PIL.
+GENERATORS = {}
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def register_generator(file_types, module, writer, arguments, filename):
+    """
+    Register the writer of one or more file types.
+
+    Args:
+        file_types (list): The file types produced by the writer.
+        module (str): The module defining the writer, imported on first use.
+        writer (str): The name of the writer, called as writer(fp, *arguments).
+        arguments (tuple): The names of the writer arguments after fp, among
+            'file_type' and the generation options.
+        filename (str): The file name pattern, formatted with file_type and number.
+    """
+    for file_type in file_types:
+        GENERATORS[file_type] = {
+            'module': module,
+            'writer': writer,
+            'arguments': tuple(arguments),
+            'filename': filename,
+        }
+
+PDF_ARGUMENTS = ('url_type', 'include_image', 'include_script', 'include_video', 'include_audio', 'include_sensitive_link', 'include_3d', 'include_pdf', 'include_external_app', 'include_data_submission')
+DOCUMENT_ARGUMENTS = ('url_type', 'include_image', 'include_sensitive_link')
+
+register_generator(['pdf'], 'app.pdf_writer', 'write_pdf', PDF_ARGUMENTS, "generated_pdf_file_{number}.pdf")
+register_generator(['docx'], 'app.office_writers', 'write_docx', DOCUMENT_ARGUMENTS, "generated_docx_file_{number}.docx")
+register_generator(['pptx'], 'app.office_writers', 'write_pptx', DOCUMENT_ARGUMENTS, "generated_docx_file_{number}.pptx")
+register_generator(['xlsx'], 'app.office_writers', 'write_xlsx', DOCUMENT_ARGUMENTS, "generated_xlsx_file_{number}.xlsx")
+register_generator(['rtf'], 'app.file_generator', 'write_rtf', DOCUMENT_ARGUMENTS, "generated_rtf_file_{number}.rtf")
+register_generator(['jpg', 'png', 'bmp', 'gif', 'tiff'], 'app.image_writer', 'write_image', ('file_type', 'url_type', 'include_sensitive_link'), "generated_{file_type}_file_{number}.{file_type}")
+register_generator(['exe', 'dylib', 'elf'], 'app.file_generator', 'write_binary', ('file_type',), "generated_{file_type}_file_{number}.{file_type}")
+
+def get_writer(file_type):
+    """
+    Return the writer of a file type, importing its module on first use.
+
+    Args:
+        file_type (str): The type of file.
+
+    Returns:
+        callable: The writer, called as writer(fp, *arguments).
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    generator = GENERATORS.get(file_type)
+    if generator is None:
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+    key = (generator['module'], generator['writer'])
+    with _writers_lock:
+        if key not in _writers:
+            _writers[key] = getattr(importlib.import_module(generator['module']), generator['writer'])
+        return _writers[key]
+
+def warm_generators():
+    """
+    Import the writers of every registered file type.
+
+    Called at startup when CP_PRELOAD_GENERATORS is set, so pre-forked workers
+    share the loaded libraries instead of each importing them on first use.
+    """
+    for file_type in GENERATORS:
+        get_writer(file_type)
+    logging.info(f"Loaded the writers of {len(GENERATORS)} file types.")
+
+def writer_arguments(file_type, features):
+    """
+    Return the positional arguments of a file type's writer, after fp.
+
+    Args:
+        file_type (str): The type of file.
+        features (dict): The generation options; missing flags default to 'off'.
+
+    Returns:
+        list: The writer arguments.
+    """
+    values = dict(features, file_type=file_type)
+    return [values.get(name, 'off') for name in GENERATORS[file_type]['arguments']]
+
+# ===========================
+# Seeded Generation
+# ===========================
+
+# Bump when a generator's output changes, so outputs cached by earlier versions aren't served
+OUTPUT_VERSION = 1
+
+def output_key(file_type, seed, features):
+    """
+    Return the key of a seeded generation.
+
+    The key seeds the generation's random generator and indexes the output cache:
+    identical (seed, type, options) requests produce the same key and thus
+    byte-identical files. Options the writer doesn't take are left out, and the
+    malicious URL pool contents are part of the key of writers that draw a URL.
+
+    Args:
+        file_type (str): The type of file.
+        seed (str or int): The seed requested by the user.
+        features (dict): The generation options, including url_type.
+
+    Returns:
+        str: The key.
+    """
+    arguments = GENERATORS[file_type]['arguments']
+    pool = MALICIOUS_URLS.fingerprint() if 'url_type' in arguments and features.get('url_type') != 'none' else None
+    return json.dumps([OUTPUT_VERSION, str(seed), file_type, writer_arguments(file_type, features), pool])
+
+def find_cached_output(key):
+    """
+    Return the stored object of a seeded generation, if it was generated before.
+
+    Args:
+        key (str): The key returned by output_key.
+
+    Returns:
+        tuple or None: The (sha256, size) of the object, or None if it isn't cached
+        (or its object has been deleted since).
+    """
+    cached = get_seeded_output(key)
+    if cached is None or not os.path.exists(object_path(cached[0])):
+        return None
+    return cached
+
 # Generate all file types
 def generate_all_files(url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission):
     file_types = ['pdf', 'docx', 'pptx','xlsx', 'exe', 'rtf', 'jpg', 'png', 'bmp', 'gif', 'tiff']
@@ -58,35 +182,23 @@ def generate_all_files(url_type, include_image, include_script, include_video, i
         generate_file(file_type, url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission)
 
 # Generate a file based on type and selected features (URLs, Images, Scripts, Video, Audio, Link, 3D)
-def generate_file(file_type, url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission):
+def generate_file(file_type, url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission, record=True, seed=None):
     logging.info(f"Values received by generate_file: {file_type, url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission}")
     
-    if file_type == 'pdf':
-        logging.info("Calling the pdf generator")
-        filename = generate_pdf(url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission)
-        
-
-        #logging.info(url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission)
-    elif file_type == 'docx':
-        filename = generate_docx(url_type, include_image, include_sensitive_link)
-    elif file_type == 'pptx':
-        filename = generate_pptx(url_type, include_image, include_sensitive_link)
-    elif file_type == 'rtf':
-        filename = generate_rtf(url_type, include_image, include_sensitive_link)
-    elif file_type == 'xlsx':
-        filename = generate_xlsx(url_type, include_image, include_sensitive_link)
-    elif file_type in ['jpg', 'png', 'bmp', 'gif', 'tiff']:
-        filename = generate_image(file_type, url_type, include_sensitive_link)
-
-    elif file_type == 'exe':
-        filename = generate_exe(url_type)
-    
-    elif file_type == 'dylib':
-        filename = generate_dylib(url_type)
+    filename = generate_stored_file(
+        file_type, url_type, include_image=include_image, include_script=include_script, include_video=include_video,
+        include_audio=include_audio, include_sensitive_link=include_sensitive_link, include_3d=include_3d,
+        include_pdf=include_pdf, include_external_app=include_external_app, include_data_submission=include_data_submission,
+        seed=seed
+    )
 
-    elif file_type == 'elf':
-        filename = generate_elf(url_type)
+    # Files generated for the inventory are only recorded once they are claimed
+    if not record:
+        return filename
 
+    # Repeated seeded requests produce the same file name, record it only once
+    if seed is not None and find_generated_files(names=[filename]):
+        return filename
 
     # After generating the file, save its details to the database
     logging.info(f"file name before savnig to database {filename}")
@@ -96,190 +208,203 @@ def generate_file(file_type, url_type, include_image, include_script, include_vi
 
     return filename
 
-#Generate PDF
-def generate_pdf(url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission):
-    logging.info(f"The variables as seen inside generate_pdf: {url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission}")
-    
-    filename = f"generated_pdf_file_{random.randint(1000, 9999)}.pdf"
-    file_path = os.path.join(FILE_STORAGE, filename)
-    
-    # Create a buffer to hold the PDF data in memory
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer)
-    
-    logging.info(f"file path: {file_path}")
-    
-    # Basic PDF content
-    pdf.drawString(100, 750, "PDF with Advanced Features")
+# Store the bytes written by a generator in the content-addressed store under a file name alias
+def store_generated_file(filename, write):
+    """
+    Store a generated file and record its name in the alias index.
 
-    # Include URL if specified
-    if url_type != 'none':
-        random_url = generate_random_url(url_type)
-        if random_url is None:
-            random_url = "No URL provided"
-        pdf.drawString(80, 320, f"URL: {random_url}")
-        pdf.linkURL(random_url, (80, 310, 380, 330), relative=0)
+    Args:
+        filename (str): The requested file name.
+        write (callable): Called with a binary file object to write the file to.
 
-    # Include sensitive link if specified
-    if include_sensitive_link == "on":
-        sensitive_link = r"\\server\share"
-        if sensitive_link is None:
-            sensitive_link = "No link provided"
-        pdf.drawString(80, 580, f"Server Share: {sensitive_link}")
-        pdf.linkURL(sensitive_link, (80, 570, 380, 590), relative=0)
-
-    # Embed image if selected
-    if include_image == "on":
-        # Generate image path
-        image_name = generate_image("jpg", url_type, include_sensitive_link)
-        random_image_path = os.path.join(FILE_STORAGE, image_name)
-
-        # Add the image to the PDF
-        add_image_to_pdf(pdf, random_image_path, x=380, y=500, width=180, height=180)
-        
-    # Embed JavaScript code if specified
-    if include_script == "on":
-        script = "app.alert('This is an embedded JavaScript test!');"
-        writer = PdfWriter()
-        writer.add_js(script)
-        pdf.setFont("Helvetica", 10)
-        pdf.drawString(80, 450, "Embedded JavaScript:")
-        pdf.drawString(80, 430, script)
-
-    # Save the initial PDF without annotations
-    pdf.save()
-
-    # Now create the PDF file object for writing
-    buffer.seek(0)
-    pdf_reader = PdfReader(buffer)
-    pdf_writer = PdfWriter()
-
-    # Create a page object from the PDF
-    page = pdf_reader.pages[0]
-    
-    # Add annotations for video, audio, 3D, etc.
-    annotations = []
-
-    # Link to local video
-    if include_video == "on":
-        video_file_path = "file:///home/kali/Desktop/cp_demo_server/app/data/pdf_assets/sample_mp4_file.mp4"
-        video_annotation = DictionaryObject({
-            NameObject("/Subtype"): NameObject("/Link"),
-            NameObject("/A"): DictionaryObject({
-                NameObject("/S"): NameObject("/URI"),
-                NameObject("/URI"): TextStringObject(video_file_path)
-            })
-        })
-        annotations.append(video_annotation)
-
-    # Link to local audio
-    if include_audio == "on":
-        audio_file_path = "file:///home/kali/Desktop/cp_demo_server/app/data/pdf_assets/sample_mp3_file.mp3"
-        audio_annotation = DictionaryObject({
-            NameObject("/Subtype"): NameObject("/Link"),
-            NameObject("/A"): DictionaryObject({
-                NameObject("/S"): NameObject("/URI"),
-                NameObject("/URI"): TextStringObject(audio_file_path)
-            })
-        })
-        annotations.append(audio_annotation)
-
-    # Embed 3D Art (Dummy Data)
-    if include_3d == "on":
-        u3d_data = b"dummy 3D model data for testing purposes"
-        u3d_annotation = DictionaryObject({
-            NameObject("/Subtype"): NameObject("/3D"),
-            NameObject("/3DName"): TextStringObject("Dummy 3D Model"),
-            NameObject("/3DData"): ArrayObject([TextStringObject(u3d_data)]),
-        })
-        annotations.append(u3d_annotation)
-
-    # Add external PDF if selected
-    if include_pdf == "on":
-        external_pdf_path = "file:///home/kali/Desktop/cp_demo_server/app/data/pdf_assets/sample_pdf_file.pdf"
-        pdf_annotation = DictionaryObject()
-        pdf_annotation.update({
-            NameObject("/Subtype"): NameObject("/Link"),
-            NameObject("/Contents"): TextStringObject("Click to open External PDF"),
-            NameObject("/A"): DictionaryObject({
-                NameObject("/S"): NameObject("/URI"),
-                NameObject("/URI"): TextStringObject(external_pdf_path)
-            })
-        })
-        annotations.append(pdf_annotation)
-
-    # Add external application launch if selected
-    if include_external_app == "on":
-        app_path = "file:///path/to/external/application"
-        app_annotation = DictionaryObject()
-        app_annotation.update({
-            NameObject("/Subtype"): NameObject("/Link"),
-            NameObject("/Contents"): TextStringObject("Launch External Application"),
-            NameObject("/A"): DictionaryObject({
-                NameObject("/S"): NameObject("/URI"),
-                NameObject("/URI"): TextStringObject(app_path)
-            })
-        })
-        annotations.append(app_annotation)
-
-    # Add data submission if selected
-    if include_data_submission == "on":
-        submission_url = "http://example.com/submit_data"
-        submission_annotation = DictionaryObject()
-        submission_annotation.update({
-            NameObject("/Subtype"): NameObject("/Widget"),
-            NameObject("/T"): TextStringObject("Submit Data"),
-            NameObject("/A"): DictionaryObject({
-                NameObject("/S"): NameObject("/URI"),
-                NameObject("/URI"): TextStringObject(submission_url)
-            })
-        })
-        annotations.append(submission_annotation)
-
-    # Now, add the annotations to the page (only if there are annotations)
-    if annotations:
-        page[NameObject("/Annots")] = ArrayObject(annotations)
-
-    # Write the page with annotations back into the PDF
-    pdf_writer.add_page(page)
-
-    # Write to the output file using a proper file object
-    with open(file_path, "wb") as f:
-        pdf_writer.write(f)
-
-    buffer.close()
-
-    return filename  # Return the filename of the generated PDF
-
-def add_image_to_pdf(pdf, image_path, x, y, width, height):
+    Returns:
+        str: The stored file name (suffixed with a hash prefix if the name was taken).
     """
-    Add an image to a PDF using ReportLab.
+    sha256, size = store_stream(write)
+    return add_file_alias(filename, sha256, size)
+
+# Write a file of the given type straight to a binary file object (no FILE_STORAGE, no database)
+def write_file(fp, file_type, url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission, seed=None):
+    write = get_writer(file_type)
+    features = {
+        'url_type': url_type,
+        'include_image': include_image,
+        'include_script': include_script,
+        'include_video': include_video,
+        'include_audio': include_audio,
+        'include_sensitive_link': include_sensitive_link,
+        'include_3d': include_3d,
+        'include_pdf': include_pdf,
+        'include_external_app': include_external_app,
+        'include_data_submission': include_data_submission,
+    }
+    if seed is None:
+        write(fp, *writer_arguments(file_type, features))
+        return
+
+    with seeded(output_key(file_type, seed, features)):
+        write(fp, *writer_arguments(file_type, features))
+
+# Chunks handed from a streaming writer to the response before the writer waits
+STREAM_QUEUE_CHUNKS = 16
+
+_STREAM_END = object()
+
+
+class _PipeSink(io.RawIOBase):
+    """A write-only, unseekable file object handing what is written to a reader thread in chunks."""
+
+    def __init__(self, chunks, chunk_size):
+        super().__init__()
+        self._chunks = chunks
+        self._chunk_size = chunk_size
+        self._pending = bytearray()
+        self._position = 0
+        self.cancelled = False
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def write(self, data):
+        self._pending += data
+        self._position += len(data)
+        while len(self._pending) >= self._chunk_size:
+            self.put(bytes(self._pending[:self._chunk_size]))
+            del self._pending[:self._chunk_size]
+        return len(data)
+
+    def drain(self):
+        """Hand over the bytes that don't fill a whole chunk."""
+        if self._pending:
+            self.put(bytes(self._pending))
+            self._pending.clear()
+
+    def put(self, item):
+        """Queue an item, giving up once the reader is gone."""
+        while True:
+            if self.cancelled:
+                raise BrokenPipeError("The stream reader went away.")
+            try:
+                self._chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                pass
+
+
+# Run a writer in a background thread and iterate over its output while it is written
+def stream_output(write, chunk_size=64 * 1024):
+    """
+    Stream the bytes written by a writer function as they are produced.
+
+    The writer runs in a background thread on an unseekable file object, so only
+    writers that never seek back into their output can be streamed. Most document
+    writers (ReportLab, python-docx, openpyxl, the binary templates) still write
+    their whole output at the end; images and the large file writers write as they go.
 
     Args:
-        pdf (canvas.Canvas): The ReportLab canvas instance.
-        image_path (str): Path to the image file.
-        x (int): X-coordinate for the image.
-        y (int): Y-coordinate for the image.
-        width (int): Width of the image in the PDF.
-        height (int): Height of the image in the PDF.
+        write (callable): Called with a binary file object to write the payload to.
+        chunk_size (int): The size of the yielded chunks (the last one can be smaller).
+
+    Returns:
+        iterator: The chunks of the output. The first chunk is waited for before
+        returning, so a writer failing before any output raises here.
+
+    Raises:
+        Exception: Whatever the writer raised before writing its first chunk.
     """
-    try:
-        # Open the image and save it as a temporary PNG file
-        img = Image.open(image_path)
-        img_byte_arr = BytesIO()
-        img.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_file:
-            img.save(tmp_file.name, format='PNG')  # Save as PNG format
-            tmp_file_path = tmp_file.name
-
-        # Embed the image into the PDF using the temporary file path
-        pdf.drawImage(tmp_file_path, x, y, width, height)
-
-        # Clean up the temporary file
-        os.remove(tmp_file_path)
-    except Exception as e:
-        logging.info(f"Error adding image to PDF: {e}")
+    chunks = queue.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+    sink = _PipeSink(chunks, chunk_size)
+
+    def produce():
+        try:
+            write(sink)
+            sink.drain()
+            sink.put(_STREAM_END)
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            try:
+                sink.put(e)
+            except BrokenPipeError:
+                pass
+
+    threading.Thread(target=produce, daemon=True).start()
+    first = chunks.get()
+    if isinstance(first, Exception):
+        raise first
+
+    def iterate(item):
+        try:
+            while item is not _STREAM_END:
+                if isinstance(item, Exception):
+                    # Too late for an error status, the response ends truncated
+                    logging.error(f"Streamed writer failed after {sink.tell()} bytes: {item}")
+                    return
+                yield item
+                item = chunks.get()
+        finally:
+            sink.cancelled = True
+
+    return iterate(first)
+
+# Generate a file of any registered type and store it under a fresh file name
+def generate_stored_file(file_type, url_type, seed=None, **features):
+    """
+    Generate a file of a registered type and store it.
+
+    With a seed, every random choice is drawn from a generator seeded with
+    output_key, and an identical earlier generation is reused from the output
+    cache instead of being generated again.
+
+    Args:
+        file_type (str): The type of file.
+        url_type (str): Type of URL to include ("malicious", "clean" or "none").
+        seed (str or int): Optional seed making the output reproducible.
+        **features: The include_* generation options; missing flags default to 'off'.
+
+    Returns:
+        str: The stored file name.
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    write = get_writer(file_type)
+    features = dict(features, url_type=url_type)
+    arguments = writer_arguments(file_type, features)
+    pattern = GENERATORS[file_type]['filename']
+    if seed is None:
+        filename = pattern.format(file_type=file_type, number=get_rng().randint(1000, 9999))
+        filename = store_generated_file(filename, lambda fp: write(fp, *arguments))
+        logging.info(f"{file_type.upper()} file stored: {filename}")
+        return filename
+
+    key = output_key(file_type, seed, features)
+    with seeded(key):
+        filename = pattern.format(file_type=file_type, number=get_rng().randint(1000, 9999))
+        cached = find_cached_output(key)
+        if cached is not None:
+            filename = add_file_alias(filename, *cached)
+            logging.info(f"{file_type.upper()} file for seed {seed} served from the output cache: {filename}")
+            return filename
+        sha256, size = store_stream(lambda fp: write(fp, *arguments))
+
+    add_seeded_output(key, sha256, size)
+    filename = add_file_alias(filename, sha256, size)
+    logging.info(f"{file_type.upper()} file stored for seed {seed}: {filename}")
+    return filename
+
+#Generate PDF
+def generate_pdf(url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission):
+    logging.info(f"The variables as seen inside generate_pdf: {url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission}")
+
+    return generate_stored_file(
+        'pdf', url_type, include_image=include_image, include_script=include_script, include_video=include_video,
+        include_audio=include_audio, include_sensitive_link=include_sensitive_link, include_3d=include_3d,
+        include_pdf=include_pdf, include_external_app=include_external_app, include_data_submission=include_data_submission
+    )
 
 # Generate DOCX
 def generate_docx(url_type, include_image, include_sensitive_link):
@@ -294,386 +419,89 @@ def generate_docx(url_type, include_image, include_sensitive_link):
     Returns:
         str: The filename of the generated DOCX file.
     """
-    filename = f"generated_docx_file_{random.randint(1000, 9999)}.docx"
-    file_path = os.path.join(FILE_STORAGE, filename)
-
     # Debugging logs
     logging.debug(f"Generating DOCX with parameters - URL Type: {url_type}, Include Image: {include_image}, Include Sensitive Link: {include_sensitive_link}")
 
-    # Create a new Word document
-    doc = Document()
-    doc.add_heading("Generated Word Document", level=1)
-    doc.add_paragraph("This document might include active contents.")
-
-    if url_type != "none":
-        # Add a random URL as a clickable link
-        random_url = generate_random_url()  # Assuming this function exists and returns a valid URL
-        para = doc.add_paragraph("Visit this link: ")
-        create_hyperlink(para, random_url)
-
-    # Conditionally include sensitive link
-    if include_sensitive_link == "on":
-        sensitive_link = "\\\\server\\share"
-        para = doc.add_paragraph("Sensitive link: ")
-        create_hyperlink(para, sensitive_link)
-        logging.debug("Included sensitive link in the document.")
-
-    # Conditionally include an image
-    if include_image == "on":
-        image_name = generate_image("jpg", url_type, include_sensitive_link)
-        random_image_path = os.path.join(FILE_STORAGE, image_name)
-        if os.path.exists(random_image_path):
-            doc.add_picture(random_image_path)
-            logging.debug("Included image in the document.")
-        else:
-            logging.warning(f"Image file not found: {random_image_path}")
-
-    # Save the document
-    doc.save(file_path)
-    logging.info(f"DOCX file created: {filename}")
-
-    return filename
-
-def create_hyperlink(paragraph, url):
-    # Create the hyperlink XML element
-    hyperlink = OxmlElement('w:hyperlink')
-    hyperlink.set(qn('r:id'), 'rId1')  # We will handle relationships later
-    
-    # Create a run with the hyperlink text
-    r = OxmlElement('w:r')
-    t = OxmlElement('w:t')
-    t.text = url
-    r.append(t)
-    hyperlink.append(r)
-
-    # Add the hyperlink to the paragraph
-    paragraph._element.append(hyperlink)
-
-    # Style the hyperlink (blue and underlined)
-    run = paragraph.add_run(url)
-    run.font.color.rgb = docx_RGBColor(0, 0, 255)  # Blue color
-    run.font.underline = True  # Underline
-
-    return hyperlink
+    return generate_stored_file('docx', url_type, include_image=include_image, include_sensitive_link=include_sensitive_link)
 
 # Generate PowerPoint Presentation (.pptx) with random image, and URL
 def generate_pptx(url_type, include_image, include_sensitive_link):
-    filename = f"generated_docx_file_{random.randint(1000, 9999)}.pptx"
-    file_path = os.path.join(FILE_STORAGE, filename)
-
-    ppt = Presentation()
-    slide = ppt.slides.add_slide(ppt.slide_layouts[0])
-    slide.shapes.title.text = "PowerPoint with Resources"
-
-    # Add random URL if specified
-    if url_type != 'none':
-        random_url = generate_random_url(url_type)
-        
-        # Check if the generated URL is None and provide a fallback or skip
-        if random_url is not None:
-            # Add a textbox for the URL and make it clickable
-            text_box = slide.shapes.placeholders[1]
-            text_frame = text_box.text_frame
-            p = text_frame.add_paragraph()
-            p.text = random_url
-            
-            # Adding hyperlink to the text
-            run = p.runs[0]
-            run.hyperlink.address = random_url
-        else:
-            logging.info("No URL generated, skipping.")
-
-        
-    # Include sensitive link if specified
-    if include_sensitive_link == "on":
-        sensitive_link = r"\\server\share"  # Replace with your actual server share link
-        
-        # Add a textbox for the sensitive link and make it clickable
-        text_box = slide.shapes.placeholders[0]
-        text_frame = text_box.text_frame
-        p = text_frame.add_paragraph()
-        p.text = sensitive_link
-        
-        # Adding hyperlink to the sensitive link
-        run = p.runs[0]
-        run.hyperlink.address = sensitive_link
-
-    # Embed image if selected
-    if include_image == "on":
-        image_name = generate_image("jpg", url_type, include_sensitive_link)
-        random_image_path = os.path.join(FILE_STORAGE, image_name)
-        slide.shapes.add_picture(random_image_path, Inches(0.1), Inches(0.1), width=Inches(3))
-
-    # Save the PowerPoint file
-    ppt.save(file_path)
-
-    
-    return filename
+    return generate_stored_file('pptx', url_type, include_image=include_image, include_sensitive_link=include_sensitive_link)
 
 # Generate RTF File with random image, and URL
 def generate_rtf(url_type, include_image, include_sensitive_link):
-    filename = f"generated_rtf_file_{random.randint(1000, 9999)}.rtf"
-    file_path = os.path.join(FILE_STORAGE, filename)
-
-    random_image_path = generate_image("jpg", url_type, include_sensitive_link) if include_image else None
-
-    with open(file_path, "w") as f:
-        # Start RTF document with basic content structure
-        f.write("{\\rtf1\\ansi\\deff0 {\\fonttbl {\\f0 Courier;}}\n")
-        f.write("\\fs24 Random RTF File Content\\par\n")
+    return generate_stored_file('rtf', url_type, include_image=include_image, include_sensitive_link=include_sensitive_link)
 
-        # Add URL if provided
-        if url_type != 'none':
-            random_url = generate_random_url(url_type)
-            f.write(f"Here is a URL: \\ul {random_url} \\ulnone\\par\n")  # Underlined URL
+def write_rtf(fp, url_type, include_image, include_sensitive_link):
+    """
+    Write an RTF document with the selected features to a binary file object.
+    """
+    # Start RTF document with basic content structure
+    parts = ["{\\rtf1\\ansi\\deff0 {\\fonttbl {\\f0 Courier;}}\n"]
+    parts.append("\\fs24 Random RTF File Content\\par\n")
 
-        # Add sensitive link if specified
-        if include_sensitive_link == "on":
-            sensitive_url = r"\\\\server\\share"  # Raw string to avoid issues with backslashes
-            f.write(f"Here is a server share: \\ul {sensitive_url} \\ulnone\\par\n")  # Underlined Sensitive Link
+    # Add URL if provided
+    if url_type != 'none':
+        random_url = generate_random_url(url_type)
+        parts.append(f"Here is a URL: \\ul {random_url} \\ulnone\\par\n")  # Underlined URL
 
-        # Add image path if specified
-        if random_image_path == "on":
-            f.write(f"Random Image Path: app/data/generated_files/generated_file_1751.jpg \\par\n")
+    # Add sensitive link if specified
+    if include_sensitive_link == "on":
+        sensitive_url = r"\\\\server\\share"  # Raw string to avoid issues with backslashes
+        parts.append(f"Here is a server share: \\ul {sensitive_url} \\ulnone\\par\n")  # Underlined Sensitive Link
 
-        # End RTF content
-        f.write("}\n")  # Close RTF content
+    # End RTF content
+    parts.append("}\n")  # Close RTF content
 
-    
-    return filename
+    fp.write("".join(parts).encode("utf-8"))
 
 # Generate Excel Spreadsheet (.xlsx) with a random URL
 def generate_xlsx(url_type, include_image, include_sensitive_link):
-    filename = f"generated_xlsx_file_{random.randint(1000, 9999)}.xlsx"
-    file_path = os.path.join(FILE_STORAGE, filename)
-
-    wb = Workbook()
-    ws = wb.active
-    ws.append(["This is an Excel file."])
-
-
-    # Include include_sensitive_link if specified
-    if include_sensitive_link == "on":
-        sensitive_link = "\\server\share"
-        logging.info(f" The sensitive Link is: {sensitive_link}")
-        # Add the hyperlink to the Excel cell
-        ws['A4'] = "Click here to visit the link"
-        ws['A4'].hyperlink = sensitive_link  # This makes the text a clickable hyperlink
-        ws['A4'].style = 'Hyperlink'  # Optional: applies the built-in hyperlink style
-        
-    # Generate a random URL based on the selected type
-    if url_type != 'none':
-        random_url = generate_random_url(url_type)
-        logging.info(f" The generated Link is: {random_url}")
-        # Add the hyperlink to the Excel cell
-        ws['A2'] = "Click here to visit the link"
-        ws['A2'].hyperlink = random_url  # This makes the text a clickable hyperlink
-        ws['A2'].style = 'Hyperlink'  # Optional: applies the built-in hyperlink style
-
-    # Adding an image if selected
-    if include_image == "on":
-        image_name = generate_image("jpg", url_type, include_sensitive_link)
-        random_image_path = os.path.join(FILE_STORAGE, image_name)
-        img = xlsImage(random_image_path)  # openpyxl Image object
-        img.anchor = 'A10'  # Position the image in the cell (A1)
-        ws.add_image(img)
-
-    wb.save(file_path)
-
-    return filename
+    return generate_stored_file('xlsx', url_type, include_image=include_image, include_sensitive_link=include_sensitive_link)
 
 def generate_image(file_type, url_type, include_sensitive_link):
-    filename = f"generated_{file_type}_file_{random.randint(1000, 9999)}.{file_type}"
-    file_path = os.path.join(FILE_STORAGE, filename)
-
-    # Ensure the image is created in RGB mode (required for JPG)
-    img = Image.new("RGB", (500, 500), (255, 255, 255))  # RGB mode
-    draw = ImageDraw.Draw(img)
-
-    # Add a gradient background (left to right)
-    for i in range(500):
-        r = int(255 * i / 500)
-        g = int(255 * (500 - i) / 500)
-        b = 100  # constant blue value for gradient
-        draw.line((i, 0, i, 500), fill=(r, g, b))
-
-    # Add some random shapes for complexity
-    for _ in range(10):  # Add 10 random shapes
-        shape_type = random.choice(["ellipse", "rectangle", "polygon"])
-        x1, y1 = random.randint(0, 400), random.randint(0, 400)
-        x2, y2 = random.randint(x1 + 20, 500), random.randint(y1 + 20, 500)
-        
-        if shape_type == "ellipse":
-            draw.ellipse([x1, y1, x2, y2], outline="black", width=3)
-        elif shape_type == "rectangle":
-            draw.rectangle([x1, y1, x2, y2], outline="blue", width=3)
-        elif shape_type == "polygon":
-            draw.polygon([x1, y1, x2, y2, random.randint(0, 500), random.randint(0, 500)], outline="green", width=3)
-
-    # Add dynamic text with varied size, fonts, and color
-    font = ImageFont.load_default()  # You can specify a TTF font file here for a better font
-    text = f"Random {file_type.upper()} Image"
-    font_size = random.randint(20, 50)
-    
-    try:
-        font = ImageFont.truetype("arial.ttf", font_size)  # Try loading a nicer font
-    except IOError:
-        font = ImageFont.load_default()  # Fallback if the font isn't available
-
-    # Use textbbox to get the bounding box of the text
-    text_bbox = draw.textbbox((0, 0), text, font=font)
-    text_width = text_bbox[2] - text_bbox[0]
-    text_height = text_bbox[3] - text_bbox[1]
-
-    x = (500 - text_width) // 2
-    y = (500 - text_height) // 4
-    text_color = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
-    draw.text((x, y), text, fill=text_color, font=font)
-                
-    # Add the URL text at the bottom
-    if url_type != 'none':
-        random_url = generate_random_url(url_type)
-        url_text = f"{random_url}"
-        url_font = ImageFont.load_default()
-        url_text_bbox = draw.textbbox((0, 0), url_text, font=url_font)
-        url_text_width = url_text_bbox[2] - url_text_bbox[0]
-        draw.text(((500 - url_text_width) // 2, 450), url_text, font=url_font, fill=(0, 0, 0))
+    return generate_stored_file(file_type, url_type, include_sensitive_link=include_sensitive_link)
 
-    # Include include_sensitive_link if specified
-    if include_sensitive_link == "on":
-        sensitive_link = "\\server\share"
-        link_text = f"{sensitive_link}"
-        link_font = ImageFont.load_default()
-        link_text_bbox = draw.textbbox((0, 0), link_text, font=link_font)
-        link_text_width = link_text_bbox[2] - link_text_bbox[0]
-        draw.text(((500 - link_text_width) // 2, 450), link_text, font=link_font, fill=(0, 0, 0))
-        
-    # Save the image in the requested format (JPG or others)
-    if file_type.lower() == 'jpg':
-        img.save(file_path, format='JPEG')
-    else:
-        img.save(file_path, format=file_type.upper())  # Use the appropriate format for other types
+def write_binary(fp, kind):
+    """
+    Write a unique binary variant to a binary file object.
 
-    return filename
+    The variant is produced by patching a random unique_value into the
+    compile-once template from binary_templates.
 
-def generate_dylib(url_type=None):
-    # Generate a unique filename for the dylib
-    filename = f"generated_dylib_file_{random.randint(1000, 9999)}.dylib"
-    c_file_path = os.path.join(FILE_STORAGE, f"{filename}.c")
-    dylib_file_path = os.path.join(FILE_STORAGE, filename)
-    # Create a random string or value to make the EXE unique
-    random_value = random.randint(1000, 9999)
-    
-    # Simple C code to show a message
-    c_code = f"""
-#include <stdio.h>
-#include <stdlib.h>
-
-int main() {{
-    // Generate a unique message with a random number
-    int unique_value = {random_value};
-    printf("This is a unique dylib message! The random value is: %d\\n", unique_value);
-    
-    // Wait for user to press Enter before closing
-    printf("Press Enter to exit...\\n");
-    getchar();  // Wait for the user to press Enter
+    Args:
+        fp (file): The binary file object to write to.
+        kind (str): The binary type ('exe', 'dylib' or 'elf').
+
+    Raises:
+        subprocess.CalledProcessError, OSError, ValueError: If the template could not be built.
+    """
+    # Create a random value to make the binary unique
+    random_value = get_rng().randint(1000, 9999)
+    fp.write(render_binary(kind, random_value))
 
-    return 0;
-}}
-"""
+def save_binary(kind):
+    """
+    Store a unique binary variant in the generated files store.
 
-    # Write the C code to a file
-    with open(c_file_path, "w") as c_file:
-        c_file.write(c_code)
+    Args:
+        kind (str): The binary type ('exe', 'dylib' or 'elf').
 
-    # Use GCC to compile the C file into an EXE
+    Returns:
+        str or None: The stored file name, or None if the template could not be built.
+    """
     try:
-        subprocess.run(['gcc', c_file_path, '-o', dylib_file_path], check=True)
-    except subprocess.CalledProcessError as e:
-        logging.info(f"Error during dylib generation: {e}")
+        return generate_stored_file(kind, None)
+    except (subprocess.CalledProcessError, OSError, ValueError) as e:
+        logging.info(f"Error during {kind} generation: {e}")
         return None
 
-    # Clean up the C file after compilation
-    os.remove(c_file_path)
-
-    # Return the generated EXE filename
-    return filename if os.path.exists(dylib_file_path) else None
+def generate_dylib(url_type=None):
+    return save_binary('dylib')
 
 # Generate Windows EXE - sudo apt-get install mingw-w64 on Kali or Ubuntu
 def generate_exe(url_type=None):
-    # Generate a unique filename for the EXE
-    filename = f"generated_exe_file_{random.randint(1000, 9999)}.exe"
-    c_file_path = os.path.join(FILE_STORAGE, f"{filename}.c")
-    exe_file_path = os.path.join(FILE_STORAGE, filename)
-
-    # Create a random string or value to make the EXE unique
-    random_value = random.randint(1000, 9999)
-    
-    # Simple C code to show a message and include a unique value
-    c_code = f"""
-#include <stdio.h>
-#include <stdlib.h>
-
-int main() {{
-    // Generate a unique message with a random number
-    int unique_value = {random_value};
-    printf("This is a unique EXE message! The random value is: %d\\n", unique_value);
-    
-    // Wait for user to press Enter before closing
-    printf("Press Enter to exit...\\n");
-    getchar();  // Wait for the user to press Enter
-
-    return 0;
-}}
-"""
-
-    # Write the C code to a file
-    with open(c_file_path, "w") as c_file:
-        c_file.write(c_code)
-
-    # Use MinGW-w64 to compile the C file into an EXE (cross-compilation for Windows)
-    try:
-        subprocess.run(['x86_64-w64-mingw32-gcc', c_file_path, '-o', exe_file_path], check=True)
-    except subprocess.CalledProcessError as e:
-        logging.info(f"Error during EXE generation: {e}")
-        return None
-
-    # Clean up the C file after compilation
-    os.remove(c_file_path)
-
-    # Return the generated EXE filename
-    return filename if os.path.exists(exe_file_path) else None
+    return save_binary('exe')
 
 def generate_elf(url_type=None):
-        filename = f"generated_elf_file_{random.randint(1000, 9999)}.elf"
-        c_file_path = os.path.join(FILE_STORAGE, f"{filename}.c")
-        elf_file_path = os.path.join(FILE_STORAGE, filename)
-
-        random_value = random.randint(1000, 9999)
-
-        # C code for the shared object
-        c_code = f"""
-        #include <stdio.h>
-
-        void display_message() {{
-            int unique_value = {random_value};
-           printf("This is a unique ELF message! The random value is: %d\\n", unique_value);
-        }}
-        """
-
-        with open(c_file_path, "w") as c_file:
-            c_file.write(c_code)
-
-        # Compile the C file into a shared object
-        try:
-            subprocess.run(['gcc', '-shared', '-fPIC', c_file_path, '-o', elf_file_path],
-                        check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        except subprocess.CalledProcessError as e:
-            logging.info(f"Error during ELF generation: {e}")
-            return None
-        
-        os.remove(c_file_path)
-
-        # Return the generated EXE filename
-        return filename if os.path.exists(elf_file_path) else None
-
+    return save_binary('elf')
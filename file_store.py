@@ -0,0 +1,175 @@
+# file_store.py
+
+"""
+Content-Addressed File Store for CP Demo Server
+
+Generated files are stored once per distinct payload under
+data/generated_files/objects/<sha256[:2]>/<sha256>. The SHA-256 is computed while
+the generator writes its bytes, and the object is published with an atomic
+rename, so concurrent writers never collide and identical payloads share a single
+object. The human-friendly file names are kept as aliases in generated_files.db
+(see db.add_file_alias).
+"""
+
+import os
+import shutil
+import hashlib
+import tempfile
+from app import logging
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GENERATED_FILES_DIR = os.path.join(BASE_DIR, 'data', 'generated_files')
+OBJECTS_DIR = os.path.join(GENERATED_FILES_DIR, 'objects')
+TMP_DIR = os.path.join(OBJECTS_DIR, 'tmp')
+
+os.makedirs(TMP_DIR, exist_ok=True)
+
+# ===========================
+# Hashing Writer
+# ===========================
+
+class HashingWriter:
+    """
+    A binary file wrapper that hashes the bytes as they are written.
+
+    Sequential writes are hashed on the fly. If a writer seeks back and rewrites
+    part of the file (e.g. zip headers or TIFF offsets), the file is re-hashed
+    once when the digest is requested.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._hash = hashlib.sha256()
+        self._hashed = 0
+        self._pos = 0
+        self._valid = True
+
+    def write(self, data):
+        if self._pos != self._hashed:
+            self._valid = False
+        written = self._raw.write(data)
+        if self._valid:
+            self._hash.update(data)
+            self._hashed += written
+        self._pos += written
+        return written
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        self._pos = self._raw.seek(offset, whence)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def seekable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        self._raw.flush()
+
+    def digest(self, path):
+        """
+        Return the SHA-256 and size of the written file.
+
+        Args:
+            path (str): The path of the underlying file, used if it must be re-hashed.
+
+        Returns:
+            tuple: The hex SHA-256 and the size in bytes.
+        """
+        self._raw.flush()
+        size = os.path.getsize(path)
+        if self._valid and self._hashed == size:
+            return self._hash.hexdigest(), size
+        return hash_file(path), size
+
+
+def hash_file(path):
+    """
+    Compute the SHA-256 of a file.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        str: The hex SHA-256.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# ===========================
+# Object Storage
+# ===========================
+
+def object_path(sha256):
+    """
+    Return the path of the object stored under a SHA-256.
+
+    Args:
+        sha256 (str): The hex SHA-256 of the payload.
+
+    Returns:
+        str: The object path.
+    """
+    return os.path.join(OBJECTS_DIR, sha256[:2], sha256)
+
+
+def store_stream(write):
+    """
+    Store the bytes produced by a writer function as a content-addressed object.
+
+    Args:
+        write (callable): Called with a binary file object to write the payload to.
+
+    Returns:
+        tuple: The hex SHA-256 and the size in bytes of the stored payload.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=TMP_DIR)
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            writer = HashingWriter(raw)
+            write(writer)
+            sha256, size = writer.digest(tmp_path)
+
+        target = object_path(sha256)
+        if os.path.exists(target):
+            # Identical payload already stored, keep a single copy
+            os.remove(tmp_path)
+            logging.debug(f"Deduplicated payload {sha256}.")
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+        return sha256, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def remove_object(sha256):
+    """
+    Delete a stored object.
+
+    Args:
+        sha256 (str): The hex SHA-256 of the payload.
+    """
+    try:
+        os.remove(object_path(sha256))
+        logging.info(f"Object '{sha256}' deleted from filesystem.")
+    except FileNotFoundError:
+        logging.warning(f"Object '{sha256}' not found in filesystem.")
+
+
+def clear_objects():
+    """
+    Delete every stored object.
+    """
+    shutil.rmtree(OBJECTS_DIR, ignore_errors=True)
+    os.makedirs(TMP_DIR, exist_ok=True)
+    logging.info("All objects deleted from filesystem.")
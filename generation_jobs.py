@@ -0,0 +1,216 @@
+# generation_jobs.py
+
+"""
+Asynchronous Generation Jobs for CP Demo Server
+
+A generation request is turned into a job that is executed on the batch_generator
+process pool in the background. The request thread only submits the work and
+returns the job id; progress is tracked per file and can be polled
+(GET /jobs/<id>) or followed as a server-sent-events stream (GET /jobs/<id>/events).
+Files that are in stock in the inventory are claimed right away and are done as
+soon as the job is submitted. Seeded jobs (options['seed']) skip the inventory,
+whose files are random; identical seeded files are reused from the output cache
+of file_generator instead. Large-file jobs (options['size'], see large_files)
+generate their single size-targeted file in a pool worker.
+
+Notes:
+- Jobs live in the memory of the server process that accepted them, so the status
+  endpoints must be served by the same process (the default for the Flask server).
+- Finished jobs are forgotten after JOB_TTL seconds.
+"""
+
+import json
+import time
+import uuid
+import threading
+from app import logging
+from app.batch_generator import submit_batch, submit_large, collect_result
+from app.inventory import claim_file
+
+# Seconds a finished job is kept for status queries
+JOB_TTL = 3600
+
+# Seconds between keep-alive comments on an idle event stream
+EVENT_KEEPALIVE = 15
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+# ===========================
+# Job Model
+# ===========================
+
+class GenerationJob:
+    """
+    A set of files generated together, with the state of each file.
+
+    File states move from 'queued' to 'running' and end as 'done' or 'failed'.
+    """
+
+    def __init__(self, file_types, options):
+        self.id = uuid.uuid4().hex
+        self.file_types = list(dict.fromkeys(file_types))
+        self.options = dict(options)
+        self.created = time.time()
+        self.finished = None
+        self.version = 0
+        self.changed = threading.Condition()
+        self.files = {
+            file_type: {'state': 'queued', 'filename': None, 'error': None, 'elapsed': None}
+            for file_type in self.file_types
+        }
+        self._futures = {}
+
+    @property
+    def state(self):
+        """The overall job state: 'queued', 'running' or 'completed'."""
+        if self.finished is not None:
+            return 'completed'
+        if any(entry['state'] != 'queued' for entry in self.files.values()):
+            return 'running'
+        return 'queued'
+
+    def start(self):
+        """Claim the files that are in stock and submit the others to the generation process pool."""
+        if self.options.get('size'):
+            # Large files are never stocked
+            self._futures = submit_large(self.file_types[0], self.options['size'], self.options.get('url_type', 'malicious'))
+        else:
+            missing = []
+            for file_type in self.file_types:
+                filename = claim_file(file_type, self.options) if self.options.get('seed') is None else None
+                if filename:
+                    self.files[file_type].update({'state': 'done', 'filename': filename, 'elapsed': 0.0})
+                else:
+                    missing.append(file_type)
+
+            if not missing:
+                self.finished = time.time()
+                logging.info(f"Generation job {self.id} served from the inventory.")
+                return
+
+            self._futures = submit_batch(missing, self.options)
+
+        for future, file_type in self._futures.items():
+            future.add_done_callback(lambda future, file_type=file_type: self._file_finished(future, file_type))
+
+    def _refresh_running(self):
+        """Mark files whose pool task has been picked up by a worker as running."""
+        for future, file_type in self._futures.items():
+            if self.files[file_type]['state'] == 'queued' and future.running():
+                self.files[file_type]['state'] = 'running'
+
+    def _file_finished(self, future, file_type):
+        """Record the result of a single file and wake up any listeners."""
+        result = collect_result(future, file_type)
+        with self.changed:
+            self.files[file_type].update({
+                'state': 'failed' if result['error'] else 'done',
+                'filename': result['filename'],
+                'error': result['error'],
+                'elapsed': result['elapsed'],
+            })
+            if result.get('size') is not None:
+                self.files[file_type].update({'size': result['size'], 'bytes_per_second': result['bytes_per_second']})
+            if all(entry['state'] in ('done', 'failed') for entry in self.files.values()):
+                self.finished = time.time()
+                logging.info(f"Generation job {self.id} completed in {self.finished - self.created:.3f}s.")
+            self.version += 1
+            self.changed.notify_all()
+
+    def to_dict(self):
+        """
+        Return a JSON-serializable snapshot of the job.
+
+        Returns:
+            dict: The job id, overall state, timestamps and per-file state.
+        """
+        with self.changed:
+            self._refresh_running()
+            return {
+                'id': self.id,
+                'seed': self.options.get('seed'),
+                'target_size': self.options.get('size'),
+                'state': self.state,
+                'created': self.created,
+                'finished': self.finished,
+                'files': [dict(self.files[file_type], file_type=file_type) for file_type in self.file_types],
+            }
+
+# ===========================
+# Job Registry
+# ===========================
+
+def submit_job(file_types, options):
+    """
+    Create a generation job and start it in the background.
+
+    Args:
+        file_types (list): The file types to generate, a single type for a large file.
+        options (dict): The generation options keyed by batch_generator.GENERATION_OPTIONS,
+            or 'url_type' and the target 'size' in bytes for a large file.
+
+    Returns:
+        GenerationJob: The submitted job.
+    """
+    job = GenerationJob(file_types, options)
+    with _jobs_lock:
+        _prune_jobs()
+        _jobs[job.id] = job
+    logging.info(f"Generation job {job.id} submitted for {job.file_types}.")
+    job.start()
+    return job
+
+
+def get_job(job_id):
+    """
+    Retrieve a job by its id.
+
+    Args:
+        job_id (str): The job id returned by submit_job.
+
+    Returns:
+        GenerationJob or None: The job if it is known, else None.
+    """
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def _prune_jobs():
+    """Forget jobs that finished more than JOB_TTL seconds ago. Caller holds _jobs_lock."""
+    cutoff = time.time() - JOB_TTL
+    for job_id in [job_id for job_id, job in _jobs.items() if job.finished and job.finished < cutoff]:
+        del _jobs[job_id]
+
+# ===========================
+# Server-Sent Events
+# ===========================
+
+def job_events(job):
+    """
+    Yield server-sent events describing the progress of a job.
+
+    A 'progress' event is sent with the current snapshot and after every file that
+    finishes; a final 'complete' event closes the stream.
+
+    Args:
+        job (GenerationJob): The job to follow.
+
+    Yields:
+        str: Event stream chunks.
+    """
+    seen = -1
+    while True:
+        with job.changed:
+            if job.version == seen and job.finished is None:
+                job.changed.wait(timeout=EVENT_KEEPALIVE)
+            version = job.version
+        if version == seen:
+            yield ": keep-alive\n\n"
+            continue
+        seen = version
+        snapshot = job.to_dict()
+        if snapshot['state'] == 'completed':
+            yield f"event: complete\ndata: {json.dumps(snapshot)}\n\n"
+            return
+        yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
@@ -0,0 +1,127 @@
+# image_writer.py
+
+"""
+Image Writer for CP Demo Server
+
+Draws the generated images with PIL, both for the image file types and for the
+images embedded in documents. Loaded lazily through the generator registry of
+file_generator, so PIL is only imported by the processes that actually need it.
+"""
+
+from io import BytesIO
+from functools import lru_cache
+from PIL import Image, ImageDraw
+from app.file_generator import generate_random_url
+from app.rng import get_rng
+from app.resources import get_font, get_default_font
+
+@lru_cache(maxsize=1)
+def gradient_background(size=500):
+    """
+    Build the left-to-right gradient used as the background of generated images.
+
+    The gradient is built once as a single row and stretched vertically, then
+    cached; callers must copy() it before drawing on it.
+
+    Args:
+        size (int): The width and height of the square image.
+
+    Returns:
+        Image: The gradient background in RGB mode.
+    """
+    row = bytearray()
+    for i in range(size):
+        row += bytes((int(255 * i / size), int(255 * (size - i) / size), 100))  # constant blue value for gradient
+    return Image.frombytes("RGB", (size, 1), bytes(row)).resize((size, size), Image.NEAREST)
+
+def render_image(file_type, url_type, include_sensitive_link):
+    """
+    Draw a random image in memory.
+
+    Args:
+        file_type (str): The image type, shown in the image title.
+        url_type (str): Type of URL to print at the bottom ('malicious', 'clean' or 'none').
+        include_sensitive_link (str): "on" to print the sensitive link.
+
+    Returns:
+        Image: The drawn image in RGB mode.
+    """
+    # Start from a copy of the cached gradient background (RGB mode, required for JPG)
+    img = gradient_background().copy()
+    draw = ImageDraw.Draw(img)
+    rng = get_rng()
+
+    # Add some random shapes for complexity
+    for _ in range(10):  # Add 10 random shapes
+        shape_type = rng.choice(["ellipse", "rectangle", "polygon"])
+        x1, y1 = rng.randint(0, 400), rng.randint(0, 400)
+        x2, y2 = rng.randint(x1 + 20, 500), rng.randint(y1 + 20, 500)
+        
+        if shape_type == "ellipse":
+            draw.ellipse([x1, y1, x2, y2], outline="black", width=3)
+        elif shape_type == "rectangle":
+            draw.rectangle([x1, y1, x2, y2], outline="blue", width=3)
+        elif shape_type == "polygon":
+            draw.polygon([x1, y1, x2, y2, rng.randint(0, 500), rng.randint(0, 500)], outline="green", width=3)
+
+    # Add dynamic text with varied size, fonts, and color
+    text = f"Random {file_type.upper()} Image"
+    font_size = rng.randint(20, 50)
+    font = get_font(font_size)  # Cached nicer font, or the default font if it isn't available
+
+    # Use textbbox to get the bounding box of the text
+    text_bbox = draw.textbbox((0, 0), text, font=font)
+    text_width = text_bbox[2] - text_bbox[0]
+    text_height = text_bbox[3] - text_bbox[1]
+
+    x = (500 - text_width) // 2
+    y = (500 - text_height) // 4
+    text_color = (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255))
+    draw.text((x, y), text, fill=text_color, font=font)
+                
+    # Add the URL text at the bottom
+    if url_type != 'none':
+        random_url = generate_random_url(url_type)
+        url_text = f"{random_url}"
+        url_font = get_default_font()
+        url_text_bbox = draw.textbbox((0, 0), url_text, font=url_font)
+        url_text_width = url_text_bbox[2] - url_text_bbox[0]
+        draw.text(((500 - url_text_width) // 2, 450), url_text, font=url_font, fill=(0, 0, 0))
+
+    # Include include_sensitive_link if specified
+    if include_sensitive_link == "on":
+        sensitive_link = "\\server\share"
+        link_text = f"{sensitive_link}"
+        link_font = get_default_font()
+        link_text_bbox = draw.textbbox((0, 0), link_text, font=link_font)
+        link_text_width = link_text_bbox[2] - link_text_bbox[0]
+        draw.text(((500 - link_text_width) // 2, 450), link_text, font=link_font, fill=(0, 0, 0))
+        
+    return img
+
+def save_image(img, fp, file_type):
+    # Save the image in the requested format (JPG or others)
+    if file_type.lower() == 'jpg':
+        img.save(fp, format='JPEG')
+    else:
+        img.save(fp, format=file_type.upper())  # Use the appropriate format for other types
+
+def render_image_buffer(file_type, url_type, include_sensitive_link):
+    """
+    Draw a random image and encode it into an in-memory buffer.
+
+    Used by the document generators to embed an image without writing it to disk.
+
+    Returns:
+        BytesIO: The encoded image, positioned at the start.
+    """
+    buffer = BytesIO()
+    save_image(render_image(file_type, url_type, include_sensitive_link), buffer, file_type)
+    buffer.seek(0)
+    return buffer
+
+def write_image(fp, file_type, url_type, include_sensitive_link):
+    """
+    Write a random image in the requested format to a binary file object.
+    """
+    save_image(render_image(file_type, url_type, include_sensitive_link), fp, file_type)
@@ -0,0 +1,309 @@
+# inventory.py
+
+"""
+Pre-Warmed File Inventory for CP Demo Server
+
+A background producer keeps a stock of STOCK_SIZE ready files for every
+combination of file type and generation options (url_type and the include_* flags)
+that is in demand. /generate and /stream claim a file from the stock instantly and
+only fall back to running the generators when the stock is empty; every claim
+wakes the producer, which refills the stock on the batch_generator process pool.
+
+Stocked files are stored like any other generated file (see file_store), but they
+are only recorded in generated_files.db (and shown in the file list) once claimed.
+The stock itself lives in the inventory table, so claims are atomic across server
+processes and the stock survives restarts.
+
+Usage:
+    start_inventory()
+    filename = claim_file('pdf', options)
+
+Configuration:
+- CP_INVENTORY_SIZE: Number of ready files kept per combination (default 0, the
+  inventory is disabled; 2 is a good start).
+- CP_INVENTORY_PRESETS: Comma-separated file types stocked from startup with the
+  default options (malicious URLs, every feature off). Other combinations are
+  stocked from the first time they are requested.
+- CP_INVENTORY_MAX_COMBINATIONS: Number of requested combinations kept stocked (default 16).
+  The least recently requested one is dropped, with its stock, to make room.
+- CP_INVENTORY_TTL: Seconds a requested combination stays stocked after its last
+  request (default 3600). Preset combinations never expire.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from app import logging
+from app.batch_generator import GENERATION_OPTIONS, get_executor, reset_executor, collect_result, _generate_in_worker
+from app.db import (
+    add_inventory_file,
+    claim_inventory_file,
+    count_inventory_files,
+    delete_generated_file,
+    resolve_generated_file_path,
+    save_generated_file_to_db,
+)
+
+STOCK_SIZE = int(os.environ.get('CP_INVENTORY_SIZE', 0))
+
+PRESET_FILE_TYPES = [file_type for file_type in os.environ.get('CP_INVENTORY_PRESETS', '').split(',') if file_type.strip()]
+
+MAX_COMBINATIONS = int(os.environ.get('CP_INVENTORY_MAX_COMBINATIONS', 16))
+
+COMBINATION_TTL = int(os.environ.get('CP_INVENTORY_TTL', 3600))
+
+# Options of the combinations stocked through CP_INVENTORY_PRESETS
+DEFAULT_OPTIONS = {'url_type': 'malicious'}
+
+# Seconds between two stock checks when nothing was claimed
+REFILL_INTERVAL = 30
+
+# Seconds before a combination whose generator failed is stocked again
+RETRY_DELAY = 300
+
+# Tracked combinations, least recently requested first, and when they were last requested
+_tracked = OrderedDict()
+_last_requested = {}
+_presets = set()
+_pending = Counter()
+_retry_after = {}
+_state_lock = threading.Lock()
+_wake = threading.Event()
+_producer = None
+
+# ===========================
+# Stock Keys
+# ===========================
+
+def stock_key(file_type, options):
+    """
+    Return the key under which files of a type and set of options are stocked.
+
+    Args:
+        file_type (str): The type of file.
+        options (dict): The generation options keyed by GENERATION_OPTIONS.
+
+    Returns:
+        str: The stock key.
+    """
+    return json.dumps([file_type] + [options.get(name, 'off') for name in GENERATION_OPTIONS])
+
+
+def parse_stock_key(key):
+    """
+    Return the file type and generation options of a stock key.
+
+    Args:
+        key (str): A key returned by stock_key.
+
+    Returns:
+        tuple: The file type and the options keyed by GENERATION_OPTIONS.
+    """
+    file_type, *values = json.loads(key)
+    return file_type, dict(zip(GENERATION_OPTIONS, values))
+
+
+def track(file_type, options, preset=False):
+    """
+    Keep a combination stocked from now on.
+
+    Tracking a combination counts as a request: it becomes the most recently
+    requested one, and the combinations beyond MAX_COMBINATIONS or older than
+    COMBINATION_TTL are dropped.
+
+    Args:
+        file_type (str): The type of file.
+        options (dict): The generation options keyed by GENERATION_OPTIONS.
+        preset (bool): Whether the combination is a preset, which is never dropped.
+
+    Returns:
+        str: The stock key of the combination.
+    """
+    key = stock_key(file_type, options)
+    with _state_lock:
+        if key not in _tracked:
+            _tracked[key] = (file_type, {name: options.get(name, 'off') for name in GENERATION_OPTIONS})
+            logging.info(f"Inventory now stocks {key}.")
+        _tracked.move_to_end(key)
+        _last_requested[key] = time.monotonic()
+        if preset:
+            _presets.add(key)
+        expired = _expire()
+    _discard(expired)
+    return key
+
+
+def _expire():
+    """
+    Stop tracking the combinations beyond MAX_COMBINATIONS or older than COMBINATION_TTL.
+
+    Caller holds _state_lock.
+
+    Returns:
+        list: The stock keys that are no longer tracked.
+    """
+    cutoff = time.monotonic() - COMBINATION_TTL
+    requested = [key for key in _tracked if key not in _presets]
+    expired = [key for key in requested if _last_requested[key] < cutoff]
+    expired += [key for key in requested[:max(0, len(requested) - MAX_COMBINATIONS)] if key not in expired]
+    for key in expired:
+        del _tracked[key]
+        del _last_requested[key]
+        _retry_after.pop(key, None)
+    return expired
+
+
+def _discard(keys):
+    """Delete the stock of combinations that are no longer tracked."""
+    for key in keys:
+        discarded = 0
+        while True:
+            filename = claim_inventory_file(key)
+            if filename is None:
+                break
+            delete_generated_file(filename)
+            discarded += 1
+        logging.info(f"Inventory no longer stocks {key}, discarded {discarded} file(s).")
+
+# ===========================
+# Claiming Files
+# ===========================
+
+def claim_file(file_type, options, record=True):
+    """
+    Take a ready file out of the stock.
+
+    Args:
+        file_type (str): The type of file.
+        options (dict): The generation options keyed by GENERATION_OPTIONS.
+        record (bool): Whether to record the claimed file in generated_files.db.
+
+    Returns:
+        str or None: The claimed file name, or None if nothing is in stock.
+    """
+    if STOCK_SIZE <= 0:
+        return None
+
+    start_inventory()
+    key = track(file_type, options)
+    _wake.set()
+    while True:
+        filename = claim_inventory_file(key)
+        if filename is None:
+            logging.info(f"Inventory miss for {key}.")
+            return None
+        # Stock can be wiped from under the inventory (e.g. by delete_all)
+        if resolve_generated_file_path(filename):
+            break
+        logging.warning(f"Stocked file '{filename}' no longer exists, skipping it.")
+
+    logging.info(f"Claimed '{filename}' from the inventory.")
+    if record:
+        values = {name: options.get(name, 'off') for name in GENERATION_OPTIONS}
+        save_generated_file_to_db(
+            filename, file_type, values['url_type'], values['include_image'], values['include_sensitive_link'],
+            values['include_script'], values['include_video'], values['include_audio'], values['include_3d'],
+            values['include_pdf'], values['include_external_app'], values['include_data_submission']
+        )
+    return filename
+
+# ===========================
+# Background Producer
+# ===========================
+
+def _stock_finished(future, key):
+    """Put a freshly generated file in stock and wake the producer."""
+    file_type, _ = parse_stock_key(key)
+    result = collect_result(future, file_type)
+    with _state_lock:
+        _pending[key] -= 1
+        tracked = key in _tracked
+        if result['error'] and tracked:
+            _retry_after[key] = time.monotonic() + RETRY_DELAY
+    if result['error']:
+        logging.warning(f"Could not stock {key}, retrying in {RETRY_DELAY}s: {result['error']}")
+    elif tracked:
+        add_inventory_file(result['filename'], key)
+    else:
+        # The combination was dropped while the file was being generated
+        delete_generated_file(result['filename'])
+    _wake.set()
+
+
+def refill():
+    """
+    Submit the generations needed to bring every tracked combination back to STOCK_SIZE.
+
+    Returns:
+        int: The number of generations submitted.
+    """
+    with _state_lock:
+        expired = _expire()
+    _discard(expired)
+
+    stock = count_inventory_files()
+    now = time.monotonic()
+    submitted = 0
+    with _state_lock:
+        wanted = [
+            (key, file_type, options, STOCK_SIZE - stock.get(key, 0) - _pending[key])
+            for key, (file_type, options) in _tracked.items()
+            if _retry_after.get(key, 0) <= now
+        ]
+
+    for key, file_type, options, missing in wanted:
+        for _ in range(missing):
+            try:
+                future = get_executor().submit(_generate_in_worker, file_type, options, False)
+            except BrokenProcessPool:
+                logging.warning("Generation process pool is broken, restarting it.")
+                reset_executor()
+                return submitted
+            with _state_lock:
+                _pending[key] += 1
+            future.add_done_callback(lambda future, key=key: _stock_finished(future, key))
+            submitted += 1
+    return submitted
+
+
+def _produce():
+    """Refill the stock whenever a file is claimed or produced, and every REFILL_INTERVAL."""
+    while True:
+        _wake.wait(timeout=REFILL_INTERVAL)
+        _wake.clear()
+        try:
+            submitted = refill()
+            if submitted:
+                logging.debug(f"Inventory refill submitted {submitted} generation(s).")
+        except Exception as e:
+            logging.error(f"Error refilling the inventory: {e}", exc_info=True)
+
+
+def start_inventory():
+    """
+    Start the background producer (once per process).
+
+    Tracks the CP_INVENTORY_PRESETS combinations and every combination already in
+    stock, then fills them up to STOCK_SIZE.
+    """
+    global _producer
+    if STOCK_SIZE <= 0:
+        logging.info("Inventory disabled (CP_INVENTORY_SIZE=0).")
+        return
+
+    with _state_lock:
+        if _producer is not None:
+            return
+        _producer = threading.Thread(target=_produce, name='inventory-producer', daemon=True)
+
+    for file_type in PRESET_FILE_TYPES:
+        track(file_type.strip(), DEFAULT_OPTIONS, preset=True)
+    for key in count_inventory_files():
+        track(*parse_stock_key(key))
+
+    logging.info(f"Starting inventory producer with {STOCK_SIZE} file(s) per combination.")
+    _producer.start()
+    _wake.set()
@@ -0,0 +1,472 @@
+# large_files.py
+
+"""
+Size-Targeted Large File Generation for CP Demo Server
+
+Generates PDF, XLSX, RTF, BMP and PNG samples of a requested size (e.g. 50 MB to
+2 GB) to test gateway file-size limits. Unlike the regular generators, nothing is
+built in memory: pages, rows and pixel bands are written straight to the output
+in blocks of about BLOCK_SIZE bytes, so peak RSS stays flat whatever the target
+size. The files are filled with random data, so they don't compress much below
+their size.
+
+Usage:
+    result = generate_large_file('pdf', parse_size('500MB'))
+    python -m app.large_files pdf 500MB
+
+Configuration:
+- CP_LARGE_FILE_MAX_MB: Largest size that can be requested, in MB (default 2048).
+"""
+
+import os
+import sys
+import time
+import zlib
+import struct
+import zipfile
+import argparse
+from xml.sax.saxutils import escape
+from app import logging
+from app.file_generator import generate_random_url, store_generated_file
+from app.rng import get_rng
+from app.db import save_generated_file_to_db
+
+MIN_SIZE = 1024 * 1024
+MAX_SIZE = int(os.environ.get('CP_LARGE_FILE_MAX_MB', 2048)) * 1024 * 1024
+
+# Approximate number of bytes produced per write
+BLOCK_SIZE = 1024 * 1024
+
+# Width of the generated images (a multiple of 4, so BMP rows need no padding)
+IMAGE_WIDTH = 4096
+
+# Height of the band carrying the URL at the top of the generated images
+URL_BAND_HEIGHT = 48
+
+SIZE_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+# ===========================
+# Helpers
+# ===========================
+
+class _Output:
+    """A write-only wrapper counting the bytes written to a binary file object."""
+
+    def __init__(self, fp):
+        self._fp = fp
+        self.written = 0
+
+    def write(self, data):
+        self._fp.write(data)
+        self.written += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.written
+
+    def flush(self):
+        self._fp.flush()
+
+
+def parse_size(value):
+    """
+    Parse a size such as '500MB', '2GB' or '1048576'.
+
+    Args:
+        value (str or int): The size, with an optional B/KB/MB/GB unit.
+
+    Returns:
+        int: The size in bytes.
+
+    Raises:
+        ValueError: If the size can't be parsed.
+    """
+    text = str(value).strip().upper().replace(' ', '')
+    number = text.rstrip('KMGB')
+    unit = text[len(number):]
+    try:
+        return int(float(number) * SIZE_UNITS[unit])
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid size: {value}") from None
+
+
+def format_size(size):
+    """Return a short label for a size in bytes (e.g. '500MB')."""
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def _random_text(length):
+    """Return random hexadecimal text of the given length."""
+    return get_rng().randbytes((length + 1) // 2).hex()[:length]
+
+
+def _url_band(url, width, mode):
+    """
+    Render the URL band placed at the top of the generated images.
+
+    Args:
+        url (str): The URL to draw.
+        width (int): The image width in pixels.
+        mode (str): The raw pixel layout ('RGB' for PNG, 'BGR' for BMP).
+
+    Returns:
+        bytes: URL_BAND_HEIGHT rows of raw pixels.
+    """
+    from PIL import Image, ImageDraw
+    from app.resources import get_font
+
+    band = Image.new("RGB", (width, URL_BAND_HEIGHT), "white")
+    ImageDraw.Draw(band).text((10, 10), url, fill="black", font=get_font(24))
+    return band.tobytes('raw', mode)
+
+# ===========================
+# Streaming Writers
+# ===========================
+
+def write_large_pdf(fp, target_size, url):
+    """
+    Write a PDF of about target_size bytes, one page of up to BLOCK_SIZE bytes at a time.
+
+    Only the offsets of the objects (a few bytes per page) are kept in memory.
+    """
+    out = _Output(fp)
+    offsets = {}
+    page_ids = []
+
+    def write_object(number, body, stream=None):
+        offsets[number] = out.written
+        if stream is None:
+            out.write(f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1'))
+        else:
+            out.write(f"{number} 0 obj\n<< /Length {len(stream)} >>\nstream\n".encode('latin-1'))
+            out.write(stream)
+            out.write(b"\nendstream\nendobj\n")
+
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    write_object(1, "<< /Type /Catalog /Pages 2 0 R >>")
+    write_object(3, "<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>")
+
+    # Bytes left for the page tree, the xref table and the trailer
+    reserve = 256
+    number = 4
+    while out.written + reserve < target_size:
+        page_id, content_id = number, number + 1
+        number += 2
+        page_ids.append(page_id)
+        reserve += 60  # Page tree entry and xref entries of the page
+
+        annotations = ""
+        lines = ["BT /F1 8 Tf 36 800 Td 9 TL"]
+        if url and len(page_ids) == 1:
+            escaped = url.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            lines.append(f"(Here is a URL: {escaped}) Tj T*")
+            annotations = f" /Annots [<< /Type /Annot /Subtype /Link /Rect [36 790 560 810] /Border [0 0 0] /A << /S /URI /URI ({escaped}) >> >>]"
+
+        page_budget = min(BLOCK_SIZE, max(target_size - out.written - reserve - 256, 64))
+        length = sum(len(line) + 1 for line in lines)
+        # Lines of 96 random characters ("(...) Tj T*" adds 8)
+        text = _random_text(max(page_budget - length, 1) * 96 // 105 + 1)
+        lines.extend(f"({text[offset:offset + 96]}) Tj T*" for offset in range(0, len(text), 96))
+        lines.append("ET")
+
+        write_object(page_id, f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R{annotations} >>")
+        write_object(content_id, None, "\n".join(lines).encode('latin-1'))
+
+    write_object(2, f"<< /Type /Pages /Kids [{' '.join(f'{page_id} 0 R' for page_id in page_ids)}] /Count {len(page_ids)} >>")
+
+    xref_offset = out.written
+    out.write(f"xref\n0 {number}\n0000000000 65535 f \n".encode('latin-1'))
+    for object_id in range(1, number):
+        out.write(f"{offsets[object_id]:010d} 00000 n \n".encode('latin-1'))
+    out.write(f"trailer\n<< /Size {number} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode('latin-1'))
+
+
+def write_large_xlsx(fp, target_size, url):
+    """
+    Write an XLSX workbook of about target_size bytes, streaming the rows of its sheet.
+
+    The sheet is stored uncompressed so that the file size follows the target, and
+    the zip is written with data descriptors, without seeking back.
+    """
+    out = _Output(fp)
+    cell_text = 32
+    cell = len('<c t="inlineStr"><is><t></t></is></c>') + cell_text
+    # Keep within Excel's 1,048,576 rows and 16,384 columns
+    columns = min(max(8, -(-target_size // (1_000_000 * cell))), 16384)
+
+    parts = {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        ),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+            '</Relationships>'
+        ),
+    }
+
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED) as package:
+        for name, xml in parts.items():
+            package.writestr(name, xml)
+
+        # Bytes left for the end of the sheet and the central directory
+        reserve = 1024
+        info = zipfile.ZipInfo('xl/worksheets/sheet1.xml', date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        with package.open(info, 'w', force_zip64=target_size > zipfile.ZIP64_LIMIT // 2) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            if url:
+                sheet.write(f'<row><c t="inlineStr"><is><t>Here is a URL: {escape(url)}</t></is></c></row>'.encode('utf-8'))
+
+            row_text = columns * cell_text
+            while out.written + reserve < target_size:
+                rows = max(1, min(BLOCK_SIZE, target_size - out.written - reserve) // (columns * cell + len("<row></row>")))
+                text = _random_text(rows * row_text)
+                sheet.write(''.join(
+                    '<row>' + ''.join(
+                        f'<c t="inlineStr"><is><t>{text[offset:offset + cell_text]}</t></is></c>'
+                        for offset in range(start, start + row_text, cell_text)
+                    ) + '</row>'
+                    for start in range(0, len(text), row_text)
+                ).encode('ascii'))
+            sheet.write(b'</sheetData></worksheet>')
+
+
+def write_large_rtf(fp, target_size, url):
+    """
+    Write an RTF document of about target_size bytes, one block of paragraphs at a time.
+    """
+    out = _Output(fp)
+    out.write(b"{\\rtf1\\ansi\\deff0 {\\fonttbl {\\f0 Courier;}}\n\\fs24 Random RTF File Content\\par\n")
+    if url:
+        out.write(f"Here is a URL: \\ul {url} \\ulnone\\par\n".encode('utf-8'))
+
+    while out.written + 2 < target_size:
+        # Paragraphs of 120 random characters ("\\par\n" adds 5)
+        text = _random_text(max(min(BLOCK_SIZE, target_size - out.written - 2) * 120 // 125, 1))
+        out.write("".join(f"{text[offset:offset + 120]}\\par\n" for offset in range(0, len(text), 120)).encode('ascii'))
+    out.write(b"}\n")
+
+
+def _image_height(target_size, header_size, row_size):
+    """Return the number of rows needed to bring an image to about target_size bytes."""
+    return max(URL_BAND_HEIGHT + 1, (target_size - header_size) // row_size)
+
+
+def write_large_bmp(fp, target_size, url):
+    """
+    Write a 24-bit BMP of about target_size bytes, streaming bands of random pixels.
+
+    The image is stored top-down (negative height) so the URL band comes first.
+    """
+    row_size = IMAGE_WIDTH * 3
+    height = _image_height(target_size, 54, row_size)
+    image_size = row_size * height
+
+    fp.write(struct.pack('<2sIHHI', b'BM', 54 + image_size, 0, 0, 54))
+    fp.write(struct.pack('<IiiHHIIiiII', 40, IMAGE_WIDTH, -height, 1, 24, 0, image_size, 2835, 2835, 0, 0))
+
+    rows = 0
+    if url:
+        fp.write(_url_band(url, IMAGE_WIDTH, 'BGR'))
+        rows = URL_BAND_HEIGHT
+    band_rows = max(1, BLOCK_SIZE // row_size)
+    while rows < height:
+        count = min(band_rows, height - rows)
+        fp.write(get_rng().randbytes(row_size * count))
+        rows += count
+
+
+def _png_chunk(kind, data):
+    """Return a PNG chunk."""
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def write_large_png(fp, target_size, url):
+    """
+    Write an RGB PNG of about target_size bytes, streaming bands of random pixels.
+
+    The pixel data is deflated at level 0 (stored blocks), so the file size is
+    predictable from the image dimensions; each band is written as its own IDAT chunk.
+    """
+    row_size = IMAGE_WIDTH * 3
+    height = _image_height(target_size, 1024, row_size + 1)
+
+    fp.write(b'\x89PNG\r\n\x1a\n')
+    fp.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', IMAGE_WIDTH, height, 8, 2, 0, 0, 0)))
+    if url:
+        fp.write(_png_chunk(b'tEXt', b'URL\x00' + url.encode('latin-1', 'replace')))
+
+    compressor = zlib.compressobj(0)
+    rows = 0
+    if url:
+        band = _url_band(url, IMAGE_WIDTH, 'RGB')
+        fp.write(_png_chunk(b'IDAT', compressor.compress(b''.join(
+            b'\x00' + band[row * row_size:(row + 1) * row_size] for row in range(URL_BAND_HEIGHT)
+        ))))
+        rows = URL_BAND_HEIGHT
+    band_rows = max(1, BLOCK_SIZE // row_size)
+    while rows < height:
+        count = min(band_rows, height - rows)
+        pixels = get_rng().randbytes(row_size * count)
+        data = compressor.compress(b''.join(
+            b'\x00' + pixels[row * row_size:(row + 1) * row_size] for row in range(count)
+        ))
+        if data:
+            fp.write(_png_chunk(b'IDAT', data))
+        rows += count
+    fp.write(_png_chunk(b'IDAT', compressor.flush()))
+    fp.write(_png_chunk(b'IEND', b''))
+
+
+# Size-targeted writers by file type, called as writer(fp, target_size, url)
+LARGE_FILE_WRITERS = {
+    'pdf': write_large_pdf,
+    'xlsx': write_large_xlsx,
+    'rtf': write_large_rtf,
+    'bmp': write_large_bmp,
+    'png': write_large_png,
+}
+
+# ===========================
+# Generation
+# ===========================
+
+def check_large_file(file_type, target_size):
+    """
+    Check that a large file of this type and size can be generated.
+
+    Args:
+        file_type (str): The requested file type.
+        target_size (int): The requested size in bytes.
+
+    Raises:
+        ValueError: If the file type or the size is not supported.
+    """
+    if file_type not in LARGE_FILE_WRITERS:
+        raise ValueError(f"Unsupported file type for large files: {file_type}")
+    if not MIN_SIZE <= target_size <= MAX_SIZE:
+        raise ValueError(f"Size must be between {format_size(MIN_SIZE)} and {format_size(MAX_SIZE)}.")
+
+
+def write_large_file(fp, file_type, target_size, url_type='malicious'):
+    """
+    Write a file of about target_size bytes to a binary file object, in blocks.
+
+    The output is only ever appended to, so fp doesn't need to be seekable.
+
+    Args:
+        fp (file): The binary file object to write to.
+        file_type (str): One of LARGE_FILE_WRITERS.
+        target_size (int): The requested size in bytes (MIN_SIZE to MAX_SIZE).
+        url_type (str): Type of URL to include ("malicious", "clean" or "none").
+
+    Returns:
+        int: The number of bytes written.
+
+    Raises:
+        ValueError: If the file type or the size is not supported.
+    """
+    check_large_file(file_type, target_size)
+
+    url = generate_random_url(url_type) if url_type != 'none' else None
+    out = _Output(fp)
+    LARGE_FILE_WRITERS[file_type](out, target_size, url)
+    return out.written
+
+
+def generate_large_file(file_type, target_size, url_type='malicious'):
+    """
+    Generate a file of about target_size bytes and store it like any generated file.
+
+    Args:
+        file_type (str): One of LARGE_FILE_WRITERS.
+        target_size (int): The requested size in bytes (MIN_SIZE to MAX_SIZE).
+        url_type (str): Type of URL to include ("malicious", "clean" or "none").
+
+    Returns:
+        dict: 'filename', 'file_type', 'target_size', 'size' (bytes), 'elapsed'
+        (seconds) and 'bytes_per_second'.
+
+    Raises:
+        ValueError: If the file type or the size is not supported.
+    """
+    check_large_file(file_type, target_size)
+
+    filename = f"generated_{file_type}_file_{get_rng().randint(1000, 9999)}_{format_size(target_size)}.{file_type}"
+    written = {}
+
+    def write(fp):
+        written['size'] = write_large_file(fp, file_type, target_size, url_type)
+
+    started = time.perf_counter()
+    filename = store_generated_file(filename, write)
+    elapsed = time.perf_counter() - started
+
+    save_generated_file_to_db(filename, file_type, url_type, 'off', 'off', 'off', 'off', 'off', 'off', 'off', 'off', 'off')
+
+    result = {
+        'filename': filename,
+        'file_type': file_type,
+        'target_size': target_size,
+        'size': written['size'],
+        'elapsed': elapsed,
+        'bytes_per_second': written['size'] / elapsed if elapsed > 0 else None,
+    }
+    logging.info(
+        f"Large {file_type} file '{filename}' generated: {written['size']} bytes in {elapsed:.2f}s "
+        f"({written['size'] / max(elapsed, 1e-9) / 1024 ** 2:.1f} MB/s)."
+    )
+    return result
+
+# ===========================
+# Command Line
+# ===========================
+
+def main(argv=None):
+    """Generate a large file from the command line and print its size, throughput and peak RSS."""
+    from app.benchmark import peak_rss_kb
+
+    parser = argparse.ArgumentParser(description="Generate a size-targeted file for file-size limit tests.")
+    parser.add_argument('file_type', choices=sorted(LARGE_FILE_WRITERS))
+    parser.add_argument('size', type=parse_size, help="Target size, e.g. 50MB or 2GB.")
+    parser.add_argument('--url-type', default='malicious', choices=['malicious', 'clean', 'none'])
+    args = parser.parse_args(argv)
+
+    try:
+        result = generate_large_file(args.file_type, args.size, args.url_type)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(f"{result['filename']}: {result['size']} bytes in {result['elapsed']:.2f}s "
+          f"({result['bytes_per_second'] / 1024 ** 2:.1f} MB/s), peak RSS {peak_rss_kb()} KB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
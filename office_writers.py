@@ -0,0 +1,180 @@
+# office_writers.py
+
+"""
+Office Document Writers for CP Demo Server
+
+Writes the generated DOCX, PPTX and XLSX documents, through their cached templates
+(see ooxml_templates) or the python-docx, python-pptx and openpyxl object models.
+Loaded lazily through the generator registry of file_generator, so the office
+libraries are only imported by the processes that actually generate documents.
+"""
+
+from docx import Document
+from docx.oxml.ns import qn
+from docx.oxml import OxmlElement
+from docx.shared import RGBColor as docx_RGBColor
+from openpyxl import Workbook
+from openpyxl.drawing.image import Image as xlsImage
+from pptx import Presentation
+from pptx.util import Inches
+from app import logging
+from app.file_generator import generate_random_url
+from app.image_writer import render_image_buffer
+from app.ooxml_templates import write_patched
+
+def write_docx(fp, url_type, include_image, include_sensitive_link):
+    """
+    Write a DOCX document with the selected features to a binary file object.
+    """
+    random_url = generate_random_url() if url_type != "none" else None
+    image_buffer = render_image_buffer("jpg", url_type, include_sensitive_link) if include_image == "on" else None
+    write_patched(fp, 'docx', build_docx, random_url, image_buffer, include_sensitive_link)
+
+def build_docx(fp, random_url, image_buffer, include_sensitive_link):
+    """
+    Build a DOCX document through python-docx (see ooxml_templates for the fast path).
+    """
+    # Create a new Word document
+    doc = Document()
+    doc.add_heading("Generated Word Document", level=1)
+    doc.add_paragraph("This document might include active contents.")
+
+    if random_url is not None:
+        # Add a random URL as a clickable link
+        para = doc.add_paragraph("Visit this link: ")
+        create_hyperlink(para, random_url)
+
+    # Conditionally include sensitive link
+    if include_sensitive_link == "on":
+        sensitive_link = "\\\\server\\share"
+        para = doc.add_paragraph("Sensitive link: ")
+        create_hyperlink(para, sensitive_link)
+        logging.debug("Included sensitive link in the document.")
+
+    # Conditionally include an image
+    if image_buffer is not None:
+        doc.add_picture(image_buffer)
+        logging.debug("Included image in the document.")
+
+    # Save the document
+    doc.save(fp)
+
+def create_hyperlink(paragraph, url):
+    # Create the hyperlink XML element
+    hyperlink = OxmlElement('w:hyperlink')
+    hyperlink.set(qn('r:id'), 'rId1')  # We will handle relationships later
+    
+    # Create a run with the hyperlink text
+    r = OxmlElement('w:r')
+    t = OxmlElement('w:t')
+    t.text = url
+    r.append(t)
+    hyperlink.append(r)
+
+    # Add the hyperlink to the paragraph
+    paragraph._element.append(hyperlink)
+
+    # Style the hyperlink (blue and underlined)
+    run = paragraph.add_run(url)
+    run.font.color.rgb = docx_RGBColor(0, 0, 255)  # Blue color
+    run.font.underline = True  # Underline
+
+    return hyperlink
+
+def write_pptx(fp, url_type, include_image, include_sensitive_link):
+    """
+    Write a PowerPoint presentation with the selected features to a binary file object.
+    """
+    random_url = None
+    if url_type != 'none':
+        random_url = generate_random_url(url_type)
+        # Check if the generated URL is None and skip it
+        if random_url is None:
+            logging.info("No URL generated, skipping.")
+    image_buffer = render_image_buffer("jpg", url_type, include_sensitive_link) if include_image == "on" else None
+    write_patched(fp, 'pptx', build_pptx, random_url, image_buffer, include_sensitive_link)
+
+def build_pptx(fp, random_url, image_buffer, include_sensitive_link):
+    """
+    Build a PowerPoint presentation through python-pptx (see ooxml_templates for the fast path).
+    """
+    ppt = Presentation()
+    slide = ppt.slides.add_slide(ppt.slide_layouts[0])
+    slide.shapes.title.text = "PowerPoint with Resources"
+
+    # Add random URL if specified
+    if random_url is not None:
+        # Add a textbox for the URL and make it clickable
+        text_box = slide.shapes.placeholders[1]
+        text_frame = text_box.text_frame
+        p = text_frame.add_paragraph()
+        p.text = random_url
+        
+        # Adding hyperlink to the text
+        run = p.runs[0]
+        run.hyperlink.address = random_url
+
+    # Include sensitive link if specified
+    if include_sensitive_link == "on":
+        sensitive_link = r"\\server\share"  # Replace with your actual server share link
+        
+        # Add a textbox for the sensitive link and make it clickable
+        text_box = slide.shapes.placeholders[0]
+        text_frame = text_box.text_frame
+        p = text_frame.add_paragraph()
+        p.text = sensitive_link
+        
+        # Adding hyperlink to the sensitive link
+        run = p.runs[0]
+        run.hyperlink.address = sensitive_link
+
+    # Embed image if selected
+    if image_buffer is not None:
+        slide.shapes.add_picture(image_buffer, Inches(0.1), Inches(0.1), width=Inches(3))
+
+    # Save the PowerPoint file
+    ppt.save(fp)
+
+def write_xlsx(fp, url_type, include_image, include_sensitive_link):
+    """
+    Write an Excel workbook with the selected features to a binary file object.
+    """
+    random_url = None
+    if url_type != 'none':
+        # Generate a random URL based on the selected type
+        random_url = generate_random_url(url_type)
+        logging.info(f" The generated Link is: {random_url}")
+    image_buffer = render_image_buffer("jpg", url_type, include_sensitive_link) if include_image == "on" else None
+    write_patched(fp, 'xlsx', build_xlsx, random_url, image_buffer, include_sensitive_link)
+
+def build_xlsx(fp, random_url, image_buffer, include_sensitive_link):
+    """
+    Build an Excel workbook through openpyxl (see ooxml_templates for the fast path).
+    """
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["This is an Excel file."])
+
+
+    # Include include_sensitive_link if specified
+    if include_sensitive_link == "on":
+        sensitive_link = "\\server\share"
+        logging.info(f" The sensitive Link is: {sensitive_link}")
+        # Add the hyperlink to the Excel cell
+        ws['A4'] = "Click here to visit the link"
+        ws['A4'].hyperlink = sensitive_link  # This makes the text a clickable hyperlink
+        ws['A4'].style = 'Hyperlink'  # Optional: applies the built-in hyperlink style
+        
+    if random_url is not None:
+        # Add the hyperlink to the Excel cell
+        ws['A2'] = "Click here to visit the link"
+        ws['A2'].hyperlink = random_url  # This makes the text a clickable hyperlink
+        ws['A2'].style = 'Hyperlink'  # Optional: applies the built-in hyperlink style
+
+    # Adding an image if selected
+    if image_buffer is not None:
+        img = xlsImage(image_buffer)  # openpyxl Image object
+        img.anchor = 'A10'  # Position the image in the cell (A1)
+        ws.add_image(img)
+
+    wb.save(fp)
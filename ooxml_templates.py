@@ -0,0 +1,239 @@
+# ooxml_templates.py
+
+"""
+Template-Patched OOXML Documents for CP Demo Server
+
+DOCX, PPTX and XLSX files are zip packages in which only a couple of parts change
+from one generated file to the next: the part(s) carrying the random URL and the
+embedded image. Instead of building every document through python-docx,
+python-pptx or openpyxl, each feature combination is built once through the
+object model with a placeholder URL and image. New documents are then written at
+the zip level: unchanged parts are copied through with their cached compressed
+bytes, and only the parts holding the URL and the image media are rewritten.
+
+Usage:
+    write_patched(fp, 'docx', build_docx, url, image_buffer, include_sensitive_link)
+
+Documents written inside a seeded generation (see rng) get fixed zip timestamps
+and core property dates, so they are byte-identical from one run to the next.
+
+Configuration:
+- CP_OOXML_FAST_PATH: Set to 0 to always build documents through the object models.
+"""
+
+import os
+import re
+import zlib
+import struct
+import zipfile
+import threading
+from io import BytesIO
+from xml.sax.saxutils import escape
+from PIL import Image
+from app import logging
+from app.rng import is_seeded
+
+FAST_PATH = os.environ.get('CP_OOXML_FAST_PATH', '1') != '0'
+
+# URL written into the templates, replaced by the real URL in every document
+PLACEHOLDER_URL = "https://placeholder.invalid/cp-demo-url-5cd3a7e1"
+
+# Size of the generated images (see image_writer.render_image)
+IMAGE_SIZE = 500
+
+_PLACEHOLDER_BYTES = PLACEHOLDER_URL.encode('ascii')
+
+# Date written into reproducible documents (zip entries and core properties)
+FIXED_DATE = (2000, 1, 1, 0, 0, 0)
+_FIXED_TIMESTAMP = b'%04d-%02d-%02dT%02d:%02d:%02dZ' % FIXED_DATE
+_CORE_DATES = re.compile(rb'(<dcterms:(?:created|modified)\b[^>]*>)[^<]*(</dcterms:)')
+
+# Zip record layouts (local file header, central directory header, end of central directory)
+_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+_END_RECORD = struct.Struct('<IHHHHIIH')
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+# ===========================
+# Template Building
+# ===========================
+
+def _dos_date_time(date_time):
+    """Return the zip (DOS) time and date fields of a date_time tuple."""
+    return (
+        (date_time[3] << 11) | (date_time[4] << 5) | (date_time[5] // 2),
+        ((date_time[0] - 1980) << 9) | (date_time[1] << 5) | date_time[2],
+    )
+
+
+_FIXED_DOS_TIME, _FIXED_DOS_DATE = _dos_date_time(FIXED_DATE)
+
+
+class _Entry:
+    """A part of a template package, with its cached compressed bytes if it is copied through."""
+
+    def __init__(self, info, data):
+        self.name = info.filename.encode('utf-8')
+        self.dos_time, self.dos_date = _dos_date_time(info.date_time)
+        self.data = data
+        self.has_url = _PLACEHOLDER_BYTES in data
+        self.is_media = '/media/' in info.filename
+        if not self.has_url and not self.is_media:
+            self.method, self.crc, self.payload = _deflate(data)
+            # Core properties with fixed dates, for reproducible documents
+            self.fixed_payload = _deflate(_CORE_DATES.sub(rb'\g<1>' + _FIXED_TIMESTAMP + rb'\g<2>', data)) if _CORE_DATES.search(data) else None
+
+
+def _deflate(data):
+    """
+    Compress a part as a zip entry.
+
+    Returns:
+        tuple: The compression method, the CRC-32 and the compressed bytes.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return zipfile.ZIP_DEFLATED, zlib.crc32(data), compressor.compress(data) + compressor.flush()
+
+
+def placeholder_image():
+    """
+    Return a blank JPEG with the size of the generated images, used in the templates.
+
+    Returns:
+        BytesIO: The encoded image, positioned at the start.
+    """
+    buffer = BytesIO()
+    Image.new("RGB", (IMAGE_SIZE, IMAGE_SIZE)).save(buffer, format='JPEG')
+    buffer.seek(0)
+    return buffer
+
+
+def build_template(kind, build, has_url, has_image, include_sensitive_link):
+    """
+    Build the template of a feature combination through the object model.
+
+    Args:
+        kind (str): The document type ('docx', 'pptx' or 'xlsx').
+        build (callable): The object-model writer, called as
+            build(fp, url, image_buffer, include_sensitive_link).
+        has_url (bool): Whether the documents carry a URL.
+        has_image (bool): Whether the documents embed an image.
+        include_sensitive_link (str): "on" to include the sensitive link.
+
+    Returns:
+        list: The template entries, in package order.
+
+    Raises:
+        ValueError: If the URL placeholder or the image media can't be located.
+    """
+    buffer = BytesIO()
+    build(buffer, PLACEHOLDER_URL if has_url else None, placeholder_image() if has_image else None, include_sensitive_link)
+
+    with zipfile.ZipFile(buffer) as package:
+        entries = [_Entry(info, package.read(info)) for info in package.infolist()]
+
+    if has_url and not any(entry.has_url for entry in entries):
+        raise ValueError(f"URL placeholder not found in the {kind} template.")
+    if sum(entry.is_media for entry in entries) != (1 if has_image else 0):
+        raise ValueError(f"Found {sum(entry.is_media for entry in entries)} media parts in the {kind} template.")
+    logging.info(f"Built {kind} template with {len(entries)} parts (url: {has_url}, image: {has_image}, sensitive link: {include_sensitive_link}).")
+    return entries
+
+
+def get_template(kind, build, has_url, has_image, include_sensitive_link):
+    """
+    Return the template of a feature combination, building it on first use.
+
+    A combination whose template can't be built is remembered, so it is not
+    rebuilt for every document.
+
+    Args:
+        See build_template.
+
+    Returns:
+        list or None: The template entries in package order, or None if the
+        template can't be built.
+    """
+    key = (kind, has_url, has_image, include_sensitive_link)
+    with _templates_lock:
+        if key not in _templates:
+            try:
+                _templates[key] = build_template(kind, build, has_url, has_image, include_sensitive_link)
+            except Exception as e:
+                logging.warning(f"Could not build the {kind} template, using the object model: {e}")
+                _templates[key] = None
+        return _templates[key]
+
+# ===========================
+# Document Writing
+# ===========================
+
+def write_package(fp, entries, url, image_bytes, reproducible=False):
+    """
+    Write a zip package from template entries, patching the URL and the image media.
+
+    Args:
+        fp (file): A writable binary file object.
+        entries (list): The template entries.
+        url (str or None): The URL replacing the placeholder.
+        image_bytes (bytes or None): The image replacing the template media.
+        reproducible (bool): Whether to use FIXED_DATE instead of the template's dates.
+    """
+    url_bytes = escape(url, {'"': '&quot;'}).encode('utf-8') if url is not None else None
+    offset = 0
+    central = []
+
+    for entry in entries:
+        if entry.has_url:
+            data = entry.data.replace(_PLACEHOLDER_BYTES, url_bytes)
+            method, crc, payload = _deflate(data)
+            size = len(data)
+        elif entry.is_media:
+            # Images are already compressed, store them as they are
+            method, crc, payload, size = zipfile.ZIP_STORED, zlib.crc32(image_bytes), image_bytes, len(image_bytes)
+        elif reproducible and entry.fixed_payload is not None:
+            (method, crc, payload), size = entry.fixed_payload, len(entry.data)
+        else:
+            method, crc, payload, size = entry.method, entry.crc, entry.payload, len(entry.data)
+
+        dos_time, dos_date = (_FIXED_DOS_TIME, _FIXED_DOS_DATE) if reproducible else (entry.dos_time, entry.dos_date)
+        fields = (20, 0, method, dos_time, dos_date, crc, len(payload), size, len(entry.name))
+        fp.write(_LOCAL_HEADER.pack(0x04034B50, *fields, 0))
+        fp.write(entry.name)
+        fp.write(payload)
+        central.append((fields, entry.name, offset))
+        offset += _LOCAL_HEADER.size + len(entry.name) + len(payload)
+
+    central_offset = offset
+    for fields, name, local_offset in central:
+        fp.write(_CENTRAL_HEADER.pack(0x02014B50, 20, *fields, 0, 0, 0, 0, 0, local_offset))
+        fp.write(name)
+        offset += _CENTRAL_HEADER.size + len(name)
+
+    fp.write(_END_RECORD.pack(0x06054B50, 0, 0, len(central), len(central), offset - central_offset, central_offset, 0))
+
+
+def write_patched(fp, kind, build, url, image_buffer, include_sensitive_link):
+    """
+    Write an OOXML document, through its cached template when possible.
+
+    Falls back to the object model when the fast path is disabled or the template
+    can't be built (documents written that way are not reproducible).
+
+    Args:
+        fp (file): A writable binary file object.
+        kind (str): The document type ('docx', 'pptx' or 'xlsx').
+        build (callable): The object-model writer, called as
+            build(fp, url, image_buffer, include_sensitive_link).
+        url (str or None): The URL to include, or None for no URL.
+        image_buffer (BytesIO or None): The JPEG image to embed, or None for no image.
+        include_sensitive_link (str): "on" to include the sensitive link.
+    """
+    entries = get_template(kind, build, url is not None, image_buffer is not None, include_sensitive_link) if FAST_PATH else None
+    if entries is not None:
+        write_package(fp, entries, url, image_buffer.getvalue() if image_buffer is not None else None, reproducible=is_seeded())
+        return
+
+    build(fp, url, image_buffer, include_sensitive_link)
@@ -0,0 +1,143 @@
+# pdf_writer.py
+
+"""
+PDF Writer for CP Demo Server
+
+Renders the generated PDFs with ReportLab in a single pass. Loaded lazily through
+the generator registry of file_generator, so ReportLab is only imported by the
+processes that actually generate PDFs.
+"""
+
+from reportlab.pdfgen import canvas
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfdoc import PDFDictionary, PDFArray, PDFName, PDFString
+from app import logging
+from app.file_generator import generate_random_url
+from app.image_writer import render_image_buffer
+from app.resources import asset_uri
+from app.rng import is_seeded
+
+def write_pdf(fp, url_type, include_image, include_script, include_video, include_audio, include_sensitive_link, include_3d, include_pdf, include_external_app, include_data_submission):
+    """
+    Write a PDF with the selected features to a binary file object.
+    """
+    # Render straight to the output stream; annotations are added in the same pass.
+    # Seeded PDFs are rendered invariant (fixed dates and document ID) to be reproducible
+    pdf = canvas.Canvas(fp, invariant=1 if is_seeded() else None)
+
+    # Basic PDF content
+    pdf.drawString(100, 750, "PDF with Advanced Features")
+
+    # Include URL if specified
+    if url_type != 'none':
+        random_url = generate_random_url(url_type)
+        if random_url is None:
+            random_url = "No URL provided"
+        pdf.drawString(80, 320, f"URL: {random_url}")
+        pdf.linkURL(random_url, (80, 310, 380, 330), relative=0)
+
+    # Include sensitive link if specified
+    if include_sensitive_link == "on":
+        sensitive_link = r"\\server\share"
+        if sensitive_link is None:
+            sensitive_link = "No link provided"
+        pdf.drawString(80, 580, f"Server Share: {sensitive_link}")
+        pdf.linkURL(sensitive_link, (80, 570, 380, 590), relative=0)
+
+    # Embed image if selected
+    if include_image == "on":
+        # Render the image in memory and add it to the PDF
+        image_buffer = render_image_buffer("jpg", url_type, include_sensitive_link)
+        add_image_to_pdf(pdf, image_buffer, x=380, y=500, width=180, height=180)
+        
+    # Embed JavaScript code if specified (run when the document is opened)
+    if include_script == "on":
+        script = "app.alert('This is an embedded JavaScript test!');"
+        pdf.setCatalogEntry("OpenAction", PDFDictionary({
+            "S": PDFName("JavaScript"),
+            "JS": PDFString(script)
+        }))
+        pdf.setFont("Helvetica", 10)
+        pdf.drawString(80, 450, "Embedded JavaScript:")
+        pdf.drawString(80, 430, script)
+
+    # Link to local video
+    if include_video == "on":
+        video_file_path = asset_uri("sample_mp4_file.mp4")
+        add_pdf_annotation(pdf, "Link", (80, 270, 380, 290), uri=video_file_path)
+
+    # Link to local audio
+    if include_audio == "on":
+        audio_file_path = asset_uri("sample_mp3_file.mp3")
+        add_pdf_annotation(pdf, "Link", (80, 240, 380, 260), uri=audio_file_path)
+
+    # Embed 3D Art (Dummy Data)
+    if include_3d == "on":
+        u3d_data = "dummy 3D model data for testing purposes"
+        add_pdf_annotation(pdf, "3D", (380, 250, 560, 400), **{
+            "3DName": PDFString("Dummy 3D Model"),
+            "3DData": PDFArray([PDFString(u3d_data)])
+        })
+
+    # Add external PDF if selected
+    if include_pdf == "on":
+        external_pdf_path = asset_uri("sample_pdf_file.pdf")
+        add_pdf_annotation(pdf, "Link", (80, 210, 380, 230), uri=external_pdf_path,
+                           Contents=PDFString("Click to open External PDF"))
+
+    # Add external application launch if selected
+    if include_external_app == "on":
+        app_path = "file:///path/to/external/application"
+        add_pdf_annotation(pdf, "Link", (80, 180, 380, 200), uri=app_path,
+                           Contents=PDFString("Launch External Application"))
+
+    # Add data submission if selected
+    if include_data_submission == "on":
+        submission_url = "http://example.com/submit_data"
+        add_pdf_annotation(pdf, "Widget", (80, 150, 380, 170), uri=submission_url,
+                           T=PDFString("Submit Data"))
+
+    # Write the page with its content and annotations in a single serialization
+    pdf.showPage()
+    pdf.save()
+
+def add_pdf_annotation(pdf, subtype, rect, uri=None, **entries):
+    """
+    Add an annotation to the current page of a ReportLab canvas.
+
+    Args:
+        pdf (canvas.Canvas): The ReportLab canvas instance.
+        subtype (str): The annotation subtype (e.g., 'Link', 'Widget', '3D').
+        rect (tuple): The annotation rectangle (x1, y1, x2, y2).
+        uri (str): Optional URI opened by the annotation's action.
+        **entries: Extra PDF objects to store in the annotation dictionary.
+    """
+    annotation = {
+        "Type": PDFName("Annot"),
+        "Subtype": PDFName(subtype),
+        "Rect": PDFArray(list(rect)),
+        "Border": PDFArray([0, 0, 0])
+    }
+    if uri is not None:
+        annotation["A"] = PDFDictionary({"S": PDFName("URI"), "URI": PDFString(uri)})
+    annotation.update(entries)
+    pdf._addAnnotation(PDFDictionary(annotation))
+
+def add_image_to_pdf(pdf, image_buffer, x, y, width, height):
+    """
+    Add an image to a PDF using ReportLab.
+
+    Args:
+        pdf (canvas.Canvas): The ReportLab canvas instance.
+        image_buffer (BytesIO): The encoded image (JPEG images are embedded as-is).
+        x (int): X-coordinate for the image.
+        y (int): Y-coordinate for the image.
+        width (int): Width of the image in the PDF.
+        height (int): Height of the image in the PDF.
+    """
+    try:
+        # Embed the image straight from memory, no temporary file or re-encoding needed
+        image_buffer.seek(0)
+        pdf.drawImage(ImageReader(image_buffer), x, y, width, height)
+    except Exception as e:
+        logging.info(f"Error adding image to PDF: {e}")
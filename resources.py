@@ -0,0 +1,100 @@
+# resources.py
+
+"""
+Resource Registry for CP Demo Server
+
+Fonts are loaded once per process and kept in bounded LRU caches, and the paths
+and URIs of the static assets under data/pdf_assets are computed once, so the file
+generators don't pay any setup cost for them on each file. The generated documents
+only link to the assets, their contents are never loaded.
+
+Usage:
+    font = get_font(32)
+    uri = asset_uri('sample_mp4_file.mp4')
+"""
+
+import os
+from pathlib import Path
+from functools import lru_cache
+from app import logging
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(BASE_DIR, 'data', 'pdf_assets')
+
+# TrueType font used for the image titles (falls back to PIL's default font)
+FONT_NAME = "arial.ttf"
+
+# ===========================
+# Fonts
+# ===========================
+
+@lru_cache(maxsize=1)
+def get_default_font():
+    """
+    Return PIL's built-in default font.
+
+    Returns:
+        ImageFont: The default bitmap font.
+    """
+    from PIL import ImageFont
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=64)
+def get_font(size):
+    """
+    Return FONT_NAME at the given size, or the default font if it isn't installed.
+
+    Args:
+        size (int): The font size in points.
+
+    Returns:
+        ImageFont: The loaded font.
+    """
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype(FONT_NAME, size)
+    except IOError:
+        logging.debug(f"Font '{FONT_NAME}' not available, using the default font for size {size}.")
+        return get_default_font()
+
+# ===========================
+# Static Assets
+# ===========================
+
+@lru_cache(maxsize=None)
+def asset_path(name):
+    """
+    Return the absolute path of a static asset.
+
+    Args:
+        name (str): The asset file name (e.g., 'sample_mp4_file.mp4').
+
+    Returns:
+        str: The path of the asset under data/pdf_assets.
+    """
+    return os.path.join(ASSETS_DIR, name)
+
+
+@lru_cache(maxsize=None)
+def asset_uri(name):
+    """
+    Return the file:// URI of a static asset, as linked from generated documents.
+
+    Args:
+        name (str): The asset file name.
+
+    Returns:
+        str: The file URI of the asset.
+    """
+    return Path(asset_path(name)).as_uri()
+
+
+def warm_resources():
+    """
+    Load the default font and the title font sizes used by image_writer ahead of
+    the first request.
+    """
+    get_default_font()
+    for size in range(20, 51):
+        get_font(size)
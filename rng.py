@@ -0,0 +1,70 @@
+# rng.py
+
+"""
+Per-Thread Random Number Generators for CP Demo Server
+
+The generators draw every random choice (file names, URLs, shapes, colors, binary
+unique values) from get_rng() instead of the global random module. Every thread
+gets its own random.Random, so concurrent generations don't share any state.
+Inside a seeded(seed) block the thread's generator is replaced by one derived
+from the seed, which makes the generated output reproducible.
+
+Usage:
+    with seeded("42:pdf:..."):
+        number = get_rng().randint(1000, 9999)
+"""
+
+import os
+import random
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+def get_rng():
+    """
+    Return the random generator of the calling thread.
+
+    Returns:
+        random.Random: The seeded generator inside a seeded() block, else a
+        generator private to the thread.
+    """
+    rng = getattr(_local, 'rng', None)
+    if rng is None:
+        rng = _local.rng = random.Random()
+    return rng
+
+
+def is_seeded():
+    """Return whether the calling thread is inside a seeded() block."""
+    return getattr(_local, 'seeded', False)
+
+
+@contextmanager
+def seeded(seed):
+    """
+    Draw the random choices of the calling thread from a generator seeded with seed.
+
+    Args:
+        seed (str or int): The seed.
+
+    Yields:
+        random.Random: The seeded generator.
+    """
+    previous = getattr(_local, 'rng', None), is_seeded()
+    _local.rng, _local.seeded = random.Random(seed), True
+    try:
+        yield _local.rng
+    finally:
+        _local.rng, _local.seeded = previous
+
+
+def _reset_after_fork():
+    """Give forked processes fresh generators, so workers don't replay the parent's sequence."""
+    global _local
+    _local = threading.local()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -9,16 +9,38 @@ the CP Demo Server.
 
 Usage:
     python run.py
+    python run.py --profile-startup   # profile the startup, write the reports and exit
 
 Ensure that the required environment variables and configurations are set
 before running the application.
+
+Configuration:
+- CP_STARTUP_PROFILE: Set to 1 to profile the startup (see startup_profiler).
+- CP_PRELOAD_GENERATORS: Set to 1 to load every file generator backend (and the
+  fonts) at startup, before the generation workers are forked, so the
+  workers share them. By default each process loads a backend on first use.
+
+In debug mode the reloader runs this script twice: in a watcher process that only
+restarts the server on code changes, and in the server process it starts (with
+WERKZEUG_RUN_MAIN set). The generation workers, the warm-ups and the inventory
+producer only run in the server process.
 """
 
 # Import necessary modules and functions
 
-from app.db import init_db, load_csv_to_db, init_db_for_generated_files
+from app.db import init_db, load_csv_to_db, init_db_for_generated_files, reconcile_generated_files
+from app.binary_templates import warm_binary_templates
+from app.resources import warm_resources
+from app.file_generator import warm_generators
+from app.inventory import start_inventory
+from app.batch_generator import start_executor
+from app.startup_profiler import phase, finish_profiler, BUDGET_MS, CLI_FLAG
 import os
 import sys
+import threading
+
+# Run the Flask development server in debug mode (with the reloader)
+DEBUG = True
 
 
 # Modify the system path to include the parent directory
@@ -36,23 +58,62 @@ logging.info("Starting CP Demo Server...")
 try:
     # Initialize the main database
     logging.info("Initializing the main database...")
-    init_db()
+    with phase('init_db'):
+        init_db()
 
     # Initialize the database for generated files
     logging.info("Initializing the database for generated files...")
-    init_db_for_generated_files()
+    with phase('init_db_for_generated_files'):
+        init_db_for_generated_files()
+
+    # Match the generated files catalog kept from the last run with the files on disk
+    logging.info("Reconciling the generated files catalog with the disk...")
+    with phase('reconcile_generated_files'):
+        reconcile_generated_files()
 
     # Load data from CSV files into the databases
     logging.info("Loading CSV data into the databases...")
-    load_csv_to_db()
+    with phase('load_csv_to_db'):
+        load_csv_to_db()
 
     logging.info("Database initialization and data loading completed successfully.")
 
+    # The reloader's watcher process never serves a request, it needs no workers or warm-up
+    reloader_watcher = (
+        __name__ == '__main__' and DEBUG and CLI_FLAG not in sys.argv and os.environ.get('WERKZEUG_RUN_MAIN') is None
+    )
+
+    if not reloader_watcher:
+        # Load the generator backends before forking so the workers share them (copy-on-write)
+        if os.environ.get('CP_PRELOAD_GENERATORS', '0') == '1':
+            logging.info("Preloading the file generator backends...")
+            with phase('preload generators'):
+                warm_generators()
+                warm_resources()
+
+        # Fork the generation workers while this is still the only thread
+        with phase('start_executor'):
+            start_executor()
+
+        # Compile the EXE/ELF/dylib templates in the background so requests never wait on the compiler
+        threading.Thread(target=warm_binary_templates, daemon=True).start()
+
+        # Keep a stock of ready files so /generate and /stream can hand them out instantly
+        with phase('start_inventory'):
+            start_inventory()
+
+    # Write the startup profile (if enabled)
+    startup_ms = finish_profiler()
+
 except Exception as e:
     # Log any exceptions that occur during initialization
     logging.error(f"An error occurred during initialization: {e}", exc_info=True)
     sys.exit(1)  # Exit the script with a non-zero status to indicate failure
 
+if __name__ == '__main__' and CLI_FLAG in sys.argv:
+    # Profiling run only (e.g. to catch cold-start regressions in CI)
+    sys.exit(1 if BUDGET_MS is not None and startup_ms > BUDGET_MS else 0)
+
 if __name__ == '__main__':
     """
     Entry point for running the Flask application.
@@ -69,7 +130,7 @@ if __name__ == '__main__':
         app.run(
             host='0.0.0.0',      # Listen on all available network interfaces
             port=8080,           # Port number to listen on
-            debug=True,          # Enable debug mode (disable in production)
+            debug=DEBUG,         # Enable debug mode (disable in production)
             # ssl_context=('certificate/cert.pem', 'certificate/key.pem')  # Uncomment for HTTPS
         )
     except Exception as e:
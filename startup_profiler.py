@@ -0,0 +1,275 @@
+# startup_profiler.py
+
+"""
+Startup Profiler for CP Demo Server
+
+Records a timeline of the server startup: every module import made while the
+server starts (nested under the import that triggered it) and the named startup
+phases (database initialization, CSV loading, view registration, ...). When the
+startup is over, two reports are written:
+
+- a text report with the timeline as a tree (start offset, total and self time),
+- a folded-stacks file ("startup;phase;import x <microseconds>") that can be fed
+  to flamegraph.pl, speedscope or inferno to draw a flame graph.
+
+The profiler only uses the standard library, so it can be started from the top of
+app/__init__.py before Flask and the rest of the server are imported.
+
+Usage:
+    CP_STARTUP_PROFILE=1 python run.py       # profile, then serve as usual
+    python run.py --profile-startup          # profile, write the reports and exit
+
+Configuration:
+- CP_STARTUP_PROFILE: Set to 1 to profile the startup.
+- CP_STARTUP_PROFILE_DIR: Directory the reports are written to (default data/startup_profiles).
+- CP_STARTUP_BUDGET_MS: Startup time budget. A slower startup is logged as a warning,
+  and makes `run.py --profile-startup` exit with status 1.
+"""
+
+import os
+import sys
+import time
+import builtins
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CLI_FLAG = '--profile-startup'
+
+ENABLED = os.environ.get('CP_STARTUP_PROFILE', '0') == '1' or CLI_FLAG in sys.argv
+
+REPORT_DIR = os.environ.get('CP_STARTUP_PROFILE_DIR', os.path.join(BASE_DIR, 'data', 'startup_profiles'))
+
+BUDGET_MS = float(os.environ['CP_STARTUP_BUDGET_MS']) if os.environ.get('CP_STARTUP_BUDGET_MS') else None
+
+# Spans shorter than this are left out of the text report (they stay in the folded stacks)
+TEXT_MIN_MS = 1.0
+
+_root = None
+_stack = []
+_main_thread = None
+_original_import = None
+
+# ===========================
+# Recording
+# ===========================
+
+class _Span:
+    """A timed section of the startup, with the sections it contains."""
+
+    __slots__ = ('name', 'start', 'end', 'children')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    @property
+    def total(self):
+        return self.end - self.start
+
+    @property
+    def self_time(self):
+        return self.total - sum(child.total for child in self.children)
+
+
+def _open(name):
+    span = _Span(name)
+    _stack[-1].children.append(span)
+    _stack.append(span)
+    return span
+
+
+def _close(span):
+    span.end = time.perf_counter()
+    while _stack and _stack.pop() is not span:
+        pass
+
+
+def _import_name(name, globals, fromlist, level):
+    """Return a readable name for an import statement."""
+    if level and globals:
+        package = globals.get('__package__') or ''
+        for _ in range(level - 1):
+            package = package.rpartition('.')[0]
+        name = f"{package}.{name}" if name else package
+    if fromlist and not name.endswith(tuple(f".{item}" for item in fromlist)):
+        return f"from {name} import {', '.join(fromlist)}"
+    return f"import {name}"
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """builtins.__import__ replacement recording the imports of the main thread that load modules."""
+    if _root is None or _root.end is not None or threading.get_ident() != _main_thread:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    loaded = len(sys.modules)
+    span = _open(_import_name(name, globals, fromlist, level))
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _close(span)
+        # Imports of modules that were already loaded aren't worth a span
+        if len(sys.modules) == loaded and not span.children:
+            _stack[-1].children.remove(span)
+
+
+def start_profiler():
+    """
+    Start recording the startup (once per process).
+
+    Does nothing unless CP_STARTUP_PROFILE=1 or --profile-startup is given.
+    """
+    global _root, _main_thread, _original_import
+    if not ENABLED or _root is not None:
+        return
+
+    _root = _Span('startup')
+    _stack.append(_root)
+    _main_thread = threading.get_ident()
+    _original_import = builtins.__import__
+    builtins.__import__ = _timed_import
+    # Processes forked during the startup (the generation workers) don't profile
+    os.register_at_fork(after_in_child=_stop_in_child)
+
+
+def _stop_in_child():
+    global _root
+    if _root is not None and _root.end is None:
+        builtins.__import__ = _original_import
+        _root = None
+        _stack.clear()
+
+
+@contextmanager
+def phase(name):
+    """
+    Record a named startup phase (a no-op when the profiler isn't running).
+
+    Args:
+        name (str): The phase name shown in the reports.
+    """
+    if _root is None or _root.end is not None or threading.get_ident() != _main_thread:
+        yield
+        return
+
+    span = _open(name)
+    try:
+        yield
+    finally:
+        _close(span)
+
+# ===========================
+# Reports
+# ===========================
+
+def _process_age():
+    """Return the seconds between the process start and now, or None if unknown (non-Linux)."""
+    try:
+        with open('/proc/self/stat') as stat:
+            started = int(stat.read().rpartition(')')[2].split()[19]) / os.sysconf('SC_CLK_TCK')
+        with open('/proc/uptime') as uptime:
+            return float(uptime.read().split()[0]) - started
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def format_text_report(root, before_profiling=None):
+    """
+    Render the startup timeline as text.
+
+    Args:
+        root (_Span): The finished startup span.
+        before_profiling (float or None): Seconds spent in the process before the profiler started.
+
+    Returns:
+        str: The report.
+    """
+    lines = [
+        f"CP Demo Server startup profile ({datetime.now().isoformat(timespec='seconds')})",
+        f"Total: {root.total * 1000:.1f} ms",
+    ]
+    if before_profiling is not None:
+        lines.append(f"Before profiling (interpreter start): {before_profiling * 1000:.1f} ms")
+    if BUDGET_MS is not None:
+        lines.append(f"Budget: {BUDGET_MS:.1f} ms")
+
+    lines += ["", "Phases:"]
+    for span in root.children:
+        if not span.name.startswith(('import ', 'from ')):
+            lines.append(f"  {span.name:<40} {span.total * 1000:>9.1f} ms")
+
+    lines += ["", f"Timeline (spans of {TEXT_MIN_MS:g} ms or more):", f"{'start':>10} {'total':>10} {'self':>10}  name"]
+
+    def walk(span, depth):
+        if span.total * 1000 < TEXT_MIN_MS:
+            return
+        lines.append(
+            f"{(span.start - root.start) * 1000:>7.1f} ms {span.total * 1000:>7.1f} ms {span.self_time * 1000:>7.1f} ms  {'  ' * depth}{span.name}"
+        )
+        for child in span.children:
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines) + "\n"
+
+
+def format_folded_stacks(root):
+    """
+    Render the startup timeline as folded stacks, weighted by self time in microseconds.
+
+    Args:
+        root (_Span): The finished startup span.
+
+    Returns:
+        str: One "frame;frame;frame weight" line per span.
+    """
+    lines = []
+
+    def walk(span, path):
+        path = f"{path};{span.name}" if path else span.name
+        weight = round(span.self_time * 1_000_000)
+        if weight > 0:
+            lines.append(f"{path} {weight}")
+        for child in span.children:
+            walk(child, path)
+
+    walk(root, '')
+    return "\n".join(lines) + "\n"
+
+
+def finish_profiler():
+    """
+    Stop recording and write the text and folded-stacks reports to REPORT_DIR.
+
+    Returns:
+        float or None: The startup time in milliseconds, or None if the profiler wasn't running.
+    """
+    if _root is None or _root.end is not None:
+        return None
+
+    builtins.__import__ = _original_import
+    for span in reversed(_stack):
+        span.end = time.perf_counter()
+    _stack.clear()
+
+    total_ms = _root.total * 1000
+    before_profiling = _process_age()
+    if before_profiling is not None:
+        before_profiling -= _root.total
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    prefix = os.path.join(REPORT_DIR, f"startup-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    with open(f"{prefix}.txt", 'w') as report:
+        report.write(format_text_report(_root, before_profiling))
+    with open(f"{prefix}.folded", 'w') as report:
+        report.write(format_folded_stacks(_root))
+
+    logging.info(f"Startup took {total_ms:.1f} ms, profile written to {prefix}.txt and {prefix}.folded.")
+    if BUDGET_MS is not None and total_ms > BUDGET_MS:
+        logging.warning(f"Startup took {total_ms:.1f} ms, over the {BUDGET_MS:.1f} ms budget.")
+    return total_ms
@@ -0,0 +1,133 @@
+# url_pool.py
+
+"""
+Malicious URL Pool for CP Demo Server
+
+Keeps the deduplicated contents of data/malicious_urls.txt in memory. The file is
+only re-read when its modification time changes, and URLs are drawn from a
+shuffled deck so consecutive draws don't repeat a URL until every URL has been
+used once.
+
+Usage:
+    url = MALICIOUS_URLS.draw()
+"""
+
+import os
+import time
+import hashlib
+import threading
+from app import logging
+from app.rng import get_rng
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MALICIOUS_URLS_FILE = os.path.join(BASE_DIR, 'data', 'malicious_urls.txt')
+
+
+class UrlPool:
+    """
+    An in-memory, hot-reloaded pool of URLs loaded from a text file (one URL per line).
+
+    The deck is private to the process. Every forked generation worker shuffles its
+    own deck with its own generator, so a URL doesn't repeat within a worker until
+    the worker has used them all, but two workers can draw the same URL.
+    """
+
+    # Seconds between two checks of the file's modification time
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self, path):
+        self.path = path
+        self._urls = []
+        self._deck = []
+        self._mtime = None
+        self._fingerprint = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """Reload the file if its modification time changed. Caller holds the lock."""
+        now = time.monotonic()
+        if self._checked and now - self._checked < self.CHECK_INTERVAL:
+            return
+        self._checked = now
+
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+
+        urls = []
+        if mtime is not None:
+            with open(self.path, "r") as file:
+                urls = list(dict.fromkeys(line.strip() for line in file if line.strip()))
+        logging.info(f"Loaded {len(urls)} unique URLs from {self.path}.")
+        self._urls = urls
+        self._deck = []
+        self._mtime = mtime
+        self._fingerprint = hashlib.sha256("\n".join(urls).encode("utf-8")).hexdigest()
+
+    def reset_deck(self):
+        """Discard the current deck so the next draw reshuffles."""
+        self._deck = []
+
+    def urls(self):
+        """
+        Return the current list of unique URLs.
+
+        Returns:
+            list: The URLs in file order.
+        """
+        with self._lock:
+            self._refresh()
+            return list(self._urls)
+
+    def draw(self):
+        """
+        Draw the next URL from the shuffled deck, reshuffling once it runs out.
+
+        Returns:
+            str or None: A URL, or None if the pool is empty.
+        """
+        with self._lock:
+            self._refresh()
+            if not self._urls:
+                return None
+            if not self._deck:
+                self._deck = get_rng().sample(self._urls, len(self._urls))
+            return self._deck.pop()
+
+    def choose(self, rng):
+        """
+        Pick a URL with the given random generator, independently of the deck.
+
+        Used by seeded generations, whose picks must not depend on earlier draws.
+
+        Args:
+            rng (random.Random): The generator to pick with.
+
+        Returns:
+            str or None: A URL, or None if the pool is empty.
+        """
+        with self._lock:
+            self._refresh()
+            return rng.choice(self._urls) if self._urls else None
+
+    def fingerprint(self):
+        """
+        Return a digest of the current URLs, which changes whenever the pool contents do.
+
+        Returns:
+            str: The hex SHA-256 of the URLs.
+        """
+        with self._lock:
+            self._refresh()
+            return self._fingerprint
+
+
+MALICIOUS_URLS = UrlPool(MALICIOUS_URLS_FILE)
+
+# Forked generation workers must not replay the parent's deck in the same order
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=MALICIOUS_URLS.reset_deck)
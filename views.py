@@ -12,6 +12,7 @@ Modules:
 - db: Database module for loading and retrieving protection data.
 - attack_generator: Module for executing attacks.
 - file_generator: Module for generating various file types.
+- generation_jobs: Background generation jobs with per-file progress tracking.
 - requests: Library for sending HTTP requests.
 - threading: Enables running attacks in separate threads for concurrency.
 - mimetypes: Determines the MIME type of files for proper handling.
@@ -21,13 +22,21 @@ from . import app
 from app import logging
 from flask_mail import Mail, Message
 from app.attack_generator import execute_attack
-from app.db import load_protections, get_protection_by_name
+from app.db import PROTECTIONS_CATALOG, resolve_generated_file_path, find_generated_files
 from app.file_generator import (
-    generate_file,
+    write_file,
     delete_generated_file,
     delete_all_generated_files,
-    load_generated_files
+    load_generated_files,
+    output_key,
+    find_cached_output,
+    stream_output
 )
+from app.file_store import object_path
+from app.generation_jobs import submit_job, get_job, job_events
+from app.inventory import claim_file
+from app.bundle import stream_bundle, COMPRESSION_MODES
+from app.large_files import write_large_file, check_large_file, parse_size, LARGE_FILE_WRITERS
 from flask import (
     render_template,
     jsonify,
@@ -37,12 +46,29 @@ from flask import (
     redirect,
     url_for,
     abort,
-    session
+    session,
+    Response,
+    make_response,
+    stream_with_context
 )
 import requests
 import os, json
+import time
+import random
+import hashlib
 import threading
 import mimetypes
+from datetime import datetime, timezone
+from io import BytesIO
+
+# File types that can be generated on the fly by /stream/<file_type>
+STREAM_FILE_TYPES = ['pdf', 'docx', 'pptx', 'xlsx', 'exe', 'dylib', 'elf', 'rtf', 'jpg', 'png', 'bmp', 'gif', 'tiff']
+
+# Size of the chunks sent by /stream/<file_type>
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# File types /stream/<file_type> generates in memory first, their writers seek back into the output
+BUFFERED_STREAM_TYPES = ['tiff']
 
 # Global lock for thread-safe access to shared resources
 flags_lock = threading.Lock()
@@ -115,7 +141,7 @@ def handle_post_request(protection_name, target_ip):
     Returns:
         None
     """
-    protection = get_protection_by_name(protection_name)
+    protection = PROTECTIONS_CATALOG.get(protection_name)
     
     if protection:
         # Replace the placeholder in the Resource field with the target IP
@@ -152,6 +178,9 @@ def ips():
 
     GET:
         - Renders the IPS protections page with available protections and the saved target IP.
+        - ?severity=...&confidence=... only list the protections with that Severity / ConfidenceLevel.
+        - Sends an ETag and Last-Modified (the protections import and the saved target IP),
+          and answers 304 Not Modified to a revalidation of an unchanged page.
 
     POST:
         - Processes form submissions to trigger a specific protection against a target IP.
@@ -166,6 +195,8 @@ def ips():
             flash("Target IP address is required.", 'warning')
             return redirect(url_for('ips'))
         else:
+            if session.get('target_ip') != target_ip:
+                _target_ip_changed()
             session['target_ip'] = target_ip
 
         protection_name = request.form.get('protection_name')
@@ -179,9 +210,67 @@ def ips():
 
     # Retrieve the saved IP from the session, defaulting to an empty string
     saved_ip = session.get('target_ip', '')
-    # Load IPS protections data from the database
-    data = load_protections()
-    return render_template('ips.html', data=data, saved_ip=saved_ip)
+    severity, confidence = request.args.get('severity'), request.args.get('confidence')
+
+    # Pages showing flashed messages are never revalidated, they must be rendered
+    validators = None
+    if request.method == 'GET' and not session.get('_flashes'):
+        validators = _ips_validators(saved_ip, severity, confidence)
+        if _not_modified(*validators):
+            response = Response(status=304)
+            _set_validators(response, *validators)
+            return response
+
+    # Load IPS protections data from the catalog cache
+    data = PROTECTIONS_CATALOG.protections(severity, confidence)
+    response = make_response(render_template('ips.html', data=data, saved_ip=saved_ip))
+    if validators:
+        _set_validators(response, *validators)
+    return response
+
+
+def _ips_validators(saved_ip, severity, confidence):
+    """
+    Return the ETag and Last-Modified time of the IPS page.
+
+    Args:
+        saved_ip (str): The target IP shown on the page.
+        severity (str): The Severity filter.
+        confidence (str): The ConfidenceLevel filter.
+
+    Returns:
+        tuple: The ETag and the Last-Modified datetime (None if unknown).
+    """
+    version, imported = PROTECTIONS_CATALOG.version()
+    etag = hashlib.sha256(json.dumps([version, imported, saved_ip, severity, confidence]).encode('utf-8')).hexdigest()
+    modified = max(int(imported or 0), session.get('target_ip_saved', 0))
+    return etag, datetime.fromtimestamp(modified, timezone.utc) if modified else None
+
+
+def _target_ip_changed():
+    """
+    Move the IPS page's Last-Modified time forward after the saved target IP changed.
+
+    The time has a one second resolution, so it is bumped past the previous change
+    to keep a copy cached earlier in the same second from being revalidated.
+    """
+    session['target_ip_saved'] = max(int(time.time()), session.get('target_ip_saved', 0) + 1)
+
+
+def _not_modified(etag, last_modified):
+    """Return whether the client's cached copy of a page with these validators is current."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    return bool(last_modified and request.if_modified_since and last_modified <= request.if_modified_since)
+
+
+def _set_validators(response, etag, last_modified):
+    """Send the validators of a page that depends on the session and must always be revalidated."""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+
 
 
 @app.route('/clear_target_ip', methods=['POST'])
@@ -192,7 +281,8 @@ def clear_target_ip():
     Returns:
         Redirect to the IPS page with the target IP cleared.
     """
-    session.pop('target_ip', None)  # Remove the target IP from the session
+    if session.pop('target_ip', None) is not None:  # Remove the target IP from the session
+        _target_ip_changed()
     flash("Target IP cleared successfully.", "danger")
     return redirect(url_for('ips'))
 
@@ -530,6 +620,7 @@ def te():
 
     Functionality:
         - Loads all generated files and the supported file types.
+        - Passes the id of a running generation job (?job=<id>) so the page can follow its progress.
         - Renders the te.html template with the loaded files and file types.
 
     Returns:
@@ -545,7 +636,8 @@ def te():
         'te.html',
         files=generated_files,
         file_types=file_types,
-        email_config=email_config
+        email_config=email_config,
+        job_id=request.args.get('job')
     )
 
 
@@ -564,13 +656,14 @@ def generate():
     Functionality:
         - Retrieves selected file types and other generation parameters from the form.
         - Validates that at least one file type is selected.
-        - Iterates over each selected file type and generates the corresponding file using the file_generator module.
-        - Logs any errors encountered during file generation.
-        - Flashes a success message upon successful generation.
-        - Redirects to the 'te' (Threat Emulation) page.
+        - An optional 'seed' makes the files reproducible: identical (seed, type, options)
+          requests get byte-identical files, reused from the output cache.
+        - Submits a background generation job and returns immediately.
+        - JSON/XHR clients receive the job id with HTTP status 202.
+        - Browser form posts are redirected to the 'te' page, which follows the job's progress.
 
     Returns:
-        Redirect to the 'te' route after file generation.
+        JSON response with the job id, or a redirect to the 'te' route.
     """
     # Retrieve selected file types from the form
     file_types = request.form.getlist('file_types')
@@ -590,66 +683,310 @@ def generate():
     include_external_app = 'on' if request.form.get('include_external_app') else 'off'
     include_data_submission = 'on' if request.form.get('include_data_submission') else 'off'
 
-    # Iterate over each selected file type and generate the file
-    for file_type in file_types:
-        try:
-            success = generate_file(
-                file_type, 
-                url_type, 
-                include_image, 
-                include_script, 
-                include_video, 
-                include_audio,  
-                include_sensitive_link, 
-                include_3d, 
-                include_pdf, 
-                include_external_app, 
-                include_data_submission
-            )
-
-            if success:
-                logging.info(f"File of type '{file_type}' generated successfully.")
-            else:
-                logging.warning(f"File of type '{file_type}' failed to generate.")
-                flash(f"Error generating file of type '{file_type}'.", 'warning')
-        except Exception as e:
-            logging.error(f"Error generating file of type '{file_type}': {e}", exc_info=True)
-            flash(f"Error generating file of type '{file_type}'.", 'warning')
+    options = {
+        'url_type': url_type,
+        'include_image': include_image,
+        'include_script': include_script,
+        'include_video': include_video,
+        'include_audio': include_audio,
+        'include_sensitive_link': include_sensitive_link,
+        'include_3d': include_3d,
+        'include_pdf': include_pdf,
+        'include_external_app': include_external_app,
+        'include_data_submission': include_data_submission,
+    }
+    seed = request.form.get('seed', '').strip()
+    if seed:
+        options['seed'] = seed
+
+    # Generate the selected file types in the background
+    job = submit_job(file_types, options)
+
+    if request.accept_mimetypes.best == 'application/json' or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({
+            "job_id": job.id,
+            "status_url": url_for('job_status', job_id=job.id),
+            "events_url": url_for('job_status_events', job_id=job.id)
+        }), 202
+
+    flash("File generation started.", 'info')
+    return redirect(url_for('te', job=job.id))
+
+
+@app.route('/generate_large', methods=['POST'])
+def generate_large():
+    """
+    Generate a size-targeted file for file-size limit tests.
 
-    flash("File(s) generated successfully!", 'success')
-    return redirect(url_for('te'))
+    Route:
+        /generate_large
 
+    Methods:
+        POST
 
-@app.route('/download/<filename>')
-def download_file(filename):
+    Parameters (form or query string):
+        file_type (str): 'pdf', 'xlsx', 'rtf', 'bmp' or 'png'.
+        size (str): The target size, e.g. '50MB' or '2GB'.
+        url_type (str): 'malicious' (default), 'clean' or 'none'.
+
+    Functionality:
+        - Validates the type and size, then submits a background generation job and returns immediately.
+        - The job streams the file to the store in bounded memory (see large_files) and records
+          it in generated_files.db, so it can be downloaded like any generated file.
+        - The job status reports the file name, its size and the bytes per second achieved once it is done.
+
+    Returns:
+        JSON response with the job id, HTTP status 202.
+        JSON response with an error message and HTTP status 400 for an unsupported type or size.
     """
-    Serve a file for download from the generated files directory.
+    file_type = request.values.get('file_type')
+    if file_type not in LARGE_FILE_WRITERS:
+        return jsonify({"message": f"Unsupported file type '{file_type}'."}), 400
+
+    try:
+        target_size = parse_size(request.values.get('size', ''))
+        check_large_file(file_type, target_size)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    job = submit_job([file_type], {'url_type': request.values.get('url_type', 'malicious'), 'size': target_size})
+    return jsonify({
+        "job_id": job.id,
+        "status_url": url_for('job_status', job_id=job.id),
+        "events_url": url_for('job_status_events', job_id=job.id)
+    }), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
     """
-    # Define the directory for file storage
-    FILE_STORAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'generated_files')
+    Retrieve the state of a generation job.
 
-    # Resolve the absolute path for the requested file
-    file_path = os.path.abspath(os.path.join(FILE_STORAGE, filename))
+    Route:
+        /jobs/<job_id>
+
+    Methods:
+        GET
+
+    Args:
+        job_id (str): The id returned by /generate.
+
+    Returns:
+        JSON response with the overall job state and the state of each file, HTTP status 200.
+        JSON response with an error message and HTTP status 404 if the job is unknown.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"message": f"Job {job_id} not found."}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_status_events(job_id):
+    """
+    Stream the progress of a generation job as server-sent events.
+
+    Route:
+        /jobs/<job_id>/events
+
+    Methods:
+        GET
+
+    Args:
+        job_id (str): The id returned by /generate.
+
+    Functionality:
+        - Sends a 'progress' event with the job snapshot whenever a file finishes.
+        - Sends a final 'complete' event and closes the stream when the job is done.
+
+    Returns:
+        A text/event-stream response, or HTTP status 404 if the job is unknown.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return abort(404)
+    response = Response(stream_with_context(job_events(job)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
-    # Prevent directory traversal by ensuring the file is within the FILE_STORAGE directory
-    if not file_path.startswith(FILE_STORAGE):
-        logging.warning(f"Directory traversal attempt blocked: {file_path}")
-        return abort(403)
+
+@app.route('/download/<filename>')
+def download_file(filename):
+    """
+    Serve a generated file for download.
+
+    The file name is resolved through the alias index of the content-addressed
+    store (legacy flat files are still served from the generated files directory).
+    """
+    # Resolve the stored content of the requested file
+    file_path = resolve_generated_file_path(filename)
 
     # Check if the file exists
-    if not os.path.exists(file_path):
-        logging.warning(f"Requested file does not exist: {file_path}")
+    if not file_path:
+        logging.warning(f"Requested file does not exist: {filename}")
         return abort(404)
 
     # Determine the MIME type of the file
-    mime_type, _ = mimetypes.guess_type(file_path)
+    mime_type, _ = mimetypes.guess_type(filename)
 
     # Override MIME type for specific file extensions
     if filename.lower().endswith('.exe'):
         mime_type = 'application/x-msdownload'
 
     logging.info(f"Serving file for download: {file_path} with MIME type: {mime_type}")
-    return send_file(file_path, as_attachment=True, mimetype=mime_type)
+    return send_file(file_path, as_attachment=True, mimetype=mime_type, download_name=filename)
+
+@app.route('/download_bundle', methods=['GET', 'POST'])
+def download_bundle():
+    """
+    Download many generated files as a single ZIP archive streamed on the fly.
+
+    Route:
+        /download_bundle?names=...&type=pdf&url_type=malicious&compression=deflate
+
+    Methods:
+        GET, POST
+
+    Parameters (query string or form):
+        names (str, repeatable): Only include these files.
+        type (str, repeatable): Only include files of these types.
+        url_type (str): Only include files with this URL type.
+        compression (str): 'stored' (default) or 'deflate'.
+        manifest (str): 'off' to leave out the manifest.json entry.
+
+    Functionality:
+        - Selects the matching records from generated_files.db (all files if no parameter is given).
+        - Streams the archive as it is built; nothing is written to disk.
+
+    Returns:
+        The ZIP archive, HTTP status 400 for an unknown compression mode, or 404 if no file matches.
+    """
+    compression = request.values.get('compression', 'stored')
+    if compression not in COMPRESSION_MODES:
+        return jsonify({"message": f"Unknown compression mode '{compression}'."}), 400
+
+    files = find_generated_files(
+        names=request.values.getlist('names'),
+        file_types=request.values.getlist('type'),
+        url_type=request.values.get('url_type')
+    )
+    if not files:
+        return jsonify({"message": "No generated files match the selection."}), 404
+
+    manifest = request.values.get('manifest', 'on') != 'off'
+    filename = f"generated_files_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    logging.info(f"Streaming bundle {filename} with {len(files)} file(s), compression: {compression}.")
+
+    response = Response(stream_with_context(stream_bundle(files, compression, manifest)), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@app.route('/stream/<file_type>')
+def stream_file(file_type):
+    """
+    Generate a fresh file and stream it straight into the response.
+
+    Route:
+        /stream/<file_type>?url_type=...&include_image=on&...
+
+    Methods:
+        GET
+
+    Args:
+        file_type (str): One of STREAM_FILE_TYPES.
+
+    Query Parameters:
+        url_type (str): 'malicious' (default), 'clean' or 'none'.
+        include_* (str): 'on' to enable a feature, same names as the /generate form.
+        seed (str): Optional seed making the file reproducible.
+        size (str): Optional size (e.g. 500MB) for the types of LARGE_FILE_WRITERS, streams
+            a size-targeted file instead (include_* and seed are ignored).
+
+    Functionality:
+        - Seeded requests are served from the output cache when the same file was generated before.
+        - Otherwise takes a ready file out of the inventory if one is in stock (unseeded requests only).
+        - Otherwise runs the generator in a background thread and sends its output as it is
+          written; nothing is written to FILE_STORAGE or generated_files.db. The first byte
+          goes out as soon as the generator writes it: immediately for large files and
+          progressively encoded images, but only once the document is complete for the
+          PDF, Office and binary writers, which write their whole output at the end.
+        - TIFF files are generated in memory first, their encoder seeks back into its output.
+        - Sends the file as a chunked attachment.
+
+    Returns:
+        The generated file, HTTP status 400 for an invalid size, 404 for an unknown type,
+        or 503 if the generator failed.
+    """
+    if file_type not in STREAM_FILE_TYPES:
+        return abort(404)
+
+    url_type = request.args.get('url_type', 'malicious')
+    flags = {
+        name: 'on' if request.args.get(name) == 'on' else 'off'
+        for name in (
+            'include_image', 'include_script', 'include_video', 'include_audio', 'include_sensitive_link',
+            'include_3d', 'include_pdf', 'include_external_app', 'include_data_submission'
+        )
+    }
+
+    seed = request.args.get('seed', '').strip() or None
+    size = request.args.get('size', '').strip()
+
+    if size:
+        if file_type not in LARGE_FILE_WRITERS:
+            return jsonify({"message": f"Sized files can only be streamed for: {', '.join(LARGE_FILE_WRITERS)}."}), 400
+        try:
+            target_size = parse_size(size)
+            check_large_file(file_type, target_size)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+        write = lambda fp: write_large_file(fp, file_type, target_size, url_type)
+        cached = stocked_path = None
+    else:
+        write = lambda fp: write_file(fp, file_type, url_type, **flags, seed=seed)
+        cached = find_cached_output(output_key(file_type, seed, dict(flags, url_type=url_type))) if seed else None
+        stocked = claim_file(file_type, dict(flags, url_type=url_type), record=False) if not seed else None
+        stocked_path = resolve_generated_file_path(stocked) if stocked else None
+
+    if cached:
+        chunks = _read_chunks(object_path(cached[0]))
+    elif stocked_path:
+        # Streamed files are not kept, release the stocked copy once it is loaded
+        with open(stocked_path, 'rb') as stored:
+            buffer = stored.read()
+        delete_generated_file(stocked)
+        chunks = (buffer[offset:offset + STREAM_CHUNK_SIZE] for offset in range(0, len(buffer), STREAM_CHUNK_SIZE))
+    else:
+        try:
+            if file_type in BUFFERED_STREAM_TYPES and not size:
+                output = BytesIO()
+                write(output)
+                view = output.getbuffer()
+                chunks = (bytes(view[offset:offset + STREAM_CHUNK_SIZE]) for offset in range(0, len(view), STREAM_CHUNK_SIZE))
+            else:
+                chunks = stream_output(write, STREAM_CHUNK_SIZE)
+        except Exception as e:
+            logging.error(f"Error streaming file of type '{file_type}': {e}", exc_info=True)
+            return jsonify({"message": f"Error generating file of type '{file_type}'."}), 503
+
+    filename = f"generated_{file_type}_file_{random.randint(1000, 9999)}.{file_type}"
+    mime_type = 'application/x-msdownload' if file_type == 'exe' else mimetypes.guess_type(filename)[0]
+    logging.info(f"Streaming generated file: {filename} with MIME type: {mime_type}")
+
+    response = Response(chunks, mimetype=mime_type or 'application/octet-stream')
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def _read_chunks(path):
+    """Yield the contents of a file in STREAM_CHUNK_SIZE chunks."""
+    with open(path, 'rb') as stored:
+        for chunk in iter(lambda: stored.read(STREAM_CHUNK_SIZE), b''):
+            yield chunk
 
 @app.route('/download_ioc')
 def download_ioc():
@@ -784,10 +1121,9 @@ mail = Mail(app)
 @app.route('/send_email/<filename>', methods=['POST'])
 def send_email_route(filename):
     """Route to send an email with a specified file as an attachment."""
-    FILE_STORAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'generated_files')
-    file_path = os.path.join(FILE_STORAGE, filename)
+    file_path = resolve_generated_file_path(filename)
 
-    if not os.path.exists(file_path):
+    if not file_path:
         flash("File not found.", "warning")
         logging.info("File NOT Found to Attach")
         return redirect(url_for('te'))  # Redirect to 'te' page
@@ -809,7 +1145,7 @@ def send_email_route(filename):
     body = email_config.get('email_body', f"Please find the attached file: {filename}")
 
     # Determine the MIME type of the file
-    mime_type, _ = mimetypes.guess_type(file_path)
+    mime_type, _ = mimetypes.guess_type(filename)
     if not mime_type:
         mime_type = 'application/octet-stream'  # Fallback if detection fails
 